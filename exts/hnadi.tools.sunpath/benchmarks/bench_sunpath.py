@@ -0,0 +1,434 @@
+"""Headless benchmarks of the sunpath extension
+
+Runs typical interactions on plain CPython with the Kit modules replaced by `omni_stubs`,
+and reports per-stage timings, recorded calls (scene items, commands) and allocations as JSON.
+
+    python benchmarks/bench_sunpath.py --repeat 5 --output bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import omni_stubs  # noqa: E402
+
+RECORDER = omni_stubs.install()
+
+# Enable the extension stage timer in every scenario (--stage-timing)
+STAGE_TIMING = False
+
+import numpy as np  # noqa: E402
+from hnadi.tools.sunpath import gol  # noqa: E402
+from hnadi.tools.sunpath import sun_times, ephemeris_table, sunpath_geometry, irradiance, sky_matrix  # noqa: E402
+from hnadi.tools.sunpath.solar_position import sun_position  # noqa: E402
+from hnadi.tools.sunpath.pyephem_reference import reference_sun_position  # noqa: E402
+from hnadi.tools.sunpath.draw_sunpath import DrawSunpath  # noqa: E402
+from hnadi.tools.sunpath.viewport_scene import ViewportScene  # noqa: E402
+from hnadi.tools.sunpath.draw_sphere import MovableSphere, sphere_mesh  # noqa: E402
+from hnadi.tools.sunpath.sunlight_manipulator import SunlightManipulator  # noqa: E402
+from hnadi.tools.sunpath.update_scheduler import UpdateScheduler  # noqa: E402
+
+
+class StageRecorder:
+    """Collect timing, calls and allocations of named stages"""
+
+    def __init__(self, trace_alloc):
+        self.trace_alloc = trace_alloc
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name, iterations=1):
+        calls = RECORDER.snapshot()
+        if self.trace_alloc:
+            tracemalloc.clear_traces()
+        start = time.perf_counter()
+        yield
+        seconds = time.perf_counter() - start
+        result = {"seconds": seconds, "iterations": iterations, "calls": RECORDER.since(calls)}
+        if self.trace_alloc:
+            current, peak = tracemalloc.get_traced_memory()
+            result["alloc_net_bytes"] = current
+            result["alloc_peak_bytes"] = peak
+        self.stages[name] = result
+
+
+def reset_state():
+    """
+    Start from a new global state and empty caches
+    """
+    gol._init()
+    state = gol.state
+    state.profiler.enabled = STAGE_TIMING
+    sun_times._year_sun_times.cache_clear()
+    irradiance._year_irradiance.cache_clear()
+    sky_matrix._cumulative_sky.cache_clear()
+    ephemeris_table.find_table.cache_clear()
+    sphere_mesh.cache_clear()
+    sunpath_geometry.compass_polylines.cache_clear()
+    state.sun_state = True
+    state.show_info = True
+    pathmodel = state.pathmodel
+    pathmodel.set_hour(12)
+    pathmodel.set_tolerance(state.path_tolerance / (state.scale * 200))
+    return pathmodel
+
+
+def diagram_scene(pathmodel):
+    """
+    The diagram in a stand-in viewport window, and a function updating it with the changed field groups
+    """
+    scene = ViewportScene(omni_stubs.ViewportWindow(), "bench", pathmodel)
+    dirty = set()
+    gol.state.subscribe(dirty.add)
+
+    def update():
+        groups = set(dirty)
+        dirty.clear()
+        scene.update(groups)
+
+    return scene, update
+
+
+def scenario_full_rebuild(rec):
+    """
+    Everything computed and drawn from scratch
+    """
+    pathmodel = reset_state()
+    cache = gol.state.path_cache
+    with rec.stage("ephemeris"):
+        for datevalue in (pathmodel.datevalue, 172, 355, 80, 110, 295):
+            cache.day_path(pathmodel, datevalue)
+        for hour in range(24):
+            cache.sametime_path(pathmodel, hour)
+    with rec.stage("sun_times"):
+        pathmodel.get_sunrise_time()
+    with rec.stage("draw_sunpath"):
+        DrawSunpath(pathmodel, None)
+    with rec.stage("draw_sphere"):
+        MovableSphere()
+
+
+def scenario_date_scrub(rec, steps=60):
+    """
+    Drag the date slider with the diagram shown
+    """
+    pathmodel = reset_state()
+    _, update = diagram_scene(pathmodel)
+    with rec.stage("update", steps):
+        for datevalue in range(150, 150 + steps):
+            gol.state.set_date(datevalue)
+            update()
+
+
+def scenario_location_change(rec, steps=30):
+    """
+    Drag the latitude slider, every step is a new location
+    """
+    pathmodel = reset_state()
+    _, update = diagram_scene(pathmodel)
+    with rec.stage("update", steps):
+        for i in range(steps):
+            gol.state.set_location(lat=20.0 + 0.5 * i)
+            update()
+
+
+def scenario_cosmetic_change(rec, steps=30):
+    """
+    Drag the scale slider then the color, the diagram is only re-transformed then restyled
+    """
+    pathmodel = reset_state()
+    _, update = diagram_scene(pathmodel)
+    with rec.stage("update", steps):
+        for i in range(steps):
+            gol.state.scale = 20 + i
+            update()
+    with rec.stage("restyle", steps):
+        for i in range(steps):
+            gol.state.color = (1.0, i / steps, 0.0)
+            update()
+
+
+def scenario_change_sun(rec, steps=24):
+    """
+    Drag the hour slider with the sunlight shown
+    """
+    pathmodel = reset_state()
+    sunlight = SunlightManipulator(pathmodel)
+    with rec.stage("show_sun"):
+        sunlight.show_sun()
+    with rec.stage("change_sun", steps):
+        for hour in range(steps):
+            pathmodel.set_hour(hour)
+            sunlight.change_sun()
+
+
+def scenario_bake_year(rec):
+    """
+    Compute the hourly sunlight track of a year, writing the time samples needs a USD stage
+    """
+    pathmodel = reset_state()
+    sunlight = SunlightManipulator(pathmodel)
+    year = pathmodel.year
+    with rec.stage("sun_track", 8760):
+        sunlight.sun_track(np.datetime64(f"{year}-01-01T00:00"), np.datetime64(f"{year + 1}-01-01T00:00"), 60)
+
+
+def scenario_irradiance(rec, steps=30):
+    """
+    Compute the hourly clear sky irradiance of a year, then drag the date with irradiance colored paths
+    """
+    pathmodel = reset_state()
+    with rec.stage("year_irradiance", 8760):
+        pathmodel.irradiance()
+    _, update = diagram_scene(pathmodel)
+    with rec.stage("restyle"):
+        gol.state.irradiance_colors = True
+        update()
+    with rec.stage("update", steps):
+        for datevalue in range(150, 150 + steps):
+            gol.state.set_date(datevalue)
+            update()
+
+
+def scenario_sky_matrix(rec, steps=30):
+    """
+    Bin a one minute year into the Tregenza and Reinhart patches, then drag the latitude with the dome shown
+    """
+    pathmodel = reset_state()
+    with rec.stage("tregenza_minutes", 525600):
+        pathmodel.sky_matrix(step=1)
+    with rec.stage("reinhart_minutes", 525600):
+        pathmodel.sky_matrix(step=1, subdivision=2)
+    _, update = diagram_scene(pathmodel)
+    with rec.stage("show_sky"):
+        gol.state.show_sky = True
+        update()
+    with rec.stage("update", steps):
+        for i in range(steps):
+            gol.state.set_location(lat=20.0 + 0.5 * i)
+            update()
+
+
+def scenario_camera_zoom(rec, frames=120):
+    """
+    Zoom the camera out from the diagram to far away and back, the tier changes a few times
+    """
+    pathmodel = reset_state()
+    scene, _ = diagram_scene(pathmodel)
+    viewport_api = scene._viewport_window.viewport_api
+    distances = np.geomspace(2e4, 2e6, frames // 2)
+    tiers = []
+    with rec.stage("view_change", frames):
+        for distance in np.concatenate([distances, distances[::-1]]):
+            viewport_api.move_camera(distance)
+            tiers.append(scene.tier.name)
+    rec.stages["view_change"]["tiers"] = [name for i, name in enumerate(tiers) if i == 0 or name != tiers[i - 1]]
+    for name in ("full", "icon"):
+        viewport_api.move_camera(2e4 if name == "full" else 2e6)
+        with rec.stage(f"date_scrub_{name}", 30):
+            for datevalue in range(150, 180):
+                gol.state.set_date(datevalue)
+                scene.update({"astronomy"})
+
+
+def scenario_instances(rec, count=10, steps=30):
+    """
+    Draw count diagrams of the same location and date side by side, then drag the date with all of them
+    """
+    pathmodel = reset_state()
+    with rec.stage("first"):
+        _, update = diagram_scene(pathmodel)
+    with rec.stage("add", count - 2):
+        for i in range(1, count - 1):
+            gol.state.add_diagram((i * 30000.0, 0.0, 0.0))
+            update()
+    with rec.stage("last"):
+        gol.state.add_diagram(((count - 1) * 30000.0, 0.0, 0.0))
+        update()
+    with rec.stage("update", steps):
+        for datevalue in range(150, 150 + steps):
+            gol.state.set_date(datevalue)
+            update()
+
+
+def scenario_slider_burst(rec, frames=10, events_per_frame=12):
+    """
+    A burst of slider events coalesced by the update scheduler, one frame is one loop iteration
+    """
+    pathmodel = reset_state()
+    sunpath = DrawSunpath(pathmodel, None)
+
+    def apply(valtype, val):
+        RECORDER.record("scheduler.apply")
+        pathmodel.set_date(val)
+
+    def redraw(final):
+        RECORDER.record("scheduler.final_redraw" if final else "scheduler.redraw")
+        sunpath.update()
+
+    async def next_update():
+        await asyncio.sleep(0)
+
+    async def burst():
+        scheduler = UpdateScheduler(apply, redraw, settle_frames=4, next_update_fn=next_update)
+        for frame in range(frames):
+            for i in range(events_per_frame):
+                scheduler.request("date", 100 + frame * events_per_frame + i)
+            await next_update()
+        while scheduler.busy:
+            await next_update()
+
+    with rec.stage("burst", frames * events_per_frame):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(burst())
+        finally:
+            loop.close()
+
+
+# Sites (lat, lon, tz) of the accuracy check: the default location, polar, southern and equatorial
+ACCURACY_SITES = ((28.12, 112.94, 8), (69.65, 18.96, 1), (-33.87, 151.21, 10), (-0.18, -78.47, -5))
+
+
+def scenario_accuracy(rec, step_hours=7):
+    """
+    Sun positions of the NumPy engine against pyephem-sunpath, every step_hours of a year at ACCURACY_SITES
+
+    Reports the largest altitude and azimuth differences (degrees) of the sun above the horizon,
+    azimuths near the zenith are left out. Skipped when pyephem-sunpath is not available.
+    """
+    reset_state()
+    times = np.arange(
+        np.datetime64("2022-01-01T00:00"), np.datetime64("2023-01-01T00:00"), np.timedelta64(step_hours, "h")
+    )
+    samples = len(times) * len(ACCURACY_SITES)
+    with rec.stage("engine", samples):
+        engine = [sun_position(times, lat, lon, tz) for lat, lon, tz in ACCURACY_SITES]
+    with rec.stage("pyephem", samples):
+        reference = [reference_sun_position(times, lat, lon, tz) for lat, lon, tz in ACCURACY_SITES]
+    if any(r is None for r in reference):
+        rec.stages["pyephem"]["skipped"] = "pyephem-sunpath is not available"
+        return
+
+    alt_error, azm_error = 0.0, 0.0
+    for (alt, azm), (ref_alt, ref_azm) in zip(engine, reference):
+        above = ref_alt > 0
+        alt_error = max(alt_error, float(np.max(np.abs(alt - ref_alt)[above])))
+        azimuths = above & (ref_alt < 85)
+        difference = (azm - ref_azm + 180.0) % 360.0 - 180.0
+        azm_error = max(azm_error, float(np.max(np.abs(difference)[azimuths])))
+    rec.stages["pyephem"]["max_error_deg"] = {"altitude": alt_error, "azimuth": azm_error}
+
+
+_STARTUP_CODE = """
+import sys, time
+start = time.perf_counter()
+sys.path[:0] = {paths!r}
+import omni_stubs
+recorder = omni_stubs.install()
+from hnadi.tools.sunpath import gol
+from hnadi.tools.sunpath import viewport_scene, sunlight_manipulator
+gol._init()
+print(time.perf_counter() - start, recorder.counts["pipapi.install"])
+"""
+
+
+def scenario_startup(rec):
+    """
+    Import the modules loaded by the extension and initialize the global state in a new interpreter
+    """
+    reset_state()
+    paths = [os.path.dirname(os.path.abspath(__file__)), os.path.dirname(os.path.dirname(os.path.abspath(__file__)))]
+    with rec.stage("import"):
+        output = subprocess.check_output([sys.executable, "-c", _STARTUP_CODE.format(paths=paths)], text=True)
+    seconds, installs = output.split()
+    rec.stages["import"]["seconds"] = float(seconds)
+    rec.stages["import"]["calls"] = {"pipapi.install": int(installs)}
+
+
+SCENARIOS = {
+    "startup": scenario_startup,
+    "accuracy": scenario_accuracy,
+    "full_rebuild": scenario_full_rebuild,
+    "date_scrub": scenario_date_scrub,
+    "location_change": scenario_location_change,
+    "cosmetic_change": scenario_cosmetic_change,
+    "change_sun": scenario_change_sun,
+    "bake_year": scenario_bake_year,
+    "irradiance": scenario_irradiance,
+    "sky_matrix": scenario_sky_matrix,
+    "camera_zoom": scenario_camera_zoom,
+    "instances": scenario_instances,
+    "slider_burst": scenario_slider_burst,
+}
+
+
+def run_scenario(fn, repeat):
+    """
+    Best time of repeat runs, then one more run with tracemalloc for allocations
+    """
+    best = None
+    for _ in range(repeat):
+        rec = StageRecorder(trace_alloc=False)
+        fn(rec)
+        if best is None or sum(s["seconds"] for s in rec.stages.values()) < sum(s["seconds"] for s in best.values()):
+            best = rec.stages
+            stage_timing = gol.state.profiler.stats()
+
+    tracemalloc.start()
+    try:
+        rec = StageRecorder(trace_alloc=True)
+        fn(rec)
+    finally:
+        tracemalloc.stop()
+    for name, stage in best.items():
+        stage["alloc_net_bytes"] = rec.stages[name]["alloc_net_bytes"]
+        stage["alloc_peak_bytes"] = rec.stages[name]["alloc_peak_bytes"]
+    if STAGE_TIMING:
+        best["stage_timing"] = stage_timing
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless benchmarks of the sunpath extension")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per scenario, the fastest is reported")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="default all")
+    parser.add_argument("--output", default=None, help="write JSON here instead of stdout")
+    parser.add_argument(
+        "--stage-timing", action="store_true", help="report the stage timer of the extension (ms percentiles)"
+    )
+    args = parser.parse_args(argv)
+
+    global STAGE_TIMING
+    STAGE_TIMING = args.stage_timing
+
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "scenarios": {},
+    }
+    for name in args.scenario or SCENARIOS:
+        report["scenarios"][name] = run_scenario(SCENARIOS[name], max(args.repeat, 1))
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""Lightweight stand-ins of the Kit modules used by the extension
+
+They let the computation and drawing modules run on plain CPython. Nothing is drawn and no
+USD stage exists: scene items, commands and pip installs only record how often they are called.
+"""
+
+__all__ = ["CallRecorder", "RECORDER", "ViewportWindow", "perspective", "install"]
+
+import sys
+import types
+from collections import Counter
+from contextlib import contextmanager
+import numpy as np
+
+
+class CallRecorder:
+    """Count calls by name"""
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def record(self, name):
+        self.counts[name] += 1
+
+    def snapshot(self):
+        return Counter(self.counts)
+
+    def since(self, snapshot):
+        """
+        Get the calls recorded after snapshot
+        """
+        return dict(self.counts - snapshot)
+
+
+RECORDER = CallRecorder()
+
+
+class _SceneItem:
+    """Stand-in of omni.ui.scene items, records construction and property updates"""
+
+    def __init__(self, *args, **kwargs):
+        name = f"sc.{type(self).__name__.lstrip('_')}"
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "visible", True)
+        RECORDER.record(name)
+        for key, value in kwargs.items():
+            object.__setattr__(self, key, value)
+        if args:
+            object.__setattr__(self, "args", args)
+
+    def __setattr__(self, key, value):
+        RECORDER.record(f"{self._name}.{key}")
+        object.__setattr__(self, key, value)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def clear(self):
+        RECORDER.record(f"{self._name}.clear")
+
+
+class _Curve(_SceneItem):
+    class CurveType:
+        LINEAR = 0
+        CUBIC = 1
+
+
+class _SceneView(_SceneItem):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        object.__setattr__(self, "scene", _SceneItem())
+
+
+class _Matrix44:
+    def __init__(self, *values):
+        self.values = values
+
+    @staticmethod
+    def get_translation_matrix(x, y, z):
+        return _Matrix44("translate", x, y, z)
+
+    @staticmethod
+    def get_scale_matrix(x, y, z):
+        return _Matrix44("scale", x, y, z)
+
+    @staticmethod
+    def get_rotation_matrix(x, y, z, degrees=False):
+        return _Matrix44("rotate", x, y, z)
+
+    def __mul__(self, other):
+        return _Matrix44(self, other)
+
+
+def perspective(distance, resolution=(1280, 720), fov=60.0, near=1.0, far=1e7):
+    """
+    World to NDC matrix (row vectors) of a camera on +z at distance looking at the origin
+    """
+    f = 1.0 / np.tan(np.radians(fov) / 2.0)
+    view = np.eye(4)
+    view[3, 2] = -distance
+    projection = np.zeros((4, 4))
+    projection[0, 0] = f * resolution[1] / resolution[0]
+    projection[1, 1] = f
+    projection[2, 2] = -(far + near) / (far - near)
+    projection[2, 3] = -1.0
+    projection[3, 2] = -2.0 * far * near / (far - near)
+    return view @ projection
+
+
+class _ViewportApi:
+    def __init__(self):
+        self.resolution = (1280, 720)
+        self.world_to_ndc = perspective(1000.0, self.resolution)
+        self._view_callbacks = []
+
+    def subscribe_to_view_change(self, callback):
+        RECORDER.record("viewport_api.subscribe_to_view_change")
+        self._view_callbacks.append(callback)
+        return callback
+
+    def move_camera(self, distance):
+        """
+        Move the camera to distance from the origin and call the view change callbacks
+        """
+        self.world_to_ndc = perspective(distance, self.resolution)
+        for callback in self._view_callbacks:
+            callback(self)
+
+    def add_scene_view(self, scene_view):
+        RECORDER.record("viewport_api.add_scene_view")
+
+    def remove_scene_view(self, scene_view):
+        RECORDER.record("viewport_api.remove_scene_view")
+
+
+class ViewportWindow:
+    """Stand-in of the viewport window a `ViewportScene` draws in"""
+
+    def __init__(self):
+        self.viewport_api = _ViewportApi()
+
+    @contextmanager
+    def get_frame(self, name):
+        yield
+
+
+class _DragGesture:
+    def __init__(self, *args, **kwargs):
+        self.sender = None
+        self.gesture_payload = None
+
+
+class _Color:
+    """Stand-in of omni.ui.color: cl(r, g, b) and named colors"""
+
+    def __call__(self, *args):
+        return tuple(args)
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return name
+
+
+class _Namespace(types.SimpleNamespace):
+    """Return the attribute name for any unknown enum member"""
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return name
+
+
+class _Vec3d(tuple):
+    def __new__(cls, *values):
+        return super().__new__(cls, values)
+
+
+def _execute(name, **kwargs):
+    RECORDER.record(f"commands.{name}")
+    return True, None
+
+
+@contextmanager
+def _undo_group():
+    RECORDER.record("undo.group")
+    yield
+
+
+def _install(*args, **kwargs):
+    RECORDER.record("pipapi.install")
+    return True
+
+
+def _log(level):
+    def log(message):
+        RECORDER.record(f"carb.log_{level}")
+
+    return log
+
+
+def _module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    return module
+
+
+def install():
+    """
+    Register the stand-ins in sys.modules, return the recorder
+
+    `omni` is not a package here, so `import omni.ext` fails and the extension UI is not imported.
+    """
+    names = ("Transform", "Label", "Rectangle", "Line", "Points", "PolygonMesh")
+    sc_items = {name: type(name, (_SceneItem,), {}) for name in names}
+    scene = _module(
+        "omni.ui.scene",
+        Curve=_Curve,
+        SceneView=_SceneView,
+        Matrix44=_Matrix44,
+        DragGesture=_DragGesture,
+        **sc_items,
+    )
+    color = _Color()
+    ui = _module(
+        "omni.ui", scene=scene, color=color, Window=type("Window", (), {}), Alignment=_Namespace(), Axis=_Namespace()
+    )
+    commands = _module("omni.kit.commands", execute=_execute)
+    pipapi = _module("omni.kit.pipapi", install=_install)
+    undo = _module("omni.kit.undo", group=_undo_group)
+    kit = _module("omni.kit", commands=commands, pipapi=pipapi, undo=undo)
+    # There is no stage, code writing USD directly can not run on the stand-ins
+    usd = _module("omni.usd", get_context=lambda: None)
+    omni = _module("omni", ui=ui, kit=kit, usd=usd)
+
+    gf = _Namespace(Vec3d=_Vec3d, Vec3f=_Vec3d)
+    sdf = _Namespace(Path=str)
+    pxr = _module("pxr", Gf=gf, Sdf=sdf, Usd=_Namespace(), UsdGeom=_Namespace())
+    carb = _module("carb", **{f"log_{level}": _log(level) for level in ("info", "warn", "error")})
+
+    sys.modules.update(
+        {
+            "omni": omni,
+            "omni.ui": ui,
+            "omni.ui.scene": scene,
+            "omni.kit": kit,
+            "omni.kit.commands": commands,
+            "omni.kit.pipapi": pipapi,
+            "omni.kit.undo": undo,
+            "omni.usd": usd,
+            "pxr": pxr,
+            "carb": carb,
+        }
+    )
+    return RECORDER
@@ -1 +1,12 @@
-from .extension import *
+import time
+
+# Start of the package import, the extension reports its load time from it
+_import_start = time.perf_counter()
+
+try:
+    import omni.ext  # noqa: F401
+except ImportError:
+    # Running outside Kit (command line tools), only the computation modules are usable
+    pass
+else:
+    from .extension import *
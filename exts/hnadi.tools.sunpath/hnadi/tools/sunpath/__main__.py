@@ -0,0 +1,75 @@
+"""Export the sunpath diagram geometry without Kit
+
+The curves and labels of `sunpath_geometry` are written in one of the `export` formats:
+
+    python -m hnadi.tools.sunpath --lat 28.12 --lon 112.94 --date 172 --format usda --out sunpath.usda
+"""
+
+import sys
+import argparse
+from .sunpath_data import SunpathData
+from .sunpath_geometry import diagram_curves, diagram_labels
+from .export import FORMATS
+from .timezone import parse_timezone
+
+
+def _positive(text):
+    value = float(text)
+    if not value > 0:
+        raise argparse.ArgumentTypeError(f"must be > 0, got {text}")
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m hnadi.tools.sunpath", description=__doc__.splitlines()[0])
+    parser.add_argument("--lat", type=float, default=28.12, help="latitude, North is +ve")
+    parser.add_argument("--lon", type=float, default=112.94, help="longitude, West is -ve")
+    parser.add_argument(
+        "--tz", type=parse_timezone, default=None, help="UTC offset in hours or IANA zone, default zone of the location"
+    )
+    parser.add_argument("--year", type=int, default=None, help="default current year")
+    parser.add_argument("--date", type=int, default=230, help="day of year 1-365, like the date slider")
+    parser.add_argument("--hour", type=int, default=12)
+    parser.add_argument("--minute", type=int, default=30)
+    parser.add_argument("--scale", type=_positive, default=1.0, help="radius of the diagram, > 0")
+    parser.add_argument("--day-step", type=int, default=5, help="day path sampling step in minutes")
+    parser.add_argument("--year-step", type=int, default=2, help="'8' shape curve sampling step in days")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0,
+        help="adaptive sampling chord tolerance in output units, 0 for fixed steps",
+    )
+    parser.add_argument("--format", choices=sorted(FORMATS), default="json")
+    parser.add_argument("--out", default="-", help="output file, - for stdout")
+    args = parser.parse_args(argv)
+
+    pathmodel = SunpathData(args.date, args.hour, args.minute, args.lon, args.lat)
+    if args.year is not None:
+        pathmodel.year = args.year
+    pathmodel.set_timezone(args.tz)
+    pathmodel.set_sampling(args.day_step, args.year_step)
+    pathmodel.set_tolerance(args.tolerance / args.scale)
+
+    meta = {
+        "lat": args.lat,
+        "lon": args.lon,
+        "tz": pathmodel.tz,
+        "zone": pathmodel.zone,
+        "year": pathmodel.year,
+        "date": args.date,
+        "hour": args.hour,
+        "minute": args.minute,
+        "scale": args.scale,
+        "tolerance": args.tolerance,
+    }
+    text = FORMATS[args.format](diagram_curves(pathmodel, args.scale), diagram_labels(pathmodel, args.scale), meta)
+    if args.out == "-":
+        sys.stdout.write(text)
+    else:
+        with open(args.out, "w") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
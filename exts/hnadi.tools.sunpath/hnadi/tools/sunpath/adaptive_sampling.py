@@ -0,0 +1,55 @@
+"""Adaptive sampling of curves with a bounded chord error"""
+
+__all__ = ["refine", "split_curves"]
+
+import numpy as np
+
+# Halvings of the initial step at most
+MAX_ITERATIONS = 16
+
+
+def refine(fn, params, curves, tolerance, min_step, keep=None, force=None):
+    """
+    Insert samples between params until every chord is within tolerance of its curve
+
+    Several curves are refined together: curves gives the curve index of every param, params
+    are sorted within a curve and curves are contiguous. fn(params, curves) returns (N, 3) points.
+    A segment is split at its middle when the curve point there is farther than tolerance from the
+    middle of the chord, unless it is shorter than min_step. keep(points_a, points_b) masks the
+    segments worth refining, default all, and force(points_a, points_b) the segments split
+    whatever their error. All segments of an iteration are evaluated with one call of fn.
+    Returns params, points and curves.
+    """
+    params = np.asarray(params, dtype=np.float64)
+    curves = np.asarray(curves, dtype=np.int64)
+    points = np.asarray(fn(params, curves), dtype=np.float64)
+    for _ in range(MAX_ITERATIONS):
+        if len(params) < 2:
+            break
+        candidate = (curves[1:] == curves[:-1]) & ((params[1:] - params[:-1]) > min_step)
+        if keep is not None:
+            candidate &= keep(points[:-1], points[1:])
+        segment = np.flatnonzero(candidate)
+        if len(segment) == 0:
+            break
+
+        mid = (params[segment] + params[segment + 1]) * 0.5
+        mid_points = np.asarray(fn(mid, curves[segment]), dtype=np.float64)
+        error = np.linalg.norm(mid_points - (points[segment] + points[segment + 1]) * 0.5, axis=-1)
+        split = error > tolerance
+        if force is not None:
+            split |= force(points[segment], points[segment + 1])
+        if not split.any():
+            break
+        index = segment[split] + 1
+        params = np.insert(params, index, mid[split])
+        points = np.insert(points, index, mid_points[split], axis=0)
+        curves = np.insert(curves, index, curves[segment[split]])
+    return params, points, curves
+
+
+def split_curves(values, curves, count):
+    """
+    Split an array refined by `refine` into a list with one array per curve
+    """
+    return np.split(values, np.searchsorted(curves, np.arange(1, count)))
@@ -0,0 +1,163 @@
+"""Sun path data of many sites, computed in worker processes
+
+Reads a CSV of sites with a header row: name, lat, lon and optionally tz, a UTC offset (hours) or an
+IANA zone name, by default the zone of the location with daylight saving time.
+For every site the day paths and the '8' shape curves drawn by `DrawSunpath.draw_paths`, the
+sunrise / sunset table and the hourly clear sky irradiance of the year are written with
+numpy.savez_compressed, one file per site or one combined archive with "<site>/<array>" names.
+Site names must be unique.
+
+    python -m hnadi.tools.sunpath.batch sites.csv --out sunpaths
+    python -m hnadi.tools.sunpath.batch sites.csv --archive sunpaths.npz --workers 8
+"""
+
+__all__ = ["read_sites", "site_arrays", "run_batch"]
+
+import os
+import re
+import csv
+import time
+import argparse
+import numpy as np
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from .sunpath_data import SunpathData
+from .sunpath_geometry import PATH_DATES, pack_polylines
+from .timezone import parse_timezone
+
+
+def read_sites(path):
+    """
+    Read sites from a CSV file, return a list of (name, lat, lon, tz), tz is None when not given
+    """
+    sites = []
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            row = {key.strip().lower(): value.strip() for key, value in row.items() if key}
+            lat, lon = float(row["lat"]), float(row["lon"])
+            sites.append((row["name"], lat, lon, parse_timezone(row.get("tz"))))
+    return sites
+
+
+def site_arrays(lat, lon, tz, year=None, day_step=5, year_step=2):
+    """
+    Compute the sun path arrays of a site, unit sphere points above the horizon
+
+    "day_<date>" (N, 3) for PATH_DATES, "hour_<hh>" (N, 3) for every hour, "sun_times" (see
+    `sun_times.SUN_TIMES_DTYPE`) and the hourly clear sky "irradiance" (see `irradiance.IRRADIANCE_DTYPE`).
+    A path is split in runs above the horizon, "<path>_offsets" (K + 1,) of every path delimits them:
+    run i is points[offsets[i]:offsets[i + 1]]. tz is given to `SunpathData.set_timezone`.
+    """
+    pathmodel = SunpathData(PATH_DATES[0], 12, 0, lon, lat)
+    pathmodel.year = datetime.now().year if year is None else year
+    pathmodel.set_timezone(tz)
+    pathmodel.set_sampling(day_step, year_step)
+
+    arrays = {}
+    names = [f"day_{datevalue}" for datevalue in PATH_DATES] + [f"hour_{hour:02d}" for hour in range(24)]
+    paths = pathmodel.day_path_runs(PATH_DATES) + pathmodel.sametime_runs(range(24))
+    for name, runs in zip(names, paths):
+        polylines = pack_polylines(range(len(runs)), runs)
+        arrays[name] = polylines.points
+        arrays[f"{name}_offsets"] = polylines.offsets
+    arrays["sun_times"] = pathmodel.sun_times()
+    arrays["irradiance"] = pathmodel.irradiance()
+    return arrays
+
+
+def _file_name(name):
+    """
+    Make a site name safe to use as a file name
+    """
+    return re.sub(r"[^\w.-]+", "_", name).strip("_") or "site"
+
+
+def _check_names(sites, files):
+    """
+    Raise ValueError when site names (or their file names when files is True) are not unique
+    """
+    seen, duplicates = {}, []
+    for name, *_ in sites:
+        key = _file_name(name) if files else name
+        if key in seen:
+            duplicates.append(f"{seen[key]!r} and {name!r}" if files and seen[key] != name else repr(name))
+        seen.setdefault(key, name)
+    if duplicates:
+        raise ValueError(f"site names must be unique, duplicated: {', '.join(duplicates)}")
+
+
+def _compute_site(task):
+    """
+    Worker: compute a site, write its file when out is given, otherwise return the arrays
+    """
+    (name, lat, lon, tz), out, year, sampling = task
+    arrays = site_arrays(lat, lon, tz, year, *sampling)
+    if out is None:
+        return name, arrays
+    np.savez_compressed(os.path.join(out, f"{_file_name(name)}.npz"), **arrays)
+    return name, None
+
+
+def run_batch(sites, out=None, archive=None, workers=None, year=None, sampling=(5, 2)):
+    """
+    Compute sites in a process pool, write one file per site to directory out and/or one archive
+
+    Returns a report: number of sites, workers, seconds and sites per second. Raises ValueError
+    when two sites have the same name, or the same file name with out.
+    """
+    _check_names(sites, files=out is not None)
+    workers = workers or os.cpu_count() or 1
+    if out is not None:
+        os.makedirs(out, exist_ok=True)
+    start = time.perf_counter()
+
+    # Per site files are written by the workers, the archive needs the arrays back
+    tasks = [(site, None if archive else out, year, tuple(sampling)) for site in sites]
+    chunksize = max(1, len(tasks) // (workers * 4))
+    combined = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for name, arrays in executor.map(_compute_site, tasks, chunksize=chunksize):
+            if arrays is None:
+                continue
+            if out is not None:
+                np.savez_compressed(os.path.join(out, f"{_file_name(name)}.npz"), **arrays)
+            combined.update({f"{name}/{key}": value for key, value in arrays.items()})
+    if archive:
+        np.savez_compressed(archive, **combined)
+
+    seconds = time.perf_counter() - start
+    return {
+        "sites": len(sites),
+        "workers": workers,
+        "seconds": seconds,
+        "sites_per_second": len(sites) / seconds if seconds > 0 else float("inf"),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute sun path data of many sites")
+    parser.add_argument("sites", help="CSV file with name, lat, lon and optional tz columns")
+    parser.add_argument("--out", default=None, help="directory of per site .npz files")
+    parser.add_argument("--archive", default=None, help="single combined .npz file")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, default cpu count")
+    parser.add_argument("--year", type=int, default=None, help="default current year")
+    parser.add_argument("--day-step", type=int, default=5, help="day path sampling step in minutes")
+    parser.add_argument("--year-step", type=int, default=2, help="'8' shape curve sampling step in days")
+    args = parser.parse_args(argv)
+    if args.out is None and args.archive is None:
+        parser.error("give --out and/or --archive")
+
+    try:
+        report = run_batch(
+            read_sites(args.sites), args.out, args.archive, args.workers, args.year, (args.day_step, args.year_step)
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    print(
+        f"{report['sites']} sites in {report['seconds']:.2f} s with {report['workers']} workers, "
+        f"{report['sites_per_second']:.1f} sites/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
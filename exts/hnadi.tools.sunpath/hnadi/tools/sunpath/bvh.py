@@ -0,0 +1,158 @@
+"""Bounding volume hierarchy of triangles for occlusion ray casts on the CPU
+
+The tree is stored as flat arrays and a whole batch of rays walks it at once, so the work is
+done by NumPy and no GPU is needed.
+"""
+
+__all__ = ["BVH", "build_bvh", "occluded"]
+
+import numpy as np
+from collections import namedtuple
+
+# Rays traversed at once by `occluded`, bounds the size of temporary arrays
+RAY_CHUNK = 65536
+
+# lo, hi: node bounds (K, 3); left: first child node, the second one is left + 1, -1 for leaves;
+# axis: split axis of inner nodes; start, count: triangles of leaves; depth: levels below the root;
+# v0, e1, e2: triangles in leaf order, first vertex and edges (M, 3)
+BVH = namedtuple("BVH", ["lo", "hi", "left", "axis", "start", "count", "depth", "v0", "e1", "e2"])
+
+
+def build_bvh(triangles, leaf_size=8):
+    """
+    Build a BVH of triangles (M, 3, 3), nodes are split at the median centroid of their longest axis
+    """
+    triangles = np.asarray(triangles, dtype=np.float64).reshape(-1, 3, 3)
+    tri_lo = triangles.min(axis=1)
+    tri_hi = triangles.max(axis=1)
+    centroid = (tri_lo + tri_hi) * 0.5
+    order = np.arange(len(triangles))
+
+    lo, hi, left, split, start, count = [], [], [], [], [], []
+
+    def add_node(begin, end):
+        index = order[begin:end]
+        lo.append(tri_lo[index].min(axis=0) if end > begin else np.zeros(3))
+        hi.append(tri_hi[index].max(axis=0) if end > begin else np.zeros(3))
+        left.append(-1)
+        split.append(0)
+        start.append(begin)
+        count.append(end - begin)
+        return len(lo) - 1
+
+    depth = 0
+    stack = [(add_node(0, len(triangles)), 0, len(triangles), 0)]
+    while stack:
+        node, begin, end, level = stack.pop()
+        depth = max(depth, level)
+        if end - begin <= leaf_size:
+            continue
+        index = order[begin:end]
+        extent = centroid[index].max(axis=0) - centroid[index].min(axis=0)
+        axis = int(np.argmax(extent))
+        mid = (end - begin) // 2
+        order[begin:end] = index[np.argpartition(centroid[index, axis], mid)]
+
+        # Children are stored next to each other
+        left[node] = add_node(begin, begin + mid)
+        add_node(begin + mid, end)
+        split[node] = axis
+        count[node] = 0
+        stack.append((left[node], begin, begin + mid, level + 1))
+        stack.append((left[node] + 1, begin + mid, end, level + 1))
+
+    triangles = triangles[order]
+    v0 = triangles[:, 0]
+    return BVH(
+        np.array(lo, dtype=np.float64).reshape(-1, 3),
+        np.array(hi, dtype=np.float64).reshape(-1, 3),
+        np.array(left, dtype=np.int64),
+        np.array(split, dtype=np.int64),
+        np.array(start, dtype=np.int64),
+        np.array(count, dtype=np.int64),
+        depth,
+        v0,
+        triangles[:, 1] - v0,
+        triangles[:, 2] - v0,
+    )
+
+
+def _hit_triangles(bvh, origins, directions, tri, t_min):
+    """
+    Moller-Trumbore test of ray i against triangle tri[i], any hit farther than t_min
+    """
+    e1, e2 = bvh.e1[tri], bvh.e2[tri]
+    p = np.cross(directions, e2)
+    det = np.einsum("ij,ij->i", e1, p)
+    valid = np.abs(det) > 1e-12
+    inv_det = 1.0 / np.where(valid, det, 1.0)
+    s = origins - bvh.v0[tri]
+    u = np.einsum("ij,ij->i", s, p) * inv_det
+    q = np.cross(s, e1)
+    v = np.einsum("ij,ij->i", directions, q) * inv_det
+    t = np.einsum("ij,ij->i", e2, q) * inv_det
+    return valid & (u >= 0.0) & (v >= 0.0) & (u + v <= 1.0) & (t > t_min)
+
+
+def _occluded_chunk(bvh, origins, directions, t_min):
+    count = len(origins)
+    hit = np.zeros(count, dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inv_dir = 1.0 / directions
+    # Every ray walks the tree depth first with its own stack, one node per ray and iteration,
+    # so a ray stops as soon as it is blocked
+    stack = np.zeros((count, bvh.depth * 2 + 2), dtype=np.int64)
+    size = np.ones(count, dtype=np.int64)
+    ray = np.arange(count)
+
+    while ray.size:
+        size[ray] -= 1
+        node = stack[ray, size[ray]]
+
+        # Slab test, fmin / fmax skip NaN of rays in the plane of a slab
+        o, inv = origins[ray], inv_dir[ray]
+        t1 = (bvh.lo[node] - o) * inv
+        t2 = (bvh.hi[node] - o) * inv
+        with np.errstate(invalid="ignore"):
+            near = np.fmin(t1, t2).max(axis=1)
+            far = np.fmax(t1, t2).min(axis=1)
+        enter = (near <= far) & (far >= t_min)
+        ray, node = ray[enter], node[enter]
+
+        # Leaves, test every triangle
+        leaf = bvh.left[node] < 0
+        leaf_ray, leaf_node = ray[leaf], node[leaf]
+        counts = bvh.count[leaf_node]
+        if counts.sum():
+            pair_ray = np.repeat(leaf_ray, counts)
+            first = np.repeat(np.cumsum(counts) - counts, counts)
+            tri = np.repeat(bvh.start[leaf_node], counts) + np.arange(len(pair_ray)) - first
+            hits = _hit_triangles(bvh, origins[pair_ray], directions[pair_ray], tri, t_min)
+            hit[pair_ray[hits]] = True
+
+        # Inner nodes, push the far child first so the child nearer to the origin is visited next
+        inner_ray, inner_node = ray[~leaf], node[~leaf]
+        first_child = bvh.left[inner_node]
+        backward = directions[inner_ray, bvh.axis[inner_node]] < 0
+        top = size[inner_ray]
+        stack[inner_ray, top] = first_child + ~backward
+        stack[inner_ray, top + 1] = first_child + backward
+        size[inner_ray] += 2
+
+        ray = np.flatnonzero((size > 0) & ~hit)
+    return hit
+
+
+def occluded(bvh, origins, directions, t_min=0.0):
+    """
+    Whether rays (N, 3) hit any triangle of bvh farther than t_min along the direction
+    """
+    origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+    directions = np.broadcast_to(np.asarray(directions, dtype=np.float64), origins.shape)
+    hit = np.zeros(len(origins), dtype=bool)
+    if len(bvh.v0) == 0:
+        return hit
+    for begin in range(0, len(origins), RAY_CHUNK):
+        end = begin + RAY_CHUNK
+        hit[begin:end] = _occluded_chunk(bvh, origins[begin:end], directions[begin:end], t_min)
+    return hit
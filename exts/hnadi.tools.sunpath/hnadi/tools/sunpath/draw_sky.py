@@ -0,0 +1,72 @@
+__all__ = ["SkyDome"]
+
+import numpy as np
+from omni.ui import scene as sc
+from .sunpath_data import SunpathData
+from .sky_matrix import sky_dome_mesh
+from .draw_sunpath import IRRADIANCE_RAMP
+
+from . import gol
+
+# The dome is drawn just inside the sun paths, see-through
+DOME_RADIUS = 0.99
+DOME_OPACITY = 0.45
+
+
+def patch_colors(values, opacity=DOME_OPACITY):
+    """
+    RGBA of patch values along the irradiance ramp, the largest value takes the last color
+    """
+    values = np.asarray(values, dtype=np.float64)
+    level = values / values.max() if values.max() > 0 else values
+    stops = np.linspace(0.0, 1.0, len(IRRADIANCE_RAMP))
+    rgb = [np.interp(level, stops, channel) for channel in zip(*IRRADIANCE_RAMP)]
+    return np.stack(rgb + [np.full_like(level, opacity)], axis=-1)
+
+
+class SkyDome:
+    """The cumulative sky matrix drawn as colored patches over the compass
+
+    The mesh is created once for a subdivision, a new sky matrix only changes the colors. It is drawn
+    in the diagram of radius 1, origin and scale are applied by the enclosing transforms.
+    """
+
+    def __init__(self, pathmodel: SunpathData):
+        self.pathmodel = pathmodel
+        # The mesh is only created when the dome is first shown, in this container
+        self._container = sc.Transform()
+        self._mesh = None
+        self._subdivision = None
+        self._matrix = None
+        self.update()
+
+    def update(self):
+        """
+        Show the sky matrix of the location when the dome is on, hide the dome otherwise
+        """
+        state = gol.state
+        if not state.show_sky:
+            if self._mesh is not None:
+                self._mesh.visible = False
+            return
+
+        with state.profiler.stage("sky"):
+            matrix = self.pathmodel.sky_matrix(state.sky_step, state.sky_subdivision)
+        if matrix is self._matrix and self._mesh is not None:
+            self._mesh.visible = True
+            return
+
+        positions, vertex_counts, vertex_indices, patch = sky_dome_mesh(state.sky_subdivision, DOME_RADIUS)
+        colors = patch_colors(matrix.total)[patch].tolist()
+        if self._mesh is None:
+            with self._container:
+                self._mesh = sc.PolygonMesh(positions.tolist(), colors, vertex_counts.tolist(), vertex_indices.tolist())
+        else:
+            if state.sky_subdivision != self._subdivision:
+                self._mesh.positions = positions.tolist()
+                self._mesh.vertex_counts = vertex_counts.tolist()
+                self._mesh.vertex_indices = vertex_indices.tolist()
+            self._mesh.colors = colors
+            self._mesh.visible = True
+        self._subdivision = state.sky_subdivision
+        self._matrix = matrix
@@ -1,89 +1,89 @@
-import math
-from math import sin, cos
 import numpy as np
+from functools import lru_cache
 from omni.ui import scene as sc
 from omni.ui import color as cl
+from .lod import LOD_TIERS
 
 from . import gol
 
 
-def rotate_matrix_z(angle):
+@lru_cache(maxsize=8)
+def sphere_mesh(scale, resolution):
     """
-    Build Z-axis rotation matrix
-    """
-    sep = 2 * math.pi / 360
-    Rz = [
-        [cos(sep * angle), -sin(sep * angle), 0],
-        [sin(sep * angle), cos(sep * angle), 0],
-        [0, 0, 1],
-    ]
-    return np.array(Rz)
-
+    Build the shpere base on [0,0,0] as a single polyline array
 
-def rotate_points(points, angle):
-    """
-    rotate a point list
+    Every meridian starts and ends at the pole [0,0,radius], so all of them connect into one
+    curve. resolution is the number of segments of a meridian, there are resolution // 2 meridians.
     """
-    rotated_pts = []
-    for pt in points:
-        pt_arr = np.array(pt)
-        Rz = rotate_matrix_z(angle)
-        rotated_pt = list(np.dot(Rz, pt_arr))
-        rotated_pts.append(rotated_pt)
-    return rotated_pts
+    radius = 0.1 * scale
+    angles = np.linspace(0.5 * np.pi, 2.5 * np.pi, resolution + 1)
+    meridian = np.stack([np.cos(angles), np.zeros_like(angles), np.sin(angles)], axis=-1) * radius
 
-
-def generate_circle_pts(offset, step, scale):
-    """
-    Generate the points that make up the circle
-    """
-    points = []
-    sep = 2 * math.pi / 360
-    for angle in range(0, 361, step):
-        x = scale * math.cos(sep * angle) * offset
-        z = scale * math.sin(sep * angle) * offset
-        points.append([round(x, 3), 0, round(z, 3)])
-    return points
+    count = max(resolution // 2, 1)
+    rotations = np.linspace(0, np.pi, count, endpoint=False)
+    x = meridian[None, :, 0] * np.cos(rotations)[:, None]
+    y = meridian[None, :, 0] * np.sin(rotations)[:, None]
+    z = np.broadcast_to(meridian[None, :, 2], x.shape)
+    mesh = np.stack([x, y, z], axis=-1).reshape(-1, 3)
+    mesh.setflags(write=False)
+    return mesh
 
 
-def draw_base_sphere():
+def draw_base_sphere(resolution=None):
     """
-    Draw a shpere base on [0,0,0]
+    Draw a shpere base on [0,0,0] for a diagram of radius 1, return the curve
     """
-    scale = gol.get_value("scale") * 200
-    points = generate_circle_pts(0.1, 5, scale)
+    mesh = sphere_mesh(1.0, gol.state.sphere_resolution if resolution is None else resolution)
+    return sc.Curve(mesh.tolist(), thicknesses=[1], colors=[cl.beige], curve_type=sc.Curve.CurveType.LINEAR)
 
-    sc.Curve(points, thicknesses=[1], colors=[cl.beige], curve_type=sc.Curve.CurveType.LINEAR)
 
-    for angle in range(0, 361, 4):
-        r_pts = rotate_points(points, angle)
-        sc.Curve(r_pts, thicknesses=[1], colors=[cl.beige], curve_type=sc.Curve.CurveType.LINEAR)
+class MovableSphere:
+    """The sphere represents the sun, it is created once and moved by parameters
 
-
-def points_modify(points):
-    """
-    Change the coordinates of the point based on the origin and scale
+    It is drawn in the diagram of radius 1, origin and scale are applied by the enclosing transforms.
+    The level of detail tier (see `lod`) coarsens or hides it.
     """
-    scale = gol.get_value("scale") * 200
-    origin = gol.get_value("origin")
-
-    s_points = []
-    for pt in points:
-        x = pt[0] * scale + origin[0]
-        y = pt[1] * scale + origin[1]
-        z = pt[2] * scale + origin[2]
-        newpt = [x, y, z]
-        s_points.append(newpt)
-    return s_points
 
-
-def draw_movable_sphere():
-    """
-    According parametes to move sphere positon
-    """
-    pathmodel = gol.get_value("pathmodel")
-    sun_pos = pathmodel.cur_sun_position()
-    x, y, z = points_modify([sun_pos])[0]
-    if y > 0:
-        with sc.Transform(transform=sc.Matrix44.get_translation_matrix(x, y, z)):
-            draw_base_sphere()
+    def __init__(self):
+        self._transform = sc.Transform()
+        self._curve = None
+        self._resolution = None
+        self._position = None
+        self.tier = LOD_TIERS[0]
+        self.update()
+
+    def set_tier(self, tier):
+        """
+        Change the level of detail
+        """
+        if tier is not self.tier:
+            self.tier = tier
+            self.update()
+
+    def update(self):
+        """
+        According parametes to move sphere positon, hide it when the sun is under the horizon
+        """
+        state = gol.state
+        resolution = state.sphere_resolution if self.tier.sphere_resolution is None else self.tier.sphere_resolution
+        if not (state.sun_state and resolution):
+            if self._transform.visible:
+                self._transform.visible = False
+            return
+        x, y, z = position = state.pathmodel.cur_sun_position()
+        visible = y > 0
+        if self._transform.visible != visible:
+            self._transform.visible = visible
+        if not visible:
+            return
+
+        # The sun position is only applied through the transform
+        if position != self._position:
+            self._transform.transform = sc.Matrix44.get_translation_matrix(x, y, z)
+            self._position = position
+        if self._curve is None:
+            with self._transform:
+                self._curve = draw_base_sphere(resolution)
+        elif resolution != self._resolution:
+            self._curve.positions = sphere_mesh(1.0, resolution).tolist()
+        self._resolution = resolution
@@ -1,212 +1,338 @@
 __all__ = ["DrawSunpath"]
 
-import math
+import numpy as np
 from omni.ui import scene as sc
 from omni.ui import color as cl
 import omni.ui as ui
 from .sunpath_data import SunpathData
+from .lod import LOD_TIERS
+from .sunpath_geometry import (
+    PATH_DATES,
+    pack_polylines,
+    DiagramGeometry,
+    day_paths,
+    compass_labels,
+    gesture_block,
+    circle_points,
+)
 
 from . import gol
 
+# Ramp of the day path colors by clear sky DNI (W/m2), from low sun to full sun
+IRRADIANCE_LEVELS = (0.0, 300.0, 700.0, 1000.0)
+IRRADIANCE_RAMP = ((0.25, 0.3, 0.7), (0.85, 0.35, 0.2), (1.0, 0.7, 0.15), (1.0, 0.95, 0.6))
+
 
 class DrawSunpath:
-    def __init__(self, pathmodel: SunpathData, move_ges):
+    """
+    Draw sunpath diagram, items are created once and updated in place
+
+    The geometry comes from `sunpath_geometry` as float32 buffers of radius 1, relative to the
+    origin: the enclosing transforms place and scale the diagram. The level of detail tier (see `lod`)
+    drops or coarsens the thin curves and the labels of far away diagrams.
+
+    settings (`state.DiagramSettings`, the active diagram by default) give the color. Diagrams drawn
+    at once pass the same `DiagramGeometry`, so they share its buffers and position lists.
+    """
+
+    # Polylines of a group which is not drawn in the tier, its curves are hidden
+    NOTHING = pack_polylines([], [])
+
+    def __init__(self, pathmodel: SunpathData, move_ges, settings=None, geometry: DiagramGeometry = None):
         self.move_ges = move_ges
         self.pathmodel = pathmodel
-        self.origin = gol.get_value("origin")
-        self.scale = gol.get_value("scale") * 200
-        self.color = cl(*gol.get_value("color"))
-        # Draw sunpath
-        self.draw_anydate_path(self.pathmodel, self.pathmodel.datevalue, cl.documentation_nvidia, 1.5)
-        self.draw_paths()
-        self.draw_compass()
-        if gol.get_value("show_info"):
-            self.show_info()
+        self.settings = settings or gol.state.diagram
+        self.path_cache = gol.state.path_cache
+        self.geometry = geometry
+        # Times the "geometry" and "scene_items" stages
+        self.timer = gol.state.profiler
+        # Radius of the drawn diagram, the scale of the diagram is a transform
+        self.scale = 1.0
+        self.tier = LOD_TIERS[0]
 
-    def sort_points(self, points):
+        # Handles of the scene items, keyed by the element they draw
+        self._curves = {}
+        self._labels = {}
+        self._gesture_block = None
+        self._gesture_values = None
+        # Points, (colors, thickness) and label values last handed to every item, unchanged values
+        # are not sent again
+        self._buffers = {}
+        self._styles = {}
+        self._label_values = {}
+        # Keys drawn by every group, curves of runs which disappeared are hidden
+        self._group_keys = {}
+
+        self._container = sc.Transform()
+        self.update(geometry)
+
+    def update(self, geometry: DiagramGeometry = None):
         """
-        Resort the points to make sure they connect to a reasonable curve
+        Update positions, colors and text of the diagram, create the items which do not exist yet
+
+        geometry is the shared geometry of the current location and date, the diagram builds its own
+        when it is not given and the previous one is out of date.
         """
-        x_points = list(filter(lambda p: p[0] < 0, points))
-        if len(x_points) != 0:
-            y_min = min(x_points, key=lambda p: p[1])
-            id = points.index(y_min) + 1
-            return points[id:] + points[:id]
-        return points
+        if geometry is not None:
+            self.geometry = geometry
+        elif self.geometry is None or self.geometry.key != DiagramGeometry.make_key(self.pathmodel, self.path_cache):
+            self.geometry = DiagramGeometry(self.pathmodel, self.path_cache)
+        self.color = cl(*self.settings.color)
+        with self._container:
+            # Draw sunpath
+            current_color = self.group_colors()[("day", "current")]
+            self.draw_anydate_path(self.pathmodel, self.pathmodel.datevalue, current_color, 1.5)
+            self.draw_paths()
+            self.draw_compass()
+            self.show_info(gol.state.show_info)
 
-    def points_modify(self, points):
+    def set_tier(self, tier, geometry: DiagramGeometry = None):
         """
-        Change the coordinates of the point based on the origin
+        Change the level of detail, the items of the new tier are updated
         """
-        s_points = []
-        for pt in points:
-            x = pt[0] * self.scale + self.origin[0]
-            y = pt[1] * self.scale + self.origin[1]
-            z = pt[2] * self.scale + self.origin[2]
-            newpt = [x, y, z]
-            s_points.append(newpt)
-        return s_points
+        if tier is self.tier:
+            return
+        self.tier = tier
+        self.update(geometry)
 
-    def generate_circle_pts(self, offset, step):
+    def restyle(self):
         """
-        Generate the points that make up the circle or present anchor point
+        Apply the diagram color, the irradiance colors and the information toggle, the geometry is kept
         """
-        points = []
-        sep = 2 * math.pi / 360
-        for angle in range(0, 361, step):
-            x = self.origin[0] + self.scale * math.cos(sep * angle) * offset
-            z = self.origin[2] + self.scale * math.sin(sep * angle) * offset
-            points.append([round(x, 3), 0, round(z, 3)])
-        return points
+        self.color = cl(*self.settings.color)
+        with self.timer.stage("scene_items"):
+            for group, color in self.group_colors().items():
+                for key in self._group_keys.get(group, ()):
+                    colors = self.curve_colors(key, self._buffers[key], color)
+                    colors_, thickness = self._styles[key]
+                    if colors != colors_:
+                        self._curves[key].colors = colors
+                        self._styles[key] = (colors, thickness)
+        self.update_info()
 
-    def draw_circle(self, offset, step, color, thickness):
+    def group_colors(self):
         """
-        Connet points to draw a circle
+        Color of the groups of curves which depend on the style, day paths are colored by irradiance
+        when it is on (the color is then a function of the curve key and points)
         """
-        points = self.generate_circle_pts(offset, step)
-        sc.Curve(points, thicknesses=[thickness], colors=[color], curve_type=sc.Curve.CurveType.LINEAR)
+        day_color = self.irradiance_colors if gol.state.irradiance_colors else None
+        return {
+            ("day", "current"): day_color or cl.documentation_nvidia,
+            "highlighted": day_color or self.color,
+            "day": day_color or cl.grey,
+            "hour": self.color,
+            "circle": self.color,
+        }
 
-    def draw_drections(self):
+    def irradiance_colors(self, key, points):
         """
-        Draw cross line and mark main directions
+        Colors of the points of a day path by clear sky DNI
+        """
+        datevalue = self.pathmodel.datevalue if key[1] == "current" else key[1]
+        dni, _, _ = self.pathmodel.path_irradiance(points, datevalue)
+        rgb = np.stack([np.interp(dni, IRRADIANCE_LEVELS, channel) for channel in zip(*IRRADIANCE_RAMP)], axis=-1)
+        return [cl(*color) for color in rgb.tolist()]
+
+    @staticmethod
+    def curve_colors(key, points, color):
+        """
+        Colors of a curve, one color or a function of the curve key and points giving one per point
+        """
+        return color(key, points) if callable(color) else [color]
+
+    def update_info(self):
+        """
+        Update the information labels only, when the time changed
+        """
+        with self._container:
+            self.show_info(gol.state.show_info)
+
+    def set_curve(self, key, points, color, thickness, positions=None):
+        """
+        Create the curve of key or update it, hide it when there are not enough points
+
+        color is one color or a function of key and points giving one color per point (see `curve_colors`).
+        positions is points as a list when it is already built, it is not copied.
         """
-        # Generate anchor point
-        points_a = self.generate_circle_pts(1.15, 90)
-        points_b = self.generate_circle_pts(1.25, 90)
-        points_c = self.generate_circle_pts(1.15, 2)
-        points_t = self.generate_circle_pts(1.33, 90)
-
-        for pt in points_b:
-            sc.Curve([pt, self.origin], thicknesses=[1.0], colors=[cl.gray], curve_type=sc.Curve.CurveType.LINEAR)
-        arrow = []
-        for i in range(1, 181, 45):
-            arrow.append(points_c[i])
-        # Draw arrow
-        for p_a, p_b, p_c in zip(points_a, points_b, arrow):
-            sc.Curve(
-                [p_b, p_c, p_a, p_b],
-                thicknesses=[1.5],
-                colors=[cl.documentation_nvidia],
+        curve = self._curves.get(key)
+        if len(points) < 2:
+            if curve is not None and curve.visible:
+                curve.visible = False
+            return
+        colors = self.curve_colors(key, points, color)
+        if curve is None:
+            self._curves[key] = sc.Curve(
+                positions or points.tolist(),
+                thicknesses=[thickness],
+                colors=colors,
                 curve_type=sc.Curve.CurveType.LINEAR,
             )
-        # Draw diretions label
-        text = ["E", "S", "W", "N"]
-        for i in range(4):
-            x, y, z = points_t[i]
-            with sc.Transform(transform=sc.Matrix44.get_translation_matrix(x, y, z)):
-                sc.Label(text[i], alignment=ui.Alignment.CENTER, color=cl.documentation_nvidia, size=20)
+        else:
+            previous = self._buffers.get(key)
+            if previous is not points and not (previous.shape == points.shape and np.array_equal(previous, points)):
+                curve.positions = positions or points.tolist()
+            colors_, thickness_ = self._styles[key]
+            if colors != colors_:
+                curve.colors = colors
+            if thickness != thickness_:
+                curve.thicknesses = [thickness]
+            if not curve.visible:
+                curve.visible = True
+        self._buffers[key] = points
+        self._styles[key] = (colors, thickness)
+
+    def set_label(self, key, text, position, alignment, color, size, visible=True):
+        """
+        Create the label of key (and its transform) or update it
+        """
+        position = list(position)
+        item = self._labels.get(key)
+        if item is None:
+            if not visible:
+                return
+            transform = sc.Transform(transform=sc.Matrix44.get_translation_matrix(*position))
+            with transform:
+                label = sc.Label(text, alignment=alignment, color=color, size=size)
+            self._labels[key] = (transform, label)
+        else:
+            transform, label = item
+            position_, text_, color_, visible_ = self._label_values[key]
+            if position != position_:
+                transform.transform = sc.Matrix44.get_translation_matrix(*position)
+            if visible != visible_:
+                transform.visible = visible
+            if text != text_:
+                label.text = text
+            if color != color_:
+                label.color = color
+        self._label_values[key] = (position, text, color, visible)
+
+    def draw_polylines(self, group, polylines, color, thickness):
+        """
+        Hand every polyline of a packed group to its curve, hide the curves the group no longer has
+        """
+        with self.timer.stage("scene_items"):
+            for key, points, positions in self.geometry.items(polylines):
+                self.set_curve(key, points, color, thickness, positions)
+            for key in self._group_keys.get(group, set()).difference(polylines.keys):
+                if self._curves[key].visible:
+                    self._curves[key].visible = False
+            self._group_keys[group] = set(polylines.keys) & self._curves.keys()
+
+    def draw_drections(self):
+        """
+        Draw cross line and mark main directions
+        """
+        compass = self.geometry.compass(self.tier.circle_step)
+        self.draw_polylines("cross", compass["cross"], cl.gray, 1.0)
+        self.draw_polylines("arrow", compass["arrow"], cl.documentation_nvidia, 1.5)
 
     def draw_drection_mark(self):
         """
         Draw degrees directions and add a move gesture
         """
-        points_a = self.generate_circle_pts(1, 30)
-        points_b = self.generate_circle_pts(1.06, 30)
-        points_g = self.generate_circle_pts(1.03, 90)
-        points_t = self.generate_circle_pts(1.1, 30)
+        ticks = self.geometry.compass(self.tier.circle_step)["tick"] if self.tier.ticks else self.NOTHING
+        self.draw_polylines("tick", ticks, cl.documentation_nvidia, 1.5)
 
-        # Compute length of tick-mark line
-        length = points_b[3][2] - points_a[3][2]
-        gol.set_value("length", length)
+        # Length of tick-mark line
+        (x, y, z), length = gesture_block(self.scale)
+        gol.state.length = length
 
         # Add move gesture block
-        x, y, z = points_g[3]
-        with sc.Transform(transform=sc.Matrix44.get_translation_matrix(x, y, z)):
-            sc.Rectangle(
-                axis=ui.Axis.X,
-                color=cl.documentation_nvidia,
-                width=length / 2,
-                height=length,
-                gesture=self.move_ges,
-            )
-
-        # Add tick-mark line
-        for p1, p2 in zip(points_a, points_b):
-            sc.Curve(
-                [p1, p2], thicknesses=[1.5], colors=[cl.documentation_nvidia], curve_type=sc.Curve.CurveType.LINEAR
-            )
-
-        # Add degree label
-        text = [f"{d}" for d in list(range(0, 361, 30))]
-        text = text[3:12] + text[:3]
-        for i in range(12):
-            x, y, z = points_t[i]
-            with sc.Transform(transform=sc.Matrix44.get_translation_matrix(x, y, z)):
-                sc.Label(text[i], alignment=ui.Alignment.CENTER, color=cl.documentation_nvidia, size=12)
+        if self._gesture_block is None:
+            transform = sc.Transform(transform=sc.Matrix44.get_translation_matrix(x, y, z))
+            with transform:
+                rectangle = sc.Rectangle(
+                    axis=ui.Axis.X,
+                    color=cl.documentation_nvidia,
+                    width=length / 2,
+                    height=length,
+                    gesture=self.move_ges,
+                )
+            self._gesture_block = (transform, rectangle)
+        elif self._gesture_values != ((x, y, z), length):
+            transform, rectangle = self._gesture_block
+            transform.transform = sc.Matrix44.get_translation_matrix(x, y, z)
+            rectangle.width = length / 2
+            rectangle.height = length
+        self._gesture_values = ((x, y, z), length)
 
-    def draw_anydate_path(self, pathmodel: SunpathData, datevalue: int, color, thickness):
+    def draw_labels(self):
         """
-        The method to draw the path of sun on exact date
+        Draw directions and degree labels
         """
-        points = pathmodel.all_day_position(datevalue)
-        sort_pts = self.sort_points(points)
-        scale_pts = self.points_modify(sort_pts)
-        if len(scale_pts) > 0:
-            sc.Curve(scale_pts, thicknesses=[thickness], colors=[color], curve_type=sc.Curve.CurveType.LINEAR)
+        labels = self.tier.labels
+        with self.timer.stage("scene_items"):
+            for key, text, position in compass_labels(self.scale):
+                size = 20 if key[0] == "direction" else 12
+                visible = labels == "all" or (labels == "directions" and key[0] == "direction")
+                position = position.tolist()
+                self.set_label(key, text, position, ui.Alignment.CENTER, cl.documentation_nvidia, size, visible)
 
-    def draw_sametime_position(self, pathmodel: SunpathData, hour, color, thickness):
+    def draw_anydate_path(self, pathmodel: SunpathData, datevalue: int, color, thickness, key="current"):
         """
-        The method to draw the path of sun on diffrent date but in same time,'8' shape curve
+        The method to draw the path of sun on exact date
         """
-        points = pathmodel.all_year_sametime_position(hour)
-        sort_pts = self.sort_points(points)
-        scale_pts = self.points_modify(sort_pts)
-        if len(scale_pts) > 0:
-            sc.Curve(scale_pts, thicknesses=[thickness], colors=[color], curve_type=sc.Curve.CurveType.LINEAR)
+        with self.timer.stage("geometry"):
+            if pathmodel is self.pathmodel:
+                polylines = self.geometry.day_paths([datevalue], keys=[("day", key)])
+            else:
+                polylines = day_paths(pathmodel, [datevalue], self.scale, keys=[("day", key)])
+        self.draw_polylines(("day", key), polylines, color, thickness)
 
     def draw_multi_sametime_position(self, pathmodel: SunpathData, color, thickness):
         """
-        Draw twenty four '8' shape curves
+        Draw twenty four '8' shape curves, fewer or none in the far tiers
         """
-        for h in range(0, 24, 1):
-            self.draw_sametime_position(pathmodel, h, color, thickness)
+        stride = self.tier.hour_stride
+        polylines = self.NOTHING
+        if stride:
+            with self.timer.stage("geometry"):
+                polylines = self.geometry.sametime_paths(range(0, 24, stride))
+        self.draw_polylines("hour", polylines, color, thickness)
 
     def draw_paths(self):
         """
-        Draw diffrent path
+        Draw diffrent path, the first three dates are highlighted
         """
-        self.draw_anydate_path(self.pathmodel, 172, self.color, 1.3)
-        self.draw_anydate_path(self.pathmodel, 355, self.color, 1.3)
-        self.draw_anydate_path(self.pathmodel, 80, self.color, 1.3)
-        self.draw_anydate_path(self.pathmodel, 110, cl.grey, 1.0)
-        self.draw_anydate_path(self.pathmodel, 295, cl.grey, 1.0)
+        highlighted, others = PATH_DATES[:3], PATH_DATES[3:]
+        with self.timer.stage("geometry"):
+            highlighted_paths = self.geometry.day_paths(highlighted)
+            other_paths = self.NOTHING
+            if self.tier.other_days:
+                other_paths = self.geometry.day_paths(others)
+        colors = self.group_colors()
+        self.draw_polylines("highlighted", highlighted_paths, colors["highlighted"], 1.3)
+        self.draw_polylines("day", other_paths, colors["day"], 1.0)
         self.draw_multi_sametime_position(self.pathmodel, self.color, 0.5)
 
     def draw_compass(self):
         """
         Draw entire compass
         """
-        self.draw_circle(1, 1, self.color, 1.1)
-        self.draw_circle(1.04, 1, self.color, 1.1)
+        self.draw_polylines("circle", self.geometry.compass(self.tier.circle_step)["circle"], self.color, 1.1)
         self.draw_drections()
         self.draw_drection_mark()
+        self.draw_labels()
 
-    def show_info(self):
+    def show_info(self, visible=True):
         """
-        Draw information label
+        Draw information label, hide them when visible is False or the tier has no labels
         """
-        anchor = self.generate_circle_pts(1.5, 90)
+        visible = visible and self.tier.labels is not None
+        anchor = circle_points(1.5, 90, self.scale).tolist()
         anchor_e = anchor[0]
         anchor_w = anchor[2]
         anchor_n = anchor[3]
-        with sc.Transform(transform=sc.Matrix44.get_translation_matrix(*anchor_e)):
-            sc.Label(
-                f"sunrise: {self.pathmodel.get_sunrise_time()}".upper(),
-                alignment=ui.Alignment.RIGHT_CENTER,
-                color=cl.beige,
-                size=16,
-            )
-        with sc.Transform(transform=sc.Matrix44.get_translation_matrix(*anchor_w)):
-            sc.Label(
-                f"sunset: {self.pathmodel.get_sunset_time()}".upper(),
-                alignment=ui.Alignment.LEFT_CENTER,
-                color=cl.beige,
-                size=16,
-            )
-        with sc.Transform(transform=sc.Matrix44.get_translation_matrix(*anchor_n)):
-            sc.Label(
-                f"datetime: {self.pathmodel.get_cur_time()}".upper(),
-                alignment=ui.Alignment.LEFT_CENTER,
-                color=cl.beige,
-                size=16,
-            )
+        if visible:
+            # Sunrise and sunset come from the cached whole year table
+            sunrise = f"sunrise: {self.pathmodel.get_sunrise_time() or 'none'}".upper()
+            sunset = f"sunset: {self.pathmodel.get_sunset_time() or 'none'}".upper()
+            zone = self.pathmodel.zone or f"UTC{self.pathmodel.tz:+g}"
+            cur_time = f"datetime: {self.pathmodel.get_cur_time()} {zone}".upper()
+        else:
+            sunrise = sunset = cur_time = ""
+        with self.timer.stage("scene_items"):
+            self.set_label("sunrise", sunrise, anchor_e, ui.Alignment.RIGHT_CENTER, cl.beige, 16, visible)
+            self.set_label("sunset", sunset, anchor_w, ui.Alignment.LEFT_CENTER, cl.beige, 16, visible)
+            self.set_label("datetime", cur_time, anchor_n, ui.Alignment.LEFT_CENTER, cl.beige, 16, visible)
@@ -0,0 +1,137 @@
+"""Precomputed sun position tables, memory-mapped for lookup
+
+A table stores one year of unit sun vectors of a site (lat, lon, tz) sampled every `step`
+minutes (local time) as float32, after a fixed size header. The file is opened read only
+with numpy.memmap, so several sessions using the same table share its pages. With the
+default step of 5 minutes the interpolated altitude stays within 0.01 degree of live computation
+above the horizon.
+
+Build a table from command line:
+    python -m hnadi.tools.sunpath.ephemeris_table --lat 28.12 --lon 112.94 --tz 8 --year 2022 --out tables
+"""
+
+__all__ = ["EphemerisTable", "build_table", "table_path", "find_table"]
+
+import os
+import struct
+import argparse
+import numpy as np
+from functools import lru_cache
+from .solar_position import to_datetime64, sun_vectors
+from .timezone import lookup_zone, zone_offsets
+
+MAGIC = b"SUNPATH1"
+# magic, lat, lon, tz, year, step (seconds), count, start (local epoch seconds)
+HEADER = struct.Struct("<8sdddiiiq")
+# Data starts on a 64 bytes boundary
+DATA_OFFSET = 64
+
+# Decimal places of latitude and longitude kept in table file names
+PRECISION = 2
+
+
+def table_path(directory, lat, lon, tz, year):
+    """
+    Get the file path of the table of a site
+    """
+    name = f"sunpath_{lat:.{PRECISION}f}_{lon:.{PRECISION}f}_{tz:g}_{year}.eph"
+    return os.path.join(directory, name)
+
+
+def build_table(directory, lat, lon, tz, year, step=5):
+    """
+    Compute one year of sun positions of a site and write them to a table, return the file path
+    """
+    lat, lon = round(lat, PRECISION), round(lon, PRECISION)
+    start = np.datetime64(f"{year}-01-01T00:00", "s")
+    end = np.datetime64(f"{year + 1}-01-01T00:00", "s")
+    # Include the first sample of next year, so every time of the year can be interpolated
+    result = sun_vectors(start, end + np.timedelta64(int(step * 60), "s"), step, lat, lon, tz, np.float32)
+
+    path = table_path(directory, lat, lon, tz, year)
+    os.makedirs(directory, exist_ok=True)
+    header = HEADER.pack(MAGIC, lat, lon, tz, year, int(step * 60), len(result.times), int(start.astype(np.int64)))
+    # Write to a temporary file first, sessions reading the table never see a partial file
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(header.ljust(DATA_OFFSET, b"\0"))
+        f.write(np.ascontiguousarray(result.vectors, dtype="<f4").tobytes())
+    os.replace(temp_path, path)
+    return path
+
+
+class EphemerisTable:
+    """Read only, memory-mapped sun position table"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, lat, lon, tz, year, step, count, start = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a sunpath ephemeris table")
+        self.path = path
+        self.lat = lat
+        self.lon = lon
+        self.tz = tz
+        self.year = year
+        self.step = step
+        self.start = start
+        self.vectors = np.memmap(path, dtype="<f4", mode="r", offset=DATA_OFFSET, shape=(count, 3))
+
+    def covers(self, times):
+        """
+        Whether all local times are inside the table
+        """
+        seconds = to_datetime64(times).astype(np.int64)
+        last = self.start + (len(self.vectors) - 1) * self.step
+        return bool(np.all((seconds >= self.start) & (seconds <= last)))
+
+    def sun_positions(self, times):
+        """
+        Interpolate sun altitude, azimuth (degrees) and unit vectors of local times
+        """
+        offset = (to_datetime64(times).astype(np.int64) - self.start) / self.step
+        offset = np.clip(np.atleast_1d(offset), 0, len(self.vectors) - 1)
+        index = np.minimum(offset.astype(np.int64), len(self.vectors) - 2)
+        frac = (offset - index)[..., None]
+
+        vectors = self.vectors[index] * (1.0 - frac) + self.vectors[index + 1] * frac
+        vectors /= np.linalg.norm(vectors, axis=-1, keepdims=True)
+        alt = np.degrees(np.arcsin(np.clip(vectors[..., 1], -1.0, 1.0)))
+        azm = np.mod(np.degrees(np.arctan2(vectors[..., 0], -vectors[..., 2])), 360.0)
+        return alt, azm, vectors
+
+
+@lru_cache(maxsize=32)
+def find_table(directory, lat, lon, tz, year):
+    """
+    Open the table of a site if it exists in directory, otherwise return None
+
+    Results are cached, call `find_table.cache_clear()` after building new tables.
+    """
+    if not directory:
+        return None
+    path = table_path(directory, round(lat, PRECISION), round(lon, PRECISION), tz, year)
+    if not os.path.isfile(path):
+        return None
+    return EphemerisTable(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute a year of sun positions of a site")
+    parser.add_argument("--lat", type=float, required=True, help="latitude, North is +ve")
+    parser.add_argument("--lon", type=float, required=True, help="longitude, West is -ve")
+    parser.add_argument("--tz", type=float, default=None, help="standard UTC offset, default the one of the site zone")
+    parser.add_argument("--year", type=int, required=True)
+    parser.add_argument("--step", type=float, default=5, help="sampling step in minutes")
+    parser.add_argument("--out", default=".", help="output directory")
+    args = parser.parse_args(argv)
+
+    tz = args.tz
+    if tz is None:
+        offsets = zone_offsets(lookup_zone(args.lat, args.lon), args.year)
+        tz = round(args.lon / 15) if offsets is None else offsets.standard
+    print(build_table(args.out, args.lat, args.lon, tz, args.year, args.step))
+
+
+if __name__ == "__main__":
+    main()
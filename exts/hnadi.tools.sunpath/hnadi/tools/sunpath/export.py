@@ -0,0 +1,97 @@
+"""Write sunpath diagram geometry as JSON, OBJ polylines or USDA BasisCurves
+
+Only text is written, neither pxr nor Kit is needed.
+"""
+
+__all__ = ["FORMATS", "element_name", "to_json", "to_obj", "to_usda"]
+
+import json
+
+
+def element_name(key):
+    """
+    Name of a diagram element usable as an OBJ object or USD prim name, ("circle", 1.04) -> "circle_1_04"
+    """
+    parts = key if isinstance(key, tuple) else (key,)
+    return "_".join(str(part).replace(".", "_").replace("-", "m") for part in parts)
+
+
+def _polylines(curves):
+    """
+    Curves with at least two points, as (name, points) pairs
+    """
+    return [(element_name(key), points) for key, points in curves.items() if len(points) >= 2]
+
+
+def _vec(point):
+    return f"{point[0]:.6g} {point[1]:.6g} {point[2]:.6g}"
+
+
+def to_json(curves, labels=(), meta=None):
+    """
+    {"meta": ..., "curves": {name: [[x, y, z], ...]}, "labels": [{"name", "text", "position"}]}
+    """
+    data = {
+        "meta": meta or {},
+        "curves": {name: points.tolist() for name, points in _polylines(curves)},
+        "labels": [
+            {"name": element_name(key), "text": text, "position": [float(v) for v in position]}
+            for key, text, position in labels
+        ],
+    }
+    return json.dumps(data, indent=1)
+
+
+def to_obj(curves, meta=None):
+    """
+    One object of one polyline ("l" element) per curve
+    """
+    lines = [f"# {key}: {value}" for key, value in (meta or {}).items()]
+    index = 1
+    for name, points in _polylines(curves):
+        lines.append(f"o {name}")
+        lines.extend(f"v {_vec(point)}" for point in points.tolist())
+        lines.append("l " + " ".join(str(i) for i in range(index, index + len(points))))
+        index += len(points)
+    return "\n".join(lines) + "\n"
+
+
+def to_usda(curves, meta=None, up_axis="Y", width=1.0):
+    """
+    A layer with one linear BasisCurves prim per curve under the "/Sunpath" Xform
+    """
+    doc = json.dumps(json.dumps(meta or {}))
+    lines = [
+        "#usda 1.0",
+        "(",
+        '    defaultPrim = "Sunpath"',
+        f'    upAxis = "{up_axis}"',
+        f"    doc = {doc}",
+        ")",
+        "",
+        'def Xform "Sunpath"',
+        "{",
+    ]
+    for name, points in _polylines(curves):
+        points_text = ", ".join(f"({_vec(point).replace(' ', ', ')})" for point in points.tolist())
+        lines += [
+            f'    def BasisCurves "{name}"',
+            "    {",
+            '        uniform token type = "linear"',
+            f"        int[] curveVertexCounts = [{len(points)}]",
+            f"        point3f[] points = [{points_text}]",
+            f"        float[] widths = [{width:g}] (",
+            '            interpolation = "constant"',
+            "        )",
+            "    }",
+        ]
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+# Output format name to writer, writers take (curves, labels, meta)
+FORMATS = {
+    "json": to_json,
+    "obj": lambda curves, labels, meta: to_obj(curves, meta),
+    "usda": lambda curves, labels, meta: to_usda(curves, meta),
+}
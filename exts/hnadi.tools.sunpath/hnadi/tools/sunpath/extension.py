@@ -1,21 +1,32 @@
 __all__ = ["SunpathExtension"]
 
+import time
 from .window import SunpathWindow
 from functools import partial
 import asyncio
+import numpy as np
+import carb
 import omni.ext
 import omni.kit.ui
 import omni.ui as ui
+import omni.usd
 from omni.kit.viewport.utility import get_active_viewport_window
 from .viewport_scene import ViewportScene
 from .sunlight_manipulator import SunlightManipulator
+from .update_scheduler import UpdateScheduler
+from .path_sampling import PathSampling
+from .sun_hours import analyze_prims
+from .state import FIELD_GROUPS
+from . import _import_start
 
-# Import global dictionary
+# Import global state
 from . import gol
 
-# Initialize dictionary
+# Initialize state
 gol._init()
 
+_import_time = time.perf_counter() - _import_start
+
 
 class SunpathExtension(omni.ext.IExt):
 
@@ -31,12 +42,27 @@ class SunpathExtension(omni.ext.IExt):
         self._show_path = False
         self._show_sun = False
         # Preset path model and sunlight model
-        self.pathmodel = gol.get_value("pathmodel")
+        self.pathmodel = gol.state.pathmodel
         self.sunlightmodel = SunlightManipulator(self.pathmodel)
+        # Timing of the update stages, shown in the stats panel
+        self.profiler = gol.state.profiler
+        # Merge slider changes, at most one redraw per app update
+        self._scheduler = None
+        # Field groups of the state changed since the last redraw
+        self._dirty = set()
+        # Draft or final sampling of the paths
+        self.sampling = PathSampling(gol.state)
+        self._unsubscribe = None
 
     def on_startup(self, ext_id):
+        startup_start = time.perf_counter()
         # Add ext_id key value
         self.ext_id = ext_id
+        self._scheduler = UpdateScheduler(
+            self.set_parameter, self._scheduled_update, events=("add_diagram", "remove_diagram")
+        )
+        self._unsubscribe = gol.state.subscribe(self._dirty.add)
+        self.sampling.apply(final=True)
 
         # The ability to show up the window if the system requires it. We use it
         # in QuickLayout.
@@ -50,10 +76,21 @@ class SunpathExtension(omni.ext.IExt):
         # Show the window. It will call `self.show_window`
         ui.Workspace.show_window(SunpathExtension.WINDOW_NAME)
 
+        # Report load time, import and on_startup
+        startup_time = time.perf_counter() - startup_start
+        gol.state.startup_time = {"import": _import_time, "on_startup": startup_time}
+        carb.log_info(f"[{ext_id}] import {_import_time * 1000:.1f} ms, on_startup {startup_time * 1000:.1f} ms")
+
     def on_shutdown(self):
         """
         Destroy viewport scene and window
         """
+        if self._scheduler:
+            self._scheduler.cancel()
+            self._scheduler = None
+        if self._unsubscribe:
+            self._unsubscribe()
+            self._unsubscribe = None
         if self._viewport_scene:
             self._viewport_scene.destroy()
             self._viewport_scene = None
@@ -87,53 +124,139 @@ class SunpathExtension(omni.ext.IExt):
         else:
             self._show_sun = value
             self.sunlightmodel.del_sun()
-        gol.set_value("sun_state", value)
+        gol.state.sun_state = value
 
-    def update_viewport_scene(self):
+    def bake_sun(self, span):
+        """
+        Bake the sunlight of the current date ("day") or of the whole year ("year") into time samples,
+        "clear" removes them, this dropped into the window file
+        """
+        if span == "clear":
+            count = self.sunlightmodel.clear_bake()
+            carb.log_info(f"Cleared {count} sun samples on {self.sunlightmodel.path}")
+            return
+        if span == "day":
+            count = self.sunlightmodel.bake_day(self.pathmodel.datevalue)
+        else:
+            count = self.sunlightmodel.bake_year()
+        carb.log_info(f"Baked {count} sun samples on {self.sunlightmodel.path}")
+
+    def sun_hours(self, span):
+        """
+        Compute direct sun hours of the selected meshes for the current date ("day") or the whole year ("year"),
+        the result is written to the "sunHours" primvar, this dropped into the window file
+        """
+        context = omni.usd.get_context()
+        paths = context.get_selection().get_selected_prim_paths()
+        if not paths:
+            carb.log_warn("Select mesh prims to compute sun hours")
+            return
+        pathmodel = self.pathmodel
+        if span == "day":
+            start = pathmodel.slider_times(pathmodel.datevalue)
+            end = start + np.timedelta64(1, "D")
+        else:
+            start = np.datetime64(f"{pathmodel.year}-01-01T00:00")
+            end = np.datetime64(f"{pathmodel.year + 1}-01-01T00:00")
+
+        step = gol.state.sun_hours_step[span]
+        density = gol.state.sun_hours_density
+        start_time = time.perf_counter()
+        results = analyze_prims(
+            context.get_stage(), paths, start, end, step, pathmodel.lat, pathmodel.lon, pathmodel.utc_offsets, density
+        )
+        samples = sum(len(result.hours) for result in results.values())
+        seconds = time.perf_counter() - start_time
+        carb.log_info(f"Sun hours of {len(results)} meshes, {samples} points in {seconds:.2f} s")
+
+    def update_viewport_scene(self, interactive=False, groups=None):
         """
         The method to upadate viewport scene
+
+        interactive=True while a slider is dragged, the sunlight is then changed without undo entries
+        until the next non interactive update records it once. groups are the changed field groups
+        of the state, the diagram only updates what depends on them, everything by default.
         """
-        if self._show_sun:
-            self.sunlightmodel = SunlightManipulator(self.pathmodel)
-            self.sunlightmodel.path = "/World/DistantLight"
-            self.sunlightmodel.show_sun()
+        with self.profiler.stage("update"):
+            if self._show_sun:
+                with self.profiler.stage("sunlight"):
+                    self.sunlightmodel.path = "/World/DistantLight"
+                    self.sunlightmodel.show_sun(interactive)
 
-        if self._show_path:
-            if self._viewport_scene is not None:
-                self._viewport_scene.destroy()
-            self._viewport_scene = ViewportScene(self.viewport_window, self.ext_id, self.pathmodel)
+            if self._show_path:
+                with self.profiler.stage("diagram"):
+                    if self._viewport_scene is None:
+                        self._viewport_scene = ViewportScene(self.viewport_window, self.ext_id, self.pathmodel)
+                    else:
+                        self._viewport_scene.update(groups)
+
+        if self.profiler.enabled and self._window:
+            self._window.show_stats()
+
+    def _pending_groups(self, final):
+        """
+        Take the field groups changed since the last redraw, set the sampling of paths which are rebuilt
+        """
+        groups = self.sampling.groups(self._dirty, final)
+        self._dirty.clear()
+        return groups
+
+    def _scheduled_update(self, final):
+        """
+        Redraw requested by the scheduler, draft sampling while parameters keep changing
+        """
+        self.update_viewport_scene(interactive=not final, groups=self._pending_groups(final))
 
     def update_parameter(self, valtype, val):
         """
         The method to change parameters and update viewport scene, this dropped into window file
+
+        Changes are merged and applied on the next app update.
+        """
+        if self._scheduler is None:
+            self.set_parameter(valtype, val)
+            self.update_viewport_scene(groups=self._pending_groups(final=True))
+        else:
+            self._scheduler.request(valtype, val)
+
+    def set_parameter(self, valtype, val):
+        """
+        The method to change one parameter without updating viewport scene
         """
-        if valtype is None:
-            pass
-        if valtype == "show_info":
-            gol.set_value("show_info", val)
-        if valtype == 0:
-            gol.set_value("color_r", val * 255)
-        if valtype == 1:
-            gol.set_value("color_g", val * 255)
-        if valtype == 2:
-            gol.set_value("color_b", val * 255)
-        if valtype == "scale":
-            gol.set_value("scale", val)
-        if valtype == "longitude":
-            self.pathmodel.set_longitude(val)
-        if valtype == "latitude":
-            self.pathmodel.set_latitude(val)
-        if valtype == "date":
-            self.pathmodel.set_date(val)
-        if valtype == "hour":
-            self.pathmodel.set_hour(val)
-
-        # Save pathmodel to dictionary
-        gol.set_value("pathmodel", self.pathmodel)
-
-        if valtype == "minite":
-            self.pathmodel.set_min(val)
-        self.update_viewport_scene()
+        state = gol.state
+        with self.profiler.stage("parameters"):
+            if valtype is None:
+                # Update everything
+                self._dirty.update(FIELD_GROUPS)
+            if valtype == "show_info":
+                state.show_info = val
+            if valtype == "irradiance_colors":
+                state.irradiance_colors = val
+            if valtype == "show_sky":
+                state.show_sky = val
+            if valtype == "level_of_detail":
+                state.level_of_detail = val
+            if valtype == "color":
+                state.color = val
+            if valtype == "scale":
+                state.scale = val
+            if valtype == "add_diagram":
+                # val is the origin of the new diagram
+                state.add_diagram(val)
+            if valtype == "remove_diagram":
+                state.remove_diagram()
+            if valtype == "tolerance":
+                state.path_tolerance = val
+            if valtype == "longitude":
+                state.set_location(lon=val)
+            if valtype == "latitude":
+                state.set_location(lat=val)
+            if valtype == "date":
+                state.set_date(val)
+            if valtype == "hour":
+                state.set_time(hour=val)
+            if valtype == "minite":
+                state.set_time(minute=val)
 
     def _set_menu(self, value):
         """
@@ -170,6 +293,8 @@ class SunpathExtension(omni.ext.IExt):
                 delegate_2=self.sunpath_toggle,
                 delegate_3=self.sunlight_toggle,
                 delegate_4=self.update_viewport_scene,
+                delegate_5=self.bake_sun,
+                delegate_6=self.sun_hours,
                 width=360,
                 height=590,
             )
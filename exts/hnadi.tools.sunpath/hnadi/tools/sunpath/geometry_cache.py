@@ -0,0 +1,113 @@
+__all__ = ["SunpathGeometryCache"]
+
+from collections import OrderedDict
+from .sunpath_data import SunpathData
+from .profiler import StageTimer
+
+
+class SunpathGeometryCache:
+    """LRU cache of unit-sphere sun paths, keyed by location
+
+    A path is a tuple of runs above the horizon, read only float32 (N, 3) arrays.
+    """
+
+    def __init__(self, maxsize=16, precision=2, timer=None):
+        # Maximum number of locations kept in cache
+        self.maxsize = maxsize
+        # Decimal places kept of latitude and longitude when building the key
+        self.precision = precision
+        # Times the "ephemeris" stage, building the missing paths
+        self.timer = timer or StageTimer()
+
+        self._sites = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, pathmodel: SunpathData):
+        """
+        Build cache key from location, timezone, year and sampling of pathmodel
+        """
+        return (
+            round(pathmodel.lat, self.precision),
+            round(pathmodel.lon, self.precision),
+            pathmodel.tz,
+            pathmodel.year,
+            pathmodel.sampling(),
+        )
+
+    def _site(self, pathmodel: SunpathData):
+        """
+        Get (or create) the point sets of the pathmodel location, evict least recently used location
+        """
+        key = self.make_key(pathmodel)
+        site = self._sites.get(key)
+        if site is None:
+            site = {"day": {}, "hour": {}}
+            self._sites[key] = site
+            while len(self._sites) > self.maxsize:
+                self._sites.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._sites.move_to_end(key)
+        return site
+
+    def _get_many(self, pathmodel: SunpathData, kind, values, build_fn):
+        """
+        Get point sets from cache, the missing ones are built together with one call
+        """
+        points_sets = self._site(pathmodel)[kind]
+        missing = [value for value in dict.fromkeys(values) if value not in points_sets]
+        self.misses += len(missing)
+        self.hits += len(values) - len(missing)
+        if missing:
+            with self.timer.stage("ephemeris"):
+                paths = build_fn(missing)
+            for value, runs in zip(missing, paths):
+                for run in runs:
+                    run.setflags(write=False)
+                points_sets[value] = tuple(runs)
+        return [points_sets[value] for value in values]
+
+    def day_path(self, pathmodel: SunpathData, datevalue):
+        """
+        Get sun path runs of exact date
+        """
+        return self.day_paths(pathmodel, [datevalue])[0]
+
+    def day_paths(self, pathmodel: SunpathData, datevalues):
+        """
+        Get sun path runs of several dates
+        """
+        return self._get_many(pathmodel, "day", list(datevalues), pathmodel.day_path_runs)
+
+    def sametime_path(self, pathmodel: SunpathData, hour):
+        """
+        Get all year sametime runs ('8' shape curve)
+        """
+        return self.sametime_paths(pathmodel, [hour])[0]
+
+    def sametime_paths(self, pathmodel: SunpathData, hours):
+        """
+        Get all year sametime runs of several hours
+        """
+        return self._get_many(pathmodel, "hour", list(hours), pathmodel.sametime_runs)
+
+    def stats(self):
+        """
+        Get cache counters
+        """
+        return {
+            "sites": len(self._sites),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def clear(self):
+        """
+        Drop all cached point sets and reset counters
+        """
+        self._sites.clear()
+        self.hits = self.misses = self.evictions = 0
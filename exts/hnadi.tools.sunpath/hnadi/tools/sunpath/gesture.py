@@ -30,18 +30,23 @@ class _ViewportLegacyDisableSelection:
 class MoveGesture(sc.DragGesture):
     """Define the action of gesture"""
 
-    def __init__(self, transform: sc.Transform):
+    def __init__(self, transform: sc.Transform, settings=None):
         super().__init__()
         self.__transform = transform
+        # DiagramSettings of the moved diagram, the active one by default
+        self._settings = settings
         self._previous_ray_point = None
         self._pre_origin = None
 
     def on_began(self):
         self.sender.color = cl.beige
-        self.sender.width = gol.get_value("length")
+        self.sender.width = gol.state.length
         self.disable_selection = _ViewportLegacyDisableSelection()
         self._previous_ray_point = self.gesture_payload.ray_closest_point
-        self._pre_origin = gol.get_value("origin")
+        if self._settings is not None:
+            # The moved diagram becomes the one edited by the window
+            gol.state.set_active(self._settings)
+        self._pre_origin = gol.state.origin
 
     def on_changed(self):
         translate = self.sender.gesture_payload.moved
@@ -53,11 +58,11 @@ class MoveGesture(sc.DragGesture):
         # Compute translation vector(point)
         moved = [a - b for a, b in zip(object_ray_point, self._previous_ray_point)]
 
-        # Compute new origin and save it to dictionary
+        # Compute new origin and save it to the state
         origin = [a + b for a, b in zip(self._pre_origin, moved)]
-        gol.set_value("origin", origin)
+        gol.state.origin = origin
 
     def on_ended(self):
         self.sender.color = cl.documentation_nvidia
-        self.sender.width = gol.get_value("length") / 2
+        self.sender.width = gol.state.length / 2
         self.disable_selection = None
@@ -0,0 +1,82 @@
+"""Split sampled sun paths into runs above the horizon with exact horizon-crossing ends"""
+
+__all__ = ["horizon_runs"]
+
+import numpy as np
+from .adaptive_sampling import split_curves
+
+# Regula falsi (Illinois) iterations at most, every one is a single evaluation of all crossings
+ROOT_ITERATIONS = 6
+# Height on the unit sphere below which a crossing is on the horizon, by default
+ROOT_TOLERANCE = 1e-5
+
+
+def _crossing_points(fn, params_a, params_b, y_a, y_b, curves, tolerance):
+    """
+    Find the points where the curves cross y = 0 between params_a and params_b, y_a and y_b have opposite signs
+    """
+    a, b = params_a.copy(), params_b.copy()
+    ya, yb = y_a.copy(), y_b.copy()
+    points = np.zeros((len(a), 3))
+    for _ in range(ROOT_ITERATIONS):
+        if len(a) == 0:
+            break
+        t = b - yb * (b - a) / (yb - ya)
+        points = np.asarray(fn(t, curves), dtype=np.float64)
+        yt = points[:, 1]
+        if np.abs(yt).max() < tolerance:
+            break
+        # Keep the root bracketed, halve the value of the end kept twice (Illinois)
+        flip = np.sign(yt) != np.sign(yb)
+        a, ya = np.where(flip, b, a), np.where(flip, yb, ya * 0.5)
+        b, yb = t, yt
+    points[:, 1] = 0.0
+    return points / np.linalg.norm(points, axis=-1, keepdims=True)
+
+
+def horizon_runs(fn, params, points, curves, count, periodic=True, tolerance=None):
+    """
+    Split curves sampled by `adaptive_sampling.refine` into runs of points above the horizon (y >= 0)
+
+    Runs start and end on the horizon at the crossings found by root finding on fn(params, curves),
+    within tolerance (default ROOT_TOLERANCE) of the horizon before they are projected on it.
+    A periodic curve whose last sample is above the horizon goes on with its first run, a periodic
+    curve entirely above the horizon is closed. Returns one list of (N, 3) float32 arrays per curve.
+    """
+    params = np.asarray(params, dtype=np.float64)
+    points = np.asarray(points, dtype=np.float64)
+    curves = np.asarray(curves, dtype=np.int64)
+    above = points[:, 1] >= 0
+
+    # Crossings of all curves solved together
+    segment = np.flatnonzero((curves[1:] == curves[:-1]) & (above[1:] != above[:-1]))
+    crossings = _crossing_points(
+        fn,
+        params[segment],
+        params[segment + 1],
+        points[segment, 1],
+        points[segment + 1, 1],
+        curves[segment],
+        tolerance or ROOT_TOLERANCE,
+    )
+
+    result = []
+    start = 0
+    for curve_points, curve_above in zip(split_curves(points, curves, count), split_curves(above, curves, count)):
+        # Pieces between horizon crossings alternate above and below, piece k starts after crossing k - 1
+        boundaries = np.flatnonzero(curve_above[1:] != curve_above[:-1]) + 1
+        curve_crossings = crossings[start : start + len(boundaries)]
+        start += len(boundaries)
+        pieces = np.split(curve_points, boundaries)
+        runs = []
+        for k in range(0 if len(curve_above) and curve_above[0] else 1, len(pieces), 2):
+            runs.append(np.concatenate((curve_crossings[max(k - 1, 0) : k], pieces[k], curve_crossings[k : k + 1])))
+
+        if periodic and runs and curve_above[0] and curve_above[-1]:
+            if len(runs) == 1:
+                # Always above the horizon, close the loop
+                runs[0] = np.concatenate((runs[0], runs[0][:1]))
+            else:
+                runs[0] = np.concatenate((runs.pop(), runs[0]))
+        result.append([run.astype(np.float32) for run in runs if len(run) >= 2])
+    return result
@@ -0,0 +1,139 @@
+"""Clear sky irradiance: direct normal (DNI), diffuse horizontal (DHI) and global horizontal (GHI)
+
+The Ineichen-Perez model with a Linke turbidity, one value or twelve monthly values, gives the three
+components; the Haurwitz model only needs the sun altitude and gives GHI. Both take arrays of the
+apparent sun altitude computed by `solar_position`, irradiance is in W/m2 and 0 below the horizon.
+"""
+
+__all__ = [
+    "IRRADIANCE_DTYPE",
+    "SOLAR_CONSTANT",
+    "DEFAULT_TURBIDITY",
+    "extraterrestrial",
+    "relative_airmass",
+    "haurwitz",
+    "ineichen",
+    "year_irradiance",
+]
+
+import numpy as np
+from functools import lru_cache
+from .solar_position import sun_position
+
+SOLAR_CONSTANT = 1367.0
+# Linke turbidity of a rural site with a moderately clear sky
+DEFAULT_TURBIDITY = 3.0
+
+IRRADIANCE_DTYPE = np.dtype(
+    [
+        # Local standard time of the sample, the values are instantaneous
+        ("time", "datetime64[s]"),
+        # Apparent sun altitude (degrees)
+        ("altitude", "f8"),
+        ("dni", "f8"),
+        ("dhi", "f8"),
+        ("ghi", "f8"),
+    ]
+)
+
+
+def extraterrestrial(day_of_year):
+    """
+    Normal irradiance at the top of the atmosphere of days of year (1-366), Spencer's series
+    """
+    angle = 2.0 * np.pi * (np.asarray(day_of_year, dtype=np.float64) - 1.0) / 365.0
+    return SOLAR_CONSTANT * (
+        1.00011
+        + 0.034221 * np.cos(angle)
+        + 0.00128 * np.sin(angle)
+        + 0.000719 * np.cos(2.0 * angle)
+        + 0.000077 * np.sin(2.0 * angle)
+    )
+
+
+def relative_airmass(altitude):
+    """
+    Kasten-Young relative air mass of apparent sun altitudes (degrees), NaN below the horizon
+    """
+    altitude = np.asarray(altitude, dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        airmass = 1.0 / (np.sin(np.radians(altitude)) + 0.50572 * (altitude + 6.07995) ** -1.6364)
+    return np.where(altitude > 0, airmass, np.nan)
+
+
+def haurwitz(altitude):
+    """
+    Clear sky GHI of the Haurwitz model
+    """
+    sin_alt = np.sin(np.radians(np.asarray(altitude, dtype=np.float64)))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ghi = 1098.0 * sin_alt * np.exp(-0.059 / sin_alt)
+    return np.where(sin_alt > 0, ghi, 0.0)
+
+
+def ineichen(altitude, day_of_year, elevation=0.0, turbidity=DEFAULT_TURBIDITY):
+    """
+    Clear sky DNI, DHI and GHI of the Ineichen-Perez model, three arrays broadcast from the inputs
+
+    elevation is the site height above sea level (meters), turbidity the Linke turbidity.
+    """
+    altitude = np.asarray(altitude, dtype=np.float64)
+    turbidity = np.asarray(turbidity, dtype=np.float64)
+    sin_alt = np.maximum(np.sin(np.radians(altitude)), 0.0)
+    # Absolute air mass, the pressure falls with elevation
+    pressure_ratio = (1.0 - 2.25577e-5 * elevation) ** 5.25588
+    airmass = np.nan_to_num(relative_airmass(altitude) * pressure_ratio)
+    dni_extra = extraterrestrial(day_of_year)
+
+    fh1 = np.exp(-elevation / 8000.0)
+    fh2 = np.exp(-elevation / 1250.0)
+    cg1 = 5.09e-5 * elevation + 0.868
+    cg2 = 3.92e-5 * elevation + 0.0387
+    ghi = cg1 * dni_extra * sin_alt * np.maximum(np.exp(-cg2 * airmass * (fh1 + fh2 * (turbidity - 1.0))), 0.0)
+
+    b = 0.664 + 0.163 / fh1
+    dni = dni_extra * np.maximum(b * np.exp(-0.09 * airmass * (turbidity - 1.0)), 0.0)
+    # The direct part can not exceed the global one
+    with np.errstate(invalid="ignore", divide="ignore"):
+        limit = (1.0 - (0.1 - 0.2 * np.exp(-turbidity)) / (0.1 + 0.882 / fh1)) / sin_alt
+    dni = np.minimum(dni, ghi * np.clip(np.nan_to_num(limit, posinf=1e20), 0.0, 1e20))
+
+    above = altitude > 0
+    dni = np.where(above, dni, 0.0)
+    ghi = np.where(above, ghi, 0.0)
+    return dni, ghi - dni * sin_alt, ghi
+
+
+@lru_cache(maxsize=32)
+def _year_irradiance(lat, lon, tz, year, step, elevation, turbidity):
+    times = np.arange(np.datetime64(f"{year}-01-01"), np.datetime64(f"{year + 1}-01-01")).astype("datetime64[s]")
+    times = (times[:, None] + np.arange(0, 86400, step * 60).astype("timedelta64[s]")).ravel()
+    altitude, _ = sun_position(times, lat, lon, tz)
+    days = (times.astype("datetime64[D]") - np.datetime64(f"{year}-01-01")).astype(np.int64) + 1
+    if len(turbidity) == 12:
+        months = times.astype("datetime64[M]").astype(np.int64) % 12
+        turbidity = np.asarray(turbidity)[months]
+    else:
+        turbidity = turbidity[0]
+
+    table = np.zeros(len(times), dtype=IRRADIANCE_DTYPE)
+    table["time"] = times
+    table["altitude"] = altitude
+    table["dni"], table["dhi"], table["ghi"] = ineichen(altitude, days, elevation, turbidity)
+    table.setflags(write=False)
+    return table
+
+
+def year_irradiance(lat, lon, tz, year, step=60, elevation=0.0, turbidity=DEFAULT_TURBIDITY, precision=2):
+    """
+    Get clear sky irradiance of every step (minutes) of a year in local standard time
+
+    Returns a read only structured array of IRRADIANCE_DTYPE computed in one pass, 8760 rows
+    with hourly steps. Results are cached per site, latitude and longitude are rounded to precision
+    decimals. turbidity is one Linke turbidity or twelve monthly values.
+    """
+    turbidity = tuple(float(t) for t in np.atleast_1d(turbidity))
+    if len(turbidity) not in (1, 12):
+        raise ValueError(f"turbidity needs 1 or 12 values, got {len(turbidity)}")
+    lat, lon = round(float(lat), precision), round(float(lon), precision)
+    return _year_irradiance(lat, lon, float(tz), int(year), step, float(elevation), turbidity)
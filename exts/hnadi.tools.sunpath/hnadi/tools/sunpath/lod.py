@@ -0,0 +1,63 @@
+"""Level of detail of the diagram from its size on screen
+
+The radius of the diagram is projected with the world to NDC matrix of the viewport, the tier is
+the first one whose min_pixels the projected radius reaches. A tier only changes once the radius is
+HYSTERESIS beyond the threshold, so a camera resting near it does not flip the tier every frame.
+"""
+
+__all__ = ["LodTier", "LOD_TIERS", "HYSTERESIS", "projected_radius", "select_tier"]
+
+import numpy as np
+from collections import namedtuple
+
+# min_pixels: projected radius (pixels) from which the tier is used
+# circle_step: degrees between the points of the compass circles
+# hour_stride: every how many hours an '8' shape curve is drawn, 0 for none
+# ticks: tick-marks of the compass, other_days: the paths of PATH_DATES besides the highlighted ones
+# labels: "all", "directions" (compass directions and information) or None
+# sphere_resolution: segments of the sun sphere meridians, None for the state value, 0 hides the sun
+LodTier = namedtuple(
+    "LodTier",
+    ["name", "min_pixels", "circle_step", "hour_stride", "ticks", "other_days", "labels", "sphere_resolution"],
+)
+
+LOD_TIERS = (
+    LodTier("full", 250, 1, 1, True, True, "all", None),
+    LodTier("medium", 100, 3, 2, True, True, "directions", 24),
+    LodTier("low", 30, 10, 0, False, False, None, 12),
+    LodTier("icon", 0, 30, 0, False, False, None, 0),
+)
+
+HYSTERESIS = 0.15
+
+
+def projected_radius(world_to_ndc, center, radius, resolution):
+    """
+    Radius (pixels) of a sphere of radius around center seen through the world_to_ndc matrix (row vectors)
+
+    The center and the ends of three diameters are projected. It is infinite when the sphere
+    surrounds the camera plane (some points behind the camera), 0 when all of them are behind.
+    """
+    matrix = np.asarray(world_to_ndc, dtype=np.float64).reshape(4, 4)
+    points = np.asarray(center, dtype=np.float64) + np.concatenate([np.zeros((1, 3)), np.eye(3), -np.eye(3)]) * radius
+    clip = np.hstack([points, np.ones((len(points), 1))]) @ matrix
+    front = clip[:, 3] > 1e-9
+    if not front.all():
+        return float("inf") if front.any() else 0.0
+    ndc = clip[:, :2] / clip[:, 3:]
+    half = np.asarray(resolution, dtype=np.float64) / 2.0
+    return float(np.max(np.abs(ndc[1:] - ndc[0]) * half))
+
+
+def select_tier(pixels, current=None, tiers=LOD_TIERS):
+    """
+    Tier of a projected radius, current is kept while the radius stays within HYSTERESIS of its range
+    """
+    tier = next((t for t in tiers if pixels >= t.min_pixels), tiers[-1])
+    if current is None or tier is current or current not in tiers:
+        return tier
+    index = tiers.index(current)
+    upper = tiers[index - 1].min_pixels if index > 0 else float("inf")
+    if current.min_pixels * (1.0 - HYSTERESIS) <= pixels < upper * (1.0 + HYSTERESIS):
+        return current
+    return tier
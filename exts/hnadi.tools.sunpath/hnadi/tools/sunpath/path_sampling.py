@@ -0,0 +1,57 @@
+__all__ = ["PathSampling"]
+
+from .sunpath_data import SunpathData
+
+
+class PathSampling:
+    """
+    Sampling of the paths shared by the diagrams, draft while astronomy changes keep coming
+
+    The chord tolerance is relative to the size of the largest diagram, paths are rebuilt when
+    astronomy changes or when a transform or diagram change moves the tolerance to another power of two.
+    """
+
+    # Sampling step of paths (minutes, days) while a slider is dragged and after it settles
+    DRAFT_SAMPLING = (15, 6)
+    FINAL_SAMPLING = (5, 2)
+    # Path tolerance multiplier while a slider is dragged
+    DRAFT_TOLERANCE = 4
+
+    def __init__(self, state):
+        self.state = state
+        # The paths were last built with draft sampling
+        self.draft = False
+
+    def tolerance(self, final):
+        """
+        Chord tolerance of paths on the unit sphere for the largest diagram
+        """
+        tolerance = self.state.path_tolerance / (self.state.largest_scale() * 200)
+        return tolerance if final else tolerance * self.DRAFT_TOLERANCE
+
+    def apply(self, final):
+        """
+        Set sampling steps and chord tolerance of paths
+        """
+        pathmodel = self.state.pathmodel
+        pathmodel.set_sampling(*(self.FINAL_SAMPLING if final else self.DRAFT_SAMPLING))
+        pathmodel.set_tolerance(self.tolerance(final))
+        self.draft = not final
+
+    def groups(self, changed, final):
+        """
+        Field groups to redraw for the changed ones, set the sampling of paths when they are rebuilt
+
+        The final pass rebuilds paths once more only when they were drawn with draft sampling, other
+        changes (color, time) keep the paths and their sampling.
+        """
+        groups = set(changed)
+        if final and self.draft:
+            groups.add("astronomy")
+        if "astronomy" not in groups and groups & {"transform", "diagrams"}:
+            tolerance = SunpathData.round_tolerance(self.tolerance(not self.draft))
+            if tolerance != self.state.pathmodel.tolerance:
+                groups.add("astronomy")
+        if "astronomy" in groups:
+            self.apply(final)
+        return groups
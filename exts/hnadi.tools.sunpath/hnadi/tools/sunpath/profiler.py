@@ -0,0 +1,153 @@
+"""Timing of the update stages, rolling percentiles and a trace exportable as JSON or CSV
+
+    with timer.stage("geometry"):
+        ...
+
+A disabled timer hands out one shared context manager doing nothing, so the hooks can stay in the
+update code. Stages nest, the time of a stage includes the stages inside it.
+"""
+
+__all__ = ["StageTimer"]
+
+import csv
+import io
+import json
+import time
+from collections import deque
+import numpy as np
+
+# Durations kept per stage for the rolling percentiles
+WINDOW = 256
+# Stage records kept for the trace
+TRACE_LENGTH = 4096
+PERCENTILES = (50, 90, 99)
+
+
+class _NullStage:
+    """Context manager doing nothing, the stage of a disabled timer"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """Context manager measuring one stage"""
+
+    __slots__ = ("timer", "name", "start", "depth")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.depth = self.timer._depth
+        self.timer._depth += 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        self.timer._depth -= 1
+        self.timer.record(self.name, self.start, seconds, self.depth)
+        return False
+
+
+class StageTimer:
+    """
+    Rolling durations of named stages and a bounded trace of the stage records
+    """
+
+    def __init__(self, enabled=False, window=WINDOW, trace_length=TRACE_LENGTH):
+        self.enabled = enabled
+        self.window = window
+
+        self._durations = {}
+        self._counts = {}
+        self._trace = deque(maxlen=trace_length)
+        self._origin = time.perf_counter()
+        self._depth = 0
+
+    def stage(self, name):
+        """
+        Context manager timing the stage name, nothing is measured while the timer is disabled
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, start, seconds, depth=0):
+        """
+        Add a duration of stage name, start is a time.perf_counter() value
+        """
+        durations = self._durations.get(name)
+        if durations is None:
+            durations = self._durations[name] = deque(maxlen=self.window)
+            self._counts[name] = 0
+        durations.append(seconds)
+        self._counts[name] += 1
+        self._trace.append((name, start - self._origin, seconds, depth))
+
+    def reset(self):
+        """
+        Forget all durations and the trace
+        """
+        self._durations.clear()
+        self._counts.clear()
+        self._trace.clear()
+        self._origin = time.perf_counter()
+
+    def stats(self):
+        """
+        Statistics of every stage in milliseconds, {name: {"count", "mean", "p50", "p90", "p99", "max"}}
+
+        count is the number of calls since reset, the others are computed over the last window calls.
+        """
+        result = {}
+        for name, durations in self._durations.items():
+            values = np.fromiter(durations, dtype=np.float64, count=len(durations)) * 1000
+            stats = {"count": self._counts[name], "mean": float(values.mean())}
+            for q, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+                stats[f"p{q}"] = float(value)
+            stats["max"] = float(values.max())
+            result[name] = stats
+        return result
+
+    def trace(self):
+        """
+        Stage records, oldest first, a list of {"stage", "start", "duration", "depth"} (milliseconds)
+        """
+        return [
+            {"stage": name, "start": start * 1000, "duration": seconds * 1000, "depth": depth}
+            for name, start, seconds, depth in self._trace
+        ]
+
+    def to_json(self):
+        return json.dumps({"stats": self.stats(), "trace": self.trace()}, indent=1)
+
+    def to_csv(self):
+        """
+        The trace as CSV, one row per stage record
+        """
+        out = io.StringIO()
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow(["stage", "start_ms", "duration_ms", "depth"])
+        for name, start, seconds, depth in self._trace:
+            writer.writerow([name, f"{start * 1000:.3f}", f"{seconds * 1000:.3f}", depth])
+        return out.getvalue()
+
+    def export(self, path):
+        """
+        Write the trace to path, CSV when it ends with ".csv" otherwise JSON with the statistics
+        """
+        text = self.to_csv() if path.lower().endswith(".csv") else self.to_json()
+        with open(path, "w") as f:
+            f.write(text)
+        return path
@@ -0,0 +1,71 @@
+"""Optional pyephem-sunpath reference, resolved lazily in the background
+
+The extension computes sun positions with `solar_position`, pyephem-sunpath is only used to
+check its accuracy. The package is never installed at import time: `load_pyephem` starts the
+pip install in a daemon thread once and waits at most `timeout` seconds for it.
+"""
+
+__all__ = ["load_pyephem", "reference_sun_position"]
+
+import threading
+import numpy as np
+
+_lock = threading.Lock()
+_install_thread = None
+
+
+def _import_pyephem():
+    try:
+        from pyephem_sunpath import sunpath
+    except ImportError:
+        return None
+    return sunpath
+
+
+def _install():
+    try:
+        import carb
+        import omni.kit.pipapi
+    except ImportError:
+        # Not running in Kit, nothing to install with
+        return
+    try:
+        omni.kit.pipapi.install("pyephem-sunpath", None, False, False, None, True, True, None)
+    except Exception as e:
+        carb.log_error(f"pyephem-sunpath install failed: {e}")
+
+
+def load_pyephem(timeout=10.0):
+    """
+    Get the pyephem_sunpath.sunpath module, None if it is not available within timeout seconds
+
+    timeout=0 only checks, the install keeps running in the background for a later call.
+    """
+    global _install_thread
+    module = _import_pyephem()
+    if module is not None:
+        return module
+
+    with _lock:
+        if _install_thread is None:
+            _install_thread = threading.Thread(target=_install, name="pyephem-sunpath install", daemon=True)
+            _install_thread.start()
+    _install_thread.join(timeout)
+    if _install_thread.is_alive():
+        return None
+    return _import_pyephem()
+
+
+def reference_sun_position(times, lat, lon, tz, timeout=10.0):
+    """
+    Compute sun altitude and azimuth with pyephem-sunpath, one call per time
+
+    Returns None when the package is not available.
+    """
+    sunpath = load_pyephem(timeout)
+    if sunpath is None:
+        return None
+    times = np.asarray(times, dtype="datetime64[s]").ravel()
+    positions = [sunpath.sunpos(t.astype(object), lat, lon, tz, dst=False) for t in times]
+    alt, azm = np.array(positions, dtype=np.float64).reshape(-1, 2).T
+    return alt, azm
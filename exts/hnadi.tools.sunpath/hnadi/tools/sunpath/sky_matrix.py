@@ -0,0 +1,160 @@
+"""Cumulative sky matrix: the radiation of a year binned into the patches of a sky subdivision
+
+The Tregenza subdivision has 145 patches: seven bands of 12 degrees of altitude with 30, 30, 24,
+24, 18, 12 and 6 patches and a zenith cap. The Reinhart subdivision splits every band into
+`subdivision` rows and every patch into `subdivision` columns, 577 patches for 2. Patches are numbered
+from the horizon up, the columns of a row clockwise from North (azimuth convention of `solar_position`).
+
+Direct radiation is binned into the patch of the sun, diffuse radiation is spread over the sky
+as an isotropic radiance (DHI / pi), so the value of a patch is the radiation (kWh/m2) received from
+its directions by a surface facing it.
+"""
+
+__all__ = [
+    "TREGENZA_COUNTS",
+    "SkyPatches",
+    "SkyMatrix",
+    "sky_patches",
+    "patch_index",
+    "cumulative_sky",
+    "sky_dome_mesh",
+]
+
+import numpy as np
+from collections import namedtuple
+from functools import lru_cache
+from .solar_position import CHUNK_SIZE, sun_position
+from .irradiance import DEFAULT_TURBIDITY, ineichen
+
+# Patches of the Tregenza bands from the horizon up, the zenith cap excluded
+TREGENZA_COUNTS = (30, 30, 24, 24, 18, 12, 6)
+
+# band is the height (degrees) of a row, counts and row_start the patches of every row and the index
+# of their first patch. altitude, azimuth (degrees) and solid_angle (sr) are per patch, the last patch
+# is the zenith cap.
+SkyPatches = namedtuple(
+    "SkyPatches", ["subdivision", "band", "counts", "row_start", "altitude", "azimuth", "solid_angle"]
+)
+
+# Radiation (kWh/m2) of every patch, total is direct + diffuse
+SkyMatrix = namedtuple("SkyMatrix", ["patches", "direct", "diffuse", "total"])
+
+
+@lru_cache(maxsize=4)
+def sky_patches(subdivision=1):
+    """
+    Patches of the Tregenza (subdivision 1) or Reinhart subdivision
+    """
+    band = 90.0 / (len(TREGENZA_COUNTS) * subdivision + 0.5)
+    counts = np.repeat(np.array(TREGENZA_COUNTS) * subdivision, subdivision)
+    row_start = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rows = np.repeat(np.arange(len(counts)), counts)
+    columns = np.arange(counts.sum()) - row_start[rows]
+
+    altitude = np.append((rows + 0.5) * band, 90.0)
+    azimuth = np.append((columns + 0.5) * 360.0 / counts[rows], 0.0)
+    low, high = np.radians(rows * band), np.radians((rows + 1) * band)
+    solid_angle = 2.0 * np.pi * (np.sin(high) - np.sin(low)) / counts[rows]
+    solid_angle = np.append(solid_angle, 2.0 * np.pi * (1.0 - np.sin(high[-1])))
+    patches = SkyPatches(subdivision, band, counts, row_start, altitude, azimuth, solid_angle)
+    for array in patches[2:]:
+        array.setflags(write=False)
+    return patches
+
+
+def patch_index(patches: SkyPatches, altitude, azimuth):
+    """
+    Index of the patch of arrays of altitude (>= 0) and azimuth (degrees)
+    """
+    rows = len(patches.counts)
+    row = (np.asarray(altitude) / patches.band).astype(np.int64)
+    cap = row >= rows
+    row = np.minimum(row, rows - 1)
+    counts = patches.counts[row]
+    column = (np.asarray(azimuth) * counts / 360.0).astype(np.int64) % counts
+    return np.where(cap, len(patches.altitude) - 1, patches.row_start[row] + column)
+
+
+@lru_cache(maxsize=16)
+def _cumulative_sky(lat, lon, tz, year, step, subdivision, elevation, turbidity):
+    patches = sky_patches(subdivision)
+    count = len(patches.altitude)
+    times = np.arange(np.datetime64(f"{year}-01-01"), np.datetime64(f"{year + 1}-01-01"), np.timedelta64(step, "m"))
+    turbidity = np.asarray(turbidity)
+    direct = np.zeros(count)
+    diffuse = 0.0
+
+    for begin in range(0, len(times), CHUNK_SIZE):
+        chunk = times[begin : begin + CHUNK_SIZE]
+        altitude, azimuth = sun_position(chunk, lat, lon, tz)
+        above = altitude > 0
+        chunk, altitude, azimuth = chunk[above], altitude[above], azimuth[above]
+        days = (chunk.astype("datetime64[D]") - np.datetime64(f"{year}-01-01")).astype(np.int64) + 1
+        months = chunk.astype("datetime64[M]").astype(np.int64) % 12
+        dni, dhi, _ = ineichen(altitude, days, elevation, turbidity[months] if len(turbidity) == 12 else turbidity[0])
+        direct += np.bincount(patch_index(patches, altitude, azimuth), weights=dni, minlength=count)
+        diffuse += dhi.sum()
+
+    # Wh of every sample, then kWh
+    hours = step / 60.0 / 1000.0
+    direct *= hours
+    diffuse = diffuse * hours / np.pi * patches.solid_angle
+    for array in (direct, diffuse):
+        array.setflags(write=False)
+    total = direct + diffuse
+    total.setflags(write=False)
+    return SkyMatrix(patches, direct, diffuse, total)
+
+
+def cumulative_sky(lat, lon, tz, year, step=60, subdivision=1, elevation=0.0, turbidity=DEFAULT_TURBIDITY, precision=2):
+    """
+    Build the clear sky cumulative sky matrix of a year sampled every step (minutes)
+
+    The year is computed in chunks, every chunk binned at once. Results are cached per site,
+    latitude and longitude are rounded to precision decimals, see `irradiance.year_irradiance` for
+    elevation and turbidity.
+    """
+    turbidity = tuple(float(t) for t in np.atleast_1d(turbidity))
+    if len(turbidity) not in (1, 12):
+        raise ValueError(f"turbidity needs 1 or 12 values, got {len(turbidity)}")
+    lat, lon = round(float(lat), precision), round(float(lon), precision)
+    return _cumulative_sky(lat, lon, float(tz), int(year), int(step), int(subdivision), float(elevation), turbidity)
+
+
+def _direction(altitude, azimuth, radius):
+    altitude, azimuth = np.broadcast_arrays(np.radians(altitude), np.radians(azimuth))
+    cos_alt = np.cos(altitude)
+    return np.stack([np.sin(azimuth) * cos_alt, np.sin(altitude), -np.cos(azimuth) * cos_alt], axis=-1) * radius
+
+
+@lru_cache(maxsize=4)
+def sky_dome_mesh(subdivision=1, radius=1.0, max_angle=6.0):
+    """
+    Polygons of the patches on a sphere of radius, (positions, vertex_counts, vertex_indices, patch)
+
+    Every patch has its own vertices so it takes one color, patch is the patch index of every vertex.
+    Patch edges are split in steps of at most max_angle degrees of azimuth.
+    """
+    patches = sky_patches(subdivision)
+    positions, counts, patch_of_vertex = [], [], []
+    for row, count in enumerate(patches.counts.tolist()):
+        width = 360.0 / count
+        segments = int(np.ceil(width / max_angle))
+        low, high = row * patches.band, (row + 1) * patches.band
+        for column in range(count):
+            azimuth = column * width + np.linspace(0.0, width, segments + 1)
+            # Lower edge eastwards then upper edge back, a convex polygon seen from the center
+            ring = np.concatenate([_direction(low, azimuth, radius), _direction(high, azimuth[::-1], radius)])
+            positions.append(ring)
+            counts.append(len(ring))
+            patch_of_vertex.append(np.full(len(ring), patches.row_start[row] + column))
+    cap = _direction(len(patches.counts) * patches.band, np.arange(0.0, 360.0, max_angle), radius)
+    positions.append(cap)
+    counts.append(len(cap))
+    patch_of_vertex.append(np.full(len(cap), len(patches.altitude) - 1))
+
+    positions = np.concatenate(positions).astype(np.float32)
+    result = (positions, np.array(counts), np.arange(len(positions)), np.concatenate(patch_of_vertex))
+    for array in result:
+        array.setflags(write=False)
+    return result
@@ -0,0 +1,180 @@
+"""Vectorized solar position engine"""
+
+__all__ = [
+    "TOLERANCE_DEG",
+    "SunVectors",
+    "to_datetime64",
+    "sun_equatorial",
+    "sun_position",
+    "calc_xyz",
+    "sun_vectors",
+]
+
+import numpy as np
+from collections import namedtuple
+
+# Maximum deviation (degrees) from pyephem-sunpath `sunpos` for years 1950-2050 and
+# |latitude| < 89, for altitude and for azimuth measured along the sky (azimuth * cos(altitude))
+TOLERANCE_DEG = 0.05
+
+# Samples computed at once by `sun_vectors`, bounds the size of temporary arrays
+CHUNK_SIZE = 32768
+
+SunVectors = namedtuple("SunVectors", ["times", "vectors", "altitude", "azimuth", "above_horizon"])
+
+_J2000 = 2451545.0
+_UNIX_EPOCH_JD = 2440587.5
+
+# Standard atmosphere used by pyephem observers (mbar, celsius)
+_PRESSURE = 1010.0
+_TEMPERATURE = 15.0
+
+
+def to_datetime64(times):
+    """
+    Convert datetime, list of datetimes or datetime64 values to a datetime64[s] array
+    """
+    return np.asarray(times, dtype="datetime64[s]")
+
+
+def to_timedelta64(step):
+    """
+    Convert timedelta, timedelta64 or a number of minutes to a timedelta64[s] value
+    """
+    if isinstance(step, (int, float, np.integer, np.floating)):
+        return np.timedelta64(int(round(step * 60)), "s")
+    return np.timedelta64(step).astype("timedelta64[s]")
+
+
+def _julian_day(times, tz):
+    """
+    Convert local times (datetime64) with timezone offset (hours) to julian day
+    """
+    seconds = to_datetime64(times).astype(np.int64).astype(np.float64)
+    seconds = seconds - np.asarray(tz, dtype=np.float64) * 3600.0
+    return seconds / 86400.0 + _UNIX_EPOCH_JD
+
+
+def _unrefract(apparent):
+    """
+    Remove refraction from apparent altitude (degrees), the model used by pyephem (libastro)
+    """
+    pr_tr = _PRESSURE / (273.0 + _TEMPERATURE)
+    # Low altitude formula, no correction where it turns negative below the horizon
+    low = (2e-5 * apparent + 1.96e-2) * apparent + 1.594e-1
+    low = low / ((8.45e-2 * apparent + 5.05e-1) * apparent + 1.0) * pr_tr
+    low = np.where((apparent < 0) & (low < 0), 0.0, low)
+    # High altitude formula
+    high = np.degrees(7.888888e-5 * pr_tr / np.tan(np.radians(np.clip(apparent, 14.5, 90.0))))
+    # Blend the two formulas between 14.5 and 15.5 degrees
+    w = np.clip(apparent - 14.5, 0.0, 1.0)
+    return apparent - (low * (1.0 - w) + high * w)
+
+
+def _refract(alt, iterations=12):
+    """
+    Add refraction to true altitude (degrees), inverse of `_unrefract` by secant iterations
+    """
+    true0 = _unrefract(alt)
+    step = 0.8 * (alt - true0)
+    apparent = alt.copy()
+    for _ in range(iterations):
+        apparent = apparent + step
+        true1 = _unrefract(apparent)
+        denom = true0 - true1
+        done = np.abs(alt - true1) < 1e-6
+        step = np.where(done | (denom == 0), 0.0, -step * (alt - true1) / np.where(denom == 0, 1.0, denom))
+        true0 = true1
+        if np.all(step == 0):
+            break
+    return apparent
+
+
+def sun_equatorial(jd):
+    """
+    Compute sun declination, right ascension and local hour angle at longitude 0 (radians) of julian days
+    """
+    t = (jd - _J2000) / 36525.0
+
+    # Geometric mean longitude and mean anomaly of the sun
+    l0 = np.mod(280.46646 + t * (36000.76983 + t * 0.0003032), 360.0)
+    m = np.radians(357.52911 + t * (35999.05029 - 0.0001537 * t))
+
+    # Equation of center and apparent longitude
+    c = (
+        np.sin(m) * (1.914602 - t * (0.004817 + 0.000014 * t))
+        + np.sin(2 * m) * (0.019993 - 0.000101 * t)
+        + np.sin(3 * m) * 0.000289
+    )
+    omega = np.radians(125.04 - 1934.136 * t)
+    lam = np.radians(l0 + c - 0.00569 - 0.00478 * np.sin(omega))
+
+    # Obliquity of the ecliptic
+    eps0 = 23.0 + (26.0 + (21.448 - t * (46.815 + t * (0.00059 - t * 0.001813))) / 60.0) / 60.0
+    eps = np.radians(eps0 + 0.00256 * np.cos(omega))
+
+    # Equatorial coordinates
+    dec = np.arcsin(np.sin(eps) * np.sin(lam))
+    ra = np.arctan2(np.cos(eps) * np.sin(lam), np.cos(lam))
+
+    # Hour angle from greenwich mean sidereal time
+    gmst = 280.46061837 + 360.98564736629 * (jd - _J2000) + t * t * (0.000387933 - t / 38710000.0)
+    ha = np.radians(np.mod(gmst, 360.0)) - ra
+    return dec, ra, ha
+
+
+def sun_position(times, lat, lon, tz):
+    """
+    Compute apparent sun altitude and azimuth for arrays of local times
+
+    times, lat, lon and tz are broadcast against each other, the result uses the
+    same convention as pyephem-sunpath `sunpos`: degrees, azimuth clockwise from North.
+    """
+    jd = np.atleast_1d(_julian_day(times, tz))
+    dec, _, ha = sun_equatorial(jd)
+    ha = ha + np.radians(np.asarray(lon, dtype=np.float64))
+
+    phi = np.radians(np.asarray(lat, dtype=np.float64))
+    sin_alt = np.sin(phi) * np.sin(dec) + np.cos(phi) * np.cos(dec) * np.cos(ha)
+    alt = np.degrees(np.arcsin(np.clip(sin_alt, -1.0, 1.0)))
+    azm = np.degrees(np.arctan2(np.sin(ha), np.cos(ha) * np.sin(phi) - np.tan(dec) * np.cos(phi))) + 180.0
+
+    return _refract(alt), np.mod(azm, 360.0)
+
+
+def calc_xyz(alt, azm):
+    """
+    Convert spherical coordinates to Cartesian coordinates, returns an (N, 3) array
+
+    Same axes as `SunpathData.calc_xyz`: x east, y up, z south.
+    """
+    alt = np.radians(alt)
+    azm = np.radians(azm)
+    cos_alt = np.cos(alt)
+    return np.stack([np.sin(azm) * cos_alt, np.sin(alt), -np.cos(azm) * cos_alt], axis=-1)
+
+
+def sun_vectors(start, end, step, lat, lon, tz, dtype=np.float64):
+    """
+    Compute sun vectors of every step in [start, end) at a location, local times
+
+    step is a timedelta or a number of minutes, tz an offset (hours) or a function returning the
+    offsets of an array of times (daylight saving time). Returns `SunVectors` with the datetime64 times,
+    a contiguous (N, 3) array of vectors, altitude and azimuth (degrees) and the above horizon mask.
+    Samples are computed in chunks of CHUNK_SIZE, so temporary memory does not grow with N.
+    """
+    times = np.arange(to_datetime64(start), to_datetime64(end), to_timedelta64(step))
+    count = len(times)
+    vectors = np.empty((count, 3), dtype=dtype)
+    altitude = np.empty(count, dtype=dtype)
+    azimuth = np.empty(count, dtype=dtype)
+
+    for begin in range(0, count, CHUNK_SIZE):
+        chunk = slice(begin, begin + CHUNK_SIZE)
+        offsets = tz(times[chunk]) if callable(tz) else tz
+        alt, azm = sun_position(times[chunk], lat, lon, offsets)
+        altitude[chunk] = alt
+        azimuth[chunk] = azm
+        vectors[chunk] = calc_xyz(alt, azm)
+
+    return SunVectors(times, vectors, altitude, azimuth, altitude >= 0)
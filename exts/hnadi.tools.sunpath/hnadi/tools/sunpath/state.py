@@ -0,0 +1,321 @@
+"""Typed state of the extension, change notifications per field group
+
+Every field belongs to a group, assigning a new value validates it and notifies the observers of the
+group once the value is different:
+
+    "astronomy"  sun paths change: location, date, path tolerance
+    "time"       only the current sun changes: hour, minute
+    "style"      colors and visibility of the items: color, show_info, irradiance_colors, sphere_resolution
+    "transform"  placement of the diagram and its level of detail: origin, scale, level_of_detail
+    "sun"        the sunlight is shown or not: sun_state
+    "analysis"   sun hours settings
+    "sky"        the cumulative sky dome: show_sky, sky_subdivision, sky_step
+    "diagrams"   diagrams are added or removed
+
+Location, date and time live in the `SunpathData` of the state, change them with `set_location`,
+`set_date` and `set_time` so that observers are notified.
+
+Several diagrams share the location and date, every `DiagramSettings` has its own origin, scale and
+color. origin, scale and color of the state are the ones of the active diagram.
+"""
+
+__all__ = ["SunpathState", "DiagramSettings", "FIELD_GROUPS"]
+
+from numbers import Real
+from .sunpath_data import SunpathData
+from .geometry_cache import SunpathGeometryCache
+from .profiler import StageTimer
+
+
+def _number(value, name, low=None, high=None, low_open=False):
+    if isinstance(value, bool) or not isinstance(value, Real):
+        raise TypeError(f"{name} must be a number, not {type(value).__name__}")
+    value = float(value)
+    if low is not None and (value < low or (low_open and value == low)):
+        raise ValueError(f"{name} must be {'>' if low_open else '>='} {low}, got {value}")
+    if high is not None and value > high:
+        raise ValueError(f"{name} must be <= {high}, got {value}")
+    return value
+
+
+def _vector(value, name, low=None, high=None):
+    values = tuple(value)
+    if len(values) != 3:
+        raise ValueError(f"{name} must have 3 components, got {len(values)}")
+    return tuple(_number(v, name, low, high) for v in values)
+
+
+def _flag(value, name):
+    if not isinstance(value, bool):
+        raise TypeError(f"{name} must be a bool, not {type(value).__name__}")
+    return value
+
+
+def _count(value, name, low):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise TypeError(f"{name} must be an int, not {type(value).__name__}")
+    if value < low:
+        raise ValueError(f"{name} must be >= {low}, got {value}")
+    return value
+
+
+def _steps(value, name):
+    return {span: _count(value[span], f"{name}[{span!r}]", 1) for span in ("day", "year")}
+
+
+def _instance(value, name, cls):
+    if not isinstance(value, cls):
+        raise TypeError(f"{name} must be a {cls.__name__}, not {type(value).__name__}")
+    return value
+
+
+def _any(value, name):
+    return value
+
+
+# Fields of every diagram, name to (group, validator)
+DIAGRAM_FIELDS = {
+    # Diagram origin and radius (in units of 200)
+    "origin": ("transform", _vector),
+    "scale": ("transform", lambda value, name: _number(value, name, 0, low_open=True)),
+    # Color (0-1) of the diagram
+    "color": ("style", lambda value, name: _vector(value, name, 0, 1)),
+}
+
+
+def _diagrams(value, name):
+    diagrams = tuple(value)
+    if not diagrams:
+        raise ValueError(f"{name} needs at least one diagram")
+    for diagram in diagrams:
+        _instance(diagram, name, DiagramSettings)
+    return diagrams
+
+
+# Field name to (group, validator), a group of None is never notified
+FIELDS = {
+    # Path model, cache of unit sphere paths and timing of the update stages
+    "pathmodel": (None, lambda value, name: _instance(value, name, SunpathData)),
+    "path_cache": (None, lambda value, name: _instance(value, name, SunpathGeometryCache)),
+    "profiler": (None, lambda value, name: _instance(value, name, StageTimer)),
+    # Chord tolerance of adaptive path sampling in world units, 0 for fixed steps
+    "path_tolerance": ("astronomy", lambda value, name: _number(value, name, 0)),
+    # Diagrams drawn at once and the index of the one the window edits
+    "diagrams": ("diagrams", _diagrams),
+    "active": (None, lambda value, name: _count(value, name, 0)),
+    # Information labels toggle
+    "show_info": ("style", _flag),
+    # Color the day paths by clear sky direct normal irradiance
+    "irradiance_colors": ("style", _flag),
+    # Segments of every meridian of the sun sphere
+    "sphere_resolution": ("style", lambda value, name: _count(value, name, 4)),
+    # Level of detail from the size of the diagram on screen, all details when off
+    "level_of_detail": ("transform", _flag),
+    # Flag for show sun
+    "sun_state": ("sun", _flag),
+    # Cumulative sky dome toggle, patches (1 Tregenza, 2 or more Reinhart) and time step (minutes)
+    "show_sky": ("sky", _flag),
+    "sky_subdivision": ("sky", lambda value, name: _count(value, name, 1)),
+    "sky_step": ("sky", lambda value, name: _count(value, name, 1)),
+    # Sun hours analysis, samples per square meter and time step (minutes) of a day or a year
+    "sun_hours_density": ("analysis", lambda value, name: _number(value, name, 0, low_open=True)),
+    "sun_hours_step": ("analysis", _steps),
+    # For distant light to determine whether to change the attribute
+    "dome_angle": (None, _any),
+    # Length of the tick-marks of the compass, the size of the move gesture block
+    "length": (None, lambda value, name: _number(value, name, 0)),
+    # Extension load time in seconds, {"import": ..., "on_startup": ...}
+    "startup_time": (None, _any),
+}
+
+
+def _field_groups():
+    groups = {"astronomy": ["lon", "lat", "datevalue"], "time": ["hour", "min"]}
+    for name, (group, _) in list(FIELDS.items()) + list(DIAGRAM_FIELDS.items()):
+        if group is not None:
+            groups.setdefault(group, []).append(name)
+    return groups
+
+
+# Group name to the names of its fields, path model ones included
+FIELD_GROUPS = _field_groups()
+
+
+class DiagramSettings:
+    """
+    Typed origin, scale and color of one diagram, changes notify the observers of the state
+    """
+
+    __slots__ = tuple(DIAGRAM_FIELDS) + ("_state",)
+
+    def __init__(self, state, origin=(0.0, 0.0, 0.0), scale=50.0, color=(1.0, 1.0, 1.0)):
+        object.__setattr__(self, "_state", state)
+        for name, value in (("origin", origin), ("scale", scale), ("color", color)):
+            object.__setattr__(self, name, DIAGRAM_FIELDS[name][1](value, name))
+
+    def __setattr__(self, name, value):
+        field = DIAGRAM_FIELDS.get(name)
+        if field is None:
+            raise AttributeError(f"{type(self).__name__} has no field {name!r}")
+        group, validate = field
+        value = validate(value, name)
+        changed = getattr(self, name) != value
+        object.__setattr__(self, name, value)
+        if changed:
+            self._state.notify(group)
+
+    def __repr__(self):
+        return f"DiagramSettings(origin={self.origin}, scale={self.scale}, color={self.color})"
+
+
+class SunpathState:
+    """
+    Typed and validated state, observers subscribe to field groups
+    """
+
+    __slots__ = tuple(FIELDS) + ("_observers",)
+
+    def __init__(self):
+        object.__setattr__(self, "_observers", [])
+        profiler = StageTimer()
+        defaults = {
+            "pathmodel": SunpathData(230, 12, 30, 112.94, 28.12),
+            "path_cache": SunpathGeometryCache(timer=profiler),
+            "profiler": profiler,
+            "path_tolerance": 10.0,
+            "diagrams": (DiagramSettings(self),),
+            "active": 0,
+            "show_info": False,
+            "irradiance_colors": False,
+            "sphere_resolution": 72,
+            "level_of_detail": True,
+            "sun_state": False,
+            "show_sky": False,
+            "sky_subdivision": 1,
+            "sky_step": 60,
+            "sun_hours_density": 4.0,
+            "sun_hours_step": {"day": 10, "year": 60},
+            "dome_angle": None,
+            "length": 3.5,
+            "startup_time": None,
+        }
+        for name, value in defaults.items():
+            object.__setattr__(self, name, FIELDS[name][1](value, name))
+
+    def __setattr__(self, name, value):
+        if name in DIAGRAM_FIELDS:
+            setattr(self.diagram, name, value)
+            return
+        field = FIELDS.get(name)
+        if field is None:
+            raise AttributeError(f"{type(self).__name__} has no field {name!r}")
+        group, validate = field
+        value = validate(value, name)
+        changed = getattr(self, name) != value
+        object.__setattr__(self, name, value)
+        if changed and group is not None:
+            self.notify(group)
+
+    @property
+    def diagram(self):
+        """
+        Settings of the active diagram
+        """
+        return self.diagrams[min(self.active, len(self.diagrams) - 1)]
+
+    @property
+    def origin(self):
+        return self.diagram.origin
+
+    @property
+    def scale(self):
+        return self.diagram.scale
+
+    @property
+    def color(self):
+        return self.diagram.color
+
+    def add_diagram(self, origin, scale=None, color=None):
+        """
+        Add a diagram at origin, scale and color default to the ones of the active diagram
+
+        Returns its `DiagramSettings`, it becomes the active diagram.
+        """
+        active = self.diagram
+        diagram = DiagramSettings(
+            self, origin, active.scale if scale is None else scale, active.color if color is None else color
+        )
+        self.diagrams = self.diagrams + (diagram,)
+        self.active = len(self.diagrams) - 1
+        return diagram
+
+    def remove_diagram(self, diagram=None):
+        """
+        Remove a diagram, the active one by default, the last diagram is kept
+        """
+        diagram = self.diagram if diagram is None else diagram
+        if len(self.diagrams) > 1 and diagram in self.diagrams:
+            self.diagrams = tuple(d for d in self.diagrams if d is not diagram)
+            self.active = min(self.active, len(self.diagrams) - 1)
+
+    def set_active(self, diagram):
+        """
+        Make diagram the one edited by the window
+        """
+        self.active = self.diagrams.index(diagram)
+
+    def largest_scale(self):
+        """
+        Largest scale of the diagrams, the paths shared by all of them are sampled for it
+        """
+        return max(diagram.scale for diagram in self.diagrams)
+
+    def subscribe(self, fn, groups=None):
+        """
+        Call fn(group) when a field of one of groups changes, all groups by default
+
+        Returns a function which removes the observer.
+        """
+        observer = (fn, None if groups is None else frozenset(groups))
+        self._observers.append(observer)
+
+        def unsubscribe():
+            if observer in self._observers:
+                self._observers.remove(observer)
+
+        return unsubscribe
+
+    def notify(self, group):
+        """
+        Call the observers of group
+        """
+        for fn, groups in list(self._observers):
+            if groups is None or group in groups:
+                fn(group)
+
+    def set_location(self, lon=None, lat=None):
+        """
+        Change longitude and/or latitude of the path model
+        """
+        if lon is not None:
+            self.pathmodel.set_longitude(_number(lon, "lon", -180, 180))
+        if lat is not None:
+            self.pathmodel.set_latitude(_number(lat, "lat", -90, 90))
+        self.notify("astronomy")
+
+    def set_date(self, datevalue):
+        """
+        Change the date (day of year, like the date slider) of the path model
+        """
+        self.pathmodel.set_date(_count(datevalue, "datevalue", 1))
+        self.notify("astronomy")
+
+    def set_time(self, hour=None, minute=None):
+        """
+        Change hour and/or minute of the path model
+        """
+        if hour is not None:
+            self.pathmodel.set_hour(_count(hour, "hour", 0))
+        if minute is not None:
+            self.pathmodel.set_min(_count(minute, "minute", 0))
+        self.notify("time")
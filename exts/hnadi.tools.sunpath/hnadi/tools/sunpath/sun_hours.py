@@ -0,0 +1,172 @@
+"""Direct sun hours on stage meshes, ray cast on the CPU
+
+Points are sampled on the faces of the analysed meshes. For every sun vector above the horizon
+of a time range a ray is cast from every point toward the sun against a BVH of all stage
+triangles. A point is sunlit when its face is turned to the sun and no triangle is in the way.
+Fewer samples per square meter and a longer time step trade accuracy for speed.
+"""
+
+__all__ = ["SunHours", "triangulate", "sample_triangles", "sun_hours", "mesh_triangles", "analyze_prims"]
+
+import numpy as np
+from collections import namedtuple
+from .bvh import build_bvh, occluded
+from .solar_position import sun_vectors, to_timedelta64
+
+# Sun vectors cast at once, rays of a batch are points * suns
+SUN_CHUNK = 64
+
+# points (N, 3), normals (N, 3), face index of every point (N,), sunlit hours (N,)
+SunHours = namedtuple("SunHours", ["points", "normals", "faces", "hours"])
+
+
+def triangulate(face_vertex_counts, face_vertex_indices):
+    """
+    Fan triangulate polygon faces, return vertex indices (M, 3) and the face of every triangle (M,)
+    """
+    counts = np.asarray(face_vertex_counts, dtype=np.int64)
+    indices = np.asarray(face_vertex_indices, dtype=np.int64)
+    first = np.cumsum(counts) - counts
+    tri_counts = np.maximum(counts - 2, 0)
+    faces = np.repeat(np.arange(len(counts)), tri_counts)
+    # k-th triangle of a face is (v0, v(k + 1), v(k + 2))
+    k = np.arange(len(faces)) - np.repeat(np.cumsum(tri_counts) - tri_counts, tri_counts)
+    base = first[faces]
+    triangles = np.stack([indices[base], indices[base + k + 1], indices[base + k + 2]], axis=-1)
+    return triangles, faces
+
+
+def sample_triangles(triangles, density, seed=0):
+    """
+    Sample points on triangles (M, 3, 3), about density points per unit area and at least one per triangle
+
+    A single sample is the centroid, more samples are uniformly random (reproducible with seed).
+    Returns points (N, 3), unit normals (N, 3) and the triangle of every point (N,).
+    """
+    triangles = np.asarray(triangles, dtype=np.float64).reshape(-1, 3, 3)
+    cross = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    area2 = np.linalg.norm(cross, axis=-1)
+    normals = cross / np.where(area2 > 0, area2, 1.0)[:, None]
+    counts = np.maximum(np.round(area2 * 0.5 * density).astype(np.int64), 1)
+
+    owner = np.repeat(np.arange(len(triangles)), counts)
+    rng = np.random.default_rng(seed)
+    u, v = rng.random(len(owner)), rng.random(len(owner))
+    # Fold points of the other half of the parallelogram back into the triangle
+    fold = u + v > 1.0
+    u[fold], v[fold] = 1.0 - u[fold], 1.0 - v[fold]
+    single = counts[owner] == 1
+    u[single], v[single] = 1.0 / 3.0, 1.0 / 3.0
+
+    tri = triangles[owner]
+    points = tri[:, 0] + u[:, None] * (tri[:, 1] - tri[:, 0]) + v[:, None] * (tri[:, 2] - tri[:, 0])
+    return points, normals[owner], owner
+
+
+def sun_hours(bvh, points, normals, suns, step_hours, offset=1e-4):
+    """
+    Sunlit hours of points for unit sun vectors (S, 3) each standing for step_hours
+
+    Rays start offset along the normal so a face does not shadow itself.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    normals = np.asarray(normals, dtype=np.float64).reshape(-1, 3)
+    suns = np.asarray(suns, dtype=np.float64).reshape(-1, 3)
+    origins = points + normals * offset
+    lit = np.zeros(len(points), dtype=np.int64)
+
+    for begin in range(0, len(suns), SUN_CHUNK):
+        chunk = suns[begin : begin + SUN_CHUNK]
+        facing = normals @ chunk.T > 0.0
+        point, sun = np.nonzero(facing)
+        blocked = occluded(bvh, origins[point], chunk[sun])
+        lit += np.bincount(point[~blocked], minlength=len(points))
+    return lit * step_hours
+
+
+def mesh_triangles(prims):
+    """
+    Get world space triangles (M, 3, 3) of the visible meshes among prims
+
+    Returns the triangles, the meshes used and for every triangle the index of its mesh and its face.
+    """
+    from pxr import Usd, UsdGeom
+
+    triangles, meshes, owners, faces = [], [], [], []
+    xform_cache = UsdGeom.XformCache(Usd.TimeCode.Default())
+    for prim in prims:
+        if not prim.IsA(UsdGeom.Mesh):
+            continue
+        mesh = UsdGeom.Mesh(prim)
+        if mesh.ComputeVisibility() == UsdGeom.Tokens.invisible:
+            continue
+        points = mesh.GetPointsAttr().Get()
+        counts = mesh.GetFaceVertexCountsAttr().Get()
+        indices = mesh.GetFaceVertexIndicesAttr().Get()
+        if not points or not counts:
+            continue
+        tri_indices, tri_faces = triangulate(counts, indices)
+
+        # Gf matrices use the row vector convention
+        matrix = np.array(xform_cache.GetLocalToWorldTransform(prim), dtype=np.float64)
+        points = np.asarray(points, dtype=np.float64) @ matrix[:3, :3] + matrix[3, :3]
+        # Keep normals on the front side, left handed faces and mirroring transforms reverse the winding
+        left_handed = mesh.GetOrientationAttr().Get() == UsdGeom.Tokens.leftHanded
+        if left_handed != (np.linalg.det(matrix[:3, :3]) < 0):
+            tri_indices = tri_indices[:, ::-1]
+
+        triangles.append(points[tri_indices])
+        owners.append(np.full(len(tri_faces), len(meshes), dtype=np.int64))
+        faces.append(tri_faces)
+        meshes.append(mesh)
+    if not triangles:
+        empty = np.zeros(0, dtype=np.int64)
+        return np.zeros((0, 3, 3)), meshes, empty, empty
+    return np.concatenate(triangles), meshes, np.concatenate(owners), np.concatenate(faces)
+
+
+def analyze_prims(stage, paths, start, end, step, lat, lon, tz, density=4.0, primvar="sunHours", seed=0):
+    """
+    Compute direct sun hours of the meshes under paths for local times in [start, end)
+
+    step is the time step in minutes, density the samples per square meter. Every other visible mesh
+    of the stage casts shadows. Returns a dictionary of mesh path to SunHours. When primvar is not None
+    the mean hours of every face are written to a uniform float primvar of that name.
+    """
+    from pxr import Usd, UsdGeom, Sdf, Vt
+
+    occluder_triangles, _, _, _ = mesh_triangles(Usd.PrimRange(stage.GetPseudoRoot()))
+    bvh = build_bvh(occluder_triangles)
+
+    targets = [prim for path in paths for prim in Usd.PrimRange(stage.GetPrimAtPath(path))]
+    triangles, meshes, owners, tri_faces = mesh_triangles(targets)
+    meters_per_unit = UsdGeom.GetStageMetersPerUnit(stage)
+    points, normals, owner = sample_triangles(triangles, density * meters_per_unit**2, seed)
+
+    # Sun vectors are Y up, x east and -z north
+    suns = sun_vectors(start, end, step, lat, lon, tz)
+    vectors = suns.vectors[suns.above_horizon]
+    if UsdGeom.GetStageUpAxis(stage) == UsdGeom.Tokens.z:
+        vectors = np.stack([vectors[:, 0], -vectors[:, 2], vectors[:, 1]], axis=-1)
+    step_hours = to_timedelta64(step).astype(np.int64) / 3600.0
+
+    # Offset ray origins relative to the scene size
+    offset = 1e-6 * float(np.linalg.norm(bvh.hi[0] - bvh.lo[0])) if len(bvh.lo) else 0.0
+    hours = sun_hours(bvh, points, normals, vectors, step_hours, max(offset, 1e-9))
+
+    results = {}
+    point_mesh = owners[owner]
+    point_face = tri_faces[owner]
+    for i, mesh in enumerate(meshes):
+        selected = point_mesh == i
+        result = SunHours(points[selected], normals[selected], point_face[selected], hours[selected])
+        results[str(mesh.GetPath())] = result
+        if primvar is None:
+            continue
+        face_count = len(mesh.GetFaceVertexCountsAttr().Get())
+        samples = np.bincount(result.faces, minlength=face_count)
+        total = np.bincount(result.faces, weights=result.hours, minlength=face_count)
+        face_hours = (total / np.maximum(samples, 1)).astype(np.float32)
+        attr = UsdGeom.PrimvarsAPI(mesh).CreatePrimvar(primvar, Sdf.ValueTypeNames.FloatArray, UsdGeom.Tokens.uniform)
+        attr.Set(Vt.FloatArray(face_hours.tolist()))
+    return results
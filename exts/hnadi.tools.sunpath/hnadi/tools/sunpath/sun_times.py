@@ -0,0 +1,105 @@
+"""Sunrise, sunset, solar noon and day length of all days of a year"""
+
+__all__ = ["SUN_TIMES_DTYPE", "NORMAL", "POLAR_DAY", "POLAR_NIGHT", "year_sun_times"]
+
+import numpy as np
+from functools import lru_cache
+from .solar_position import sun_equatorial
+
+# Altitude of the sun center at rising and setting: upper limb and standard refraction,
+# the United States Naval Observatory convention also used by pyephem-sunpath
+HORIZON_DEG = -0.8333
+
+# Value of the "polar" field
+NORMAL = 0
+POLAR_DAY = 1
+POLAR_NIGHT = -1
+
+SUN_TIMES_DTYPE = np.dtype(
+    [
+        ("date", "datetime64[D]"),
+        ("sunrise", "datetime64[s]"),
+        ("noon", "datetime64[s]"),
+        ("sunset", "datetime64[s]"),
+        # Hours between sunrise and sunset, 24 for polar day and 0 for polar night
+        ("day_length", "f8"),
+        ("polar", "i1"),
+    ]
+)
+
+_UNIX_EPOCH_JD = 2440587.5
+_ITERATIONS = 3
+
+
+def _local_hour_angle(jd, lon):
+    """
+    Sun declination and local hour angle wrapped to [-180, 180) (degrees)
+    """
+    dec, _, ha = sun_equatorial(jd)
+    ha = np.mod(np.degrees(ha) + lon + 180.0, 360.0) - 180.0
+    return np.degrees(dec), ha
+
+
+def _hour_angle_at_horizon(dec, lat):
+    """
+    Cosine of the hour angle when the sun crosses HORIZON_DEG
+    """
+    phi, dec = np.radians(lat), np.radians(dec)
+    return (np.sin(np.radians(HORIZON_DEG)) - np.sin(phi) * np.sin(dec)) / (np.cos(phi) * np.cos(dec))
+
+
+def _to_local(jd, tz):
+    """
+    Convert julian days to local datetime64[s]
+    """
+    seconds = np.round((jd - _UNIX_EPOCH_JD) * 86400.0 + tz * 3600.0)
+    return seconds.astype(np.int64).astype("datetime64[s]")
+
+
+@lru_cache(maxsize=32)
+def _year_sun_times(lat, lon, tz, year):
+    dates = np.arange(np.datetime64(f"{year}-01-01"), np.datetime64(f"{year + 1}-01-01"))
+    # Start from local noon of every date
+    jd_noon = dates.astype(np.int64) + _UNIX_EPOCH_JD + 0.5 - tz / 24.0
+
+    # Solar noon, the sun hour angle moves about 360 degrees a day
+    for _ in range(_ITERATIONS):
+        dec, ha = _local_hour_angle(jd_noon, lon)
+        jd_noon = jd_noon - ha / 360.0
+    dec, _ = _local_hour_angle(jd_noon, lon)
+    cos_h0 = _hour_angle_at_horizon(dec, lat)
+    polar = np.where(cos_h0 > 1.0, POLAR_NIGHT, np.where(cos_h0 < -1.0, POLAR_DAY, NORMAL)).astype(np.int8)
+
+    # Rising and setting, refine with the declination at the event
+    events = []
+    for sign in (-1.0, 1.0):
+        h0 = np.degrees(np.arccos(np.clip(cos_h0, -1.0, 1.0)))
+        jd = jd_noon + sign * h0 / 360.0
+        for _ in range(_ITERATIONS):
+            dec, ha = _local_hour_angle(jd, lon)
+            h0 = np.degrees(np.arccos(np.clip(_hour_angle_at_horizon(dec, lat), -1.0, 1.0)))
+            jd = jd + (sign * h0 - ha) / 360.0
+        events.append(jd)
+    jd_rise, jd_set = events
+
+    table = np.zeros(len(dates), dtype=SUN_TIMES_DTYPE)
+    table["date"] = dates
+    table["noon"] = _to_local(jd_noon, tz)
+    table["sunrise"] = np.where(polar == NORMAL, _to_local(jd_rise, tz), np.datetime64("NaT"))
+    table["sunset"] = np.where(polar == NORMAL, _to_local(jd_set, tz), np.datetime64("NaT"))
+    table["day_length"] = np.where(polar == NORMAL, (jd_set - jd_rise) * 24.0, np.where(polar == POLAR_DAY, 24.0, 0.0))
+    table["polar"] = polar
+    table.setflags(write=False)
+    return table
+
+
+def year_sun_times(lat, lon, tz, year, precision=2):
+    """
+    Get sunrise, sunset, solar noon (local time) and day length of all days of a year
+
+    Returns a read only structured array of SUN_TIMES_DTYPE, one row per date. Sunrise and
+    sunset are NaT on polar day and polar night. Results are cached per location, latitude
+    and longitude are rounded to precision decimals. Times are within about a minute of
+    pyephem-sunpath `sunrise` / `sunset` (a few seconds away from the polar circles).
+    """
+    return _year_sun_times(round(float(lat), precision), round(float(lon), precision), float(tz), int(year))
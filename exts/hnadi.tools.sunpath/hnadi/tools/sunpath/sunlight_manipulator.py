@@ -1,8 +1,13 @@
 __all__ = ["SunlightManipulator"]
 
+import time
+import numpy as np
 from .sunpath_data import SunpathData
-from pxr import Gf, Sdf
+from pxr import Gf, Sdf, UsdGeom
+import carb
 import omni.kit.commands
+import omni.kit.undo
+import omni.usd
 
 from . import gol
 
@@ -11,10 +16,19 @@ class SunlightManipulator:
     def __init__(self, pathmodel: SunpathData):
         self.path = None
 
-        # Get origin value from global dictionary
-        self.origin = gol.get_value("origin")
+        # Get origin value from global state
+        self.origin = gol.state.origin
         self.pathmodel = pathmodel
 
+        # Rotation and visibility before a continuous update started, None when not dragging
+        self._drag_start = None
+        # Start and end time codes of the stage before the first bake, restored by clear_bake
+        self._time_range = None
+        # Calls and seconds spent by every update path, for profiling
+        self.cost = {"command": [0, 0.0], "fast": [0, 0.0], "commit": [0, 0.0]}
+        # Times the "usd" stage, the writes to the light
+        self.timer = gol.state.profiler
+
     def add_sun(self):
         """
         Add distant light to present sunlight
@@ -22,41 +36,246 @@ class SunlightManipulator:
         omni.kit.commands.execute("CreatePrim", prim_type="DistantLight", attributes={"angle": 1.0, "intensity": 3000})
         self.path = "/World/DistantLight"
 
-    def change_sun(self):
+    def change_sun(self, interactive=False):
         """
         Change distant light property(rotation)
+
+        interactive=True is the continuous update while a slider is dragged: rotation and visibility
+        are written in one change block without undo entries. The next non interactive call records
+        the whole drag as one undoable change.
         """
 
         xr, yr = self.pathmodel.dome_rotate_angle()
-        if [xr, yr] != gol.get_value("dome_angle"):
+        if [xr, yr] != gol.state.dome_angle or (not interactive and self._drag_start is not None):
+            x, y, z = self.pathmodel.cur_sun_position()
+            visibility = "invisible" if y < 0 else "inherited"
+            start = time.perf_counter()
+            with self.timer.stage("usd"):
+                if interactive and self._write_sun(xr, yr, visibility):
+                    path = "fast"
+                elif self._drag_start is not None:
+                    path = "commit"
+                    self._commit_sun(xr, yr, visibility)
+                else:
+                    path = "command"
+                    self._command_sun(xr, yr, visibility)
+            self.cost[path][0] += 1
+            self.cost[path][1] += time.perf_counter() - start
+            if path == "commit" and self.timer.enabled:
+                carb.log_info(f"Sunlight updates: {self.cost_report()}")
+        gol.state.dome_angle = [xr, yr]
+
+    def _command_sun(self, xr, yr, visibility):
+        """
+        Change rotation and visibility with commands, two undo entries
+        """
+        omni.kit.commands.execute(
+            "TransformPrimSRT",
+            path=Sdf.Path("/World/DistantLight"),
+            new_rotation_euler=Gf.Vec3d(xr, yr, 0),
+        )
+        omni.kit.commands.execute(
+            "ChangeProperty", prop_path=Sdf.Path("/World/DistantLight.visibility"), value=visibility, prev=None
+        )
+
+    def _light_attrs(self):
+        """
+        Get the rotateXYZ and visibility attributes of the light, None when there is no light prim
+        """
+        stage = omni.usd.get_context().get_stage()
+        prim = stage.GetPrimAtPath(self.path) if stage and self.path else None
+        if prim is None or not prim.IsValid():
+            return None
+        return self._rotate_attr(prim), UsdGeom.Imageable(prim).CreateVisibilityAttr()
+
+    def _write_sun(self, xr, yr, visibility):
+        """
+        Write rotation and visibility to the edit target layer in a single change block, no undo entry
+
+        Returns False when the light prim does not exist.
+        """
+        attrs = self._light_attrs()
+        if attrs is None:
+            return False
+        rotate_attr, visibility_attr = attrs
+        if self._drag_start is None:
+            self._drag_start = (rotate_attr.Get(), visibility_attr.Get())
+
+        layer = rotate_attr.GetStage().GetEditTarget().GetLayer()
+        rotate_spec = self._attr_spec(layer, rotate_attr)
+        visibility_spec = self._attr_spec(layer, visibility_attr)
+        with Sdf.ChangeBlock():
+            rotate_spec.default = self._vec_type(rotate_attr)(xr, yr, 0)
+            visibility_spec.default = visibility
+        return True
+
+    def _commit_sun(self, xr, yr, visibility):
+        """
+        Record the end of a continuous update as one undoable change from the values before it
+        """
+        prev_rotation, prev_visibility = self._drag_start
+        self._drag_start = None
+        attrs = self._light_attrs()
+        if attrs is None:
+            return
+        rotate_attr, visibility_attr = attrs
+        with omni.kit.undo.group():
             omni.kit.commands.execute(
-                "TransformPrimSRT",
-                path=Sdf.Path("/World/DistantLight"),
-                new_rotation_euler=Gf.Vec3d(xr, yr, 0),
+                "ChangeProperty",
+                prop_path=rotate_attr.GetPath(),
+                value=self._vec_type(rotate_attr)(xr, yr, 0),
+                prev=prev_rotation,
             )
-            x, y, z = self.pathmodel.cur_sun_position()
-            if y < 0:
-                omni.kit.commands.execute(
-                    "ChangeProperty", prop_path=Sdf.Path("/World/DistantLight.visibility"), value="invisible", prev=None
-                )
-            else:
-                omni.kit.commands.execute(
-                    "ChangeProperty", prop_path=Sdf.Path("/World/DistantLight.visibility"), value="inherited", prev=None
-                )
-        gol.set_value("dome_angle", [xr, yr])
-
-    def show_sun(self):
+            omni.kit.commands.execute(
+                "ChangeProperty", prop_path=visibility_attr.GetPath(), value=visibility, prev=prev_visibility
+            )
+
+    def show_sun(self, interactive=False):
         """
         The method to add light and change it's property
         """
         if self.path is None:
             self.add_sun()
-        self.change_sun()
+        self.change_sun(interactive)
+
+    def cost_report(self):
+        """
+        Average milliseconds per update of every path, e.g. "fast 12 x 0.05 ms"
+        """
+        return ", ".join(
+            f"{name} {calls} x {seconds * 1000 / calls:.2f} ms" for name, (calls, seconds) in self.cost.items() if calls
+        )
 
     def del_sun(self):
         """
         the method to delete exisit distant light
         """
         if self.path is not None:
+            self._drag_start = None
             omni.kit.commands.execute("DeletePrims", paths=["/World/DistantLight"])
             self.path = None
+
+    def sun_track(self, start, end, step):
+        """
+        Compute distant light rotation (N, 3) and visibility of every step in [start, end), local times
+        """
+        pathmodel = self.pathmodel
+        result = SunpathData.sun_vectors(start, end, step, pathmodel.lat, pathmodel.lon, pathmodel.utc_offsets)
+        rotations = np.stack([-result.altitude, 180 - result.azimuth, np.zeros_like(result.altitude)], axis=-1)
+        return result.times, rotations, result.above_horizon
+
+    @staticmethod
+    def _rotate_attr(prim):
+        """
+        Get the rotateXYZ attribute of the light, add the xform op when missing
+        """
+        xformable = UsdGeom.Xformable(prim)
+        for op in xformable.GetOrderedXformOps():
+            if op.GetOpType() == UsdGeom.XformOp.TypeRotateXYZ:
+                return op.GetAttr()
+        return xformable.AddRotateXYZOp(UsdGeom.XformOp.PrecisionDouble).GetAttr()
+
+    @staticmethod
+    def _vec_type(attr):
+        """
+        Get the Gf vector type matching the precision of a rotate attribute
+        """
+        return Gf.Vec3f if attr.GetTypeName() == Sdf.ValueTypeNames.Float3 else Gf.Vec3d
+
+    @staticmethod
+    def _attr_spec(layer, attr):
+        """
+        Get the spec of attr in layer, create it when the attribute is authored in another layer
+        """
+        spec = layer.GetAttributeAtPath(attr.GetPath())
+        if spec is None:
+            prim_spec = Sdf.CreatePrimInLayer(layer, attr.GetPrim().GetPath())
+            spec = Sdf.AttributeSpec(prim_spec, attr.GetName(), attr.GetTypeName())
+        return spec
+
+    def bake_sun(self, start, end, step, frames_per_step=1, start_frame=0):
+        """
+        Write the rotation and visibility track of the distant light as time samples
+
+        One sample every step in [start, end) is written to frame start_frame + i * frames_per_step,
+        all in a single change block of the edit target layer, then the stage time range is set
+        to the track so the timeline plays the sun (`clear_bake` restores the former range, there is
+        no undo entry). Returns the number of samples.
+        """
+        if self.path is None:
+            self.add_sun()
+        times, rotations, visible = self.sun_track(start, end, step)
+        if len(times) == 0:
+            return 0
+
+        stage = omni.usd.get_context().get_stage()
+        prim = stage.GetPrimAtPath(self.path)
+        rotate_attr = self._rotate_attr(prim)
+        visibility_attr = UsdGeom.Imageable(prim).CreateVisibilityAttr()
+        vec_type = self._vec_type(rotate_attr)
+
+        frames = (start_frame + np.arange(len(times)) * frames_per_step).tolist()
+        # Visibility is held between samples, only keep the samples where it changes
+        changes = np.flatnonzero(np.diff(visible.astype(np.int8), prepend=np.int8(-1)))
+
+        layer = stage.GetEditTarget().GetLayer()
+        with Sdf.ChangeBlock():
+            rotate_spec = self._attr_spec(layer, rotate_attr)
+            visibility_spec = self._attr_spec(layer, visibility_attr)
+            for spec in (rotate_spec, visibility_spec):
+                for code in layer.ListTimeSamplesForPath(spec.path):
+                    layer.EraseTimeSample(spec.path, code)
+
+            for frame, rotation in zip(frames, rotations.tolist()):
+                layer.SetTimeSample(rotate_spec.path, frame, vec_type(*rotation))
+            for i in changes.tolist():
+                layer.SetTimeSample(visibility_spec.path, frames[i], "inherited" if visible[i] else "invisible")
+
+        if self._time_range is None:
+            self._time_range = (stage.GetStartTimeCode(), stage.GetEndTimeCode())
+        stage.SetStartTimeCode(frames[0])
+        stage.SetEndTimeCode(frames[-1])
+        return len(frames)
+
+    def bake_day(self, datevalue, step=5):
+        """
+        Bake the sunlight of a date (slider value), one sample every step minutes
+        """
+        start = self.pathmodel.slider_times(datevalue)
+        return self.bake_sun(start, start + np.timedelta64(1, "D"), step)
+
+    def bake_year(self, step=60):
+        """
+        Bake the sunlight of the whole year, one sample every step minutes
+        """
+        year = self.pathmodel.year
+        return self.bake_sun(np.datetime64(f"{year}-01-01T00:00"), np.datetime64(f"{year + 1}-01-01T00:00"), step)
+
+    def clear_bake(self):
+        """
+        Remove baked time samples and restore the stage time range, the light follows the sliders again
+
+        Returns the number of removed samples.
+        """
+        stage = omni.usd.get_context().get_stage()
+        if self._time_range is not None:
+            stage.SetStartTimeCode(self._time_range[0])
+            stage.SetEndTimeCode(self._time_range[1])
+            self._time_range = None
+        if self.path is None:
+            return 0
+        prim = stage.GetPrimAtPath(self.path)
+        if not prim.IsValid():
+            return 0
+        count = 0
+        layer = stage.GetEditTarget().GetLayer()
+        attrs = [self._rotate_attr(prim), UsdGeom.Imageable(prim).GetVisibilityAttr()]
+        with Sdf.ChangeBlock():
+            for attr in attrs:
+                spec = layer.GetAttributeAtPath(attr.GetPath())
+                if spec is None:
+                    continue
+                for code in layer.ListTimeSamplesForPath(spec.path):
+                    layer.EraseTimeSample(spec.path, code)
+                    count += 1
+        return count
@@ -1,19 +1,56 @@
 __all__ = ["SunpathData"]
 
+import os
+import math
+import numpy as np
+from datetime import datetime
+from functools import lru_cache
+from .solar_position import sun_position, calc_xyz, sun_vectors
+from .ephemeris_table import find_table
+from .sun_times import year_sun_times
+from .adaptive_sampling import refine
+from .horizon import horizon_runs
+from .irradiance import DEFAULT_TURBIDITY, ineichen, year_irradiance
+from .sky_matrix import cumulative_sky
+from .timezone import lookup_zone, nautical_zone, zone_offsets, zone_time_offsets
 
-import omni
+# Day of year on which every month starts (non-leap year, same as the date slider)
+_MONTH_START = np.array([0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334])
 
-# Use this method to import pyephem-sunpath packages
-omni.kit.pipapi.install("pyephem-sunpath", None, False, False, None, True, True, None)
+# Initial steps of adaptive sampling (minutes, days), refined down to day_step / year_step
+COARSE_DAY_STEP = 60
+COARSE_YEAR_STEP = 8
+
+
+def _above_horizon(points_a, points_b):
+    """
+    Segments with an end above the horizon, the only ones drawn
+    """
+    return (points_a[:, 1] >= 0) | (points_b[:, 1] >= 0)
 
-import math
-from datetime import datetime
-from pyephem_sunpath.sunpath import sunpos, sunrise, sunset
+
+@lru_cache(maxsize=32)
+def _wall_clock_sun_times(lat, lon, tz, zone, year):
+    """
+    Sun times table of a site shifted from standard time to the wall clock of zone
+    """
+    table = year_sun_times(lat, lon, tz, year)
+    result = table.copy()
+    for field in ("noon", "sunrise", "sunset"):
+        times = table[field]
+        utc = times - np.timedelta64(int(round(tz * 3600)), "s")
+        shift = np.round((zone_time_offsets(zone, utc, True, tz) - tz) * 3600).astype(np.int64)
+        result[field] = times + shift.astype("timedelta64[s]")
+    result.setflags(write=False)
+    return result
 
 
 class SunpathData:
     """Generate sunpath data"""
 
+    # Directory of precomputed ephemeris tables (see ephemeris_table), None to always compute
+    table_dir = os.environ.get("SUNPATH_EPHEMERIS_DIR")
+
     def __init__(self, datevalue, hour, min, lon, lat):
         self.datevalue = datevalue
         self.year = datetime.now().year
@@ -22,8 +59,18 @@ class SunpathData:
         self.lon = lon
         self.min = min
 
-        # Compute the timezone
-        self.tz = round(self.lon / 15)
+        # IANA zone of the location (None for a fixed offset) and its standard UTC offset (hours),
+        # the zone follows the location until set_timezone is given one
+        self.set_timezone()
+
+        # Sampling step of day path (minutes) and '8' shape curve (days)
+        self.day_step = 5
+        self.year_step = 2
+        # Chord tolerance on the unit sphere of adaptive sampling, None for fixed steps
+        self.tolerance = None
+        # Site height (meters) and Linke turbidity (one or twelve monthly values) of clear sky irradiance
+        self.elevation = 0.0
+        self.turbidity = DEFAULT_TURBIDITY
 
     def set_date(self, value):
         """
@@ -48,12 +95,92 @@ class SunpathData:
         The method to reset longitude parameter
         """
         self.lon = value
+        if self.auto_zone:
+            self.set_timezone()
 
     def set_latitude(self, value):
         """
         The method to reset latitude parameter
         """
         self.lat = value
+        if self.auto_zone:
+            self.set_timezone()
+
+    def set_timezone(self, value=None):
+        """
+        The method to reset the timezone, an IANA name, a fixed UTC offset (hours, no daylight saving
+        time) or None to look the zone of the location up in the bundled zone grid
+        """
+        self.auto_zone = value is None
+        if isinstance(value, str) or value is None:
+            zone = lookup_zone(self.lat, self.lon) if value is None else value
+            offsets = zone_offsets(zone, self.year)
+            if offsets is None:
+                if value is not None:
+                    raise ValueError(f"unknown timezone {value!r}")
+                # No zoneinfo, the nautical zone of the longitude
+                zone, offsets = nautical_zone(self.lon), None
+            self.zone = zone
+            self.tz = round(self.lon / 15) if offsets is None else offsets.standard
+        else:
+            self.zone = None
+            self.tz = float(value)
+
+    def has_dst(self, year=None):
+        """
+        Whether the UTC offset of the zone changes in year
+        """
+        if self.zone is None:
+            return False
+        offsets = zone_offsets(self.zone, self.year if year is None else year)
+        return offsets is not None and len(offsets.transitions) > 0
+
+    def utc_offsets(self, times, utc=False):
+        """
+        UTC offsets (hours) of an array of local (wall clock) times, or of utc times, daylight saving
+        time included
+        """
+        if self.zone is None:
+            return np.full(np.shape(times), float(self.tz))
+        return zone_time_offsets(self.zone, times, utc, self.tz)
+
+    def standard_times(self, times):
+        """
+        Convert local (wall clock) times to the standard time of the zone
+        """
+        if not self.has_dst():
+            return times
+        times = np.asarray(times).astype("datetime64[s]")
+        shift = np.round((self.utc_offsets(times) - self.tz) * 3600).astype(np.int64)
+        return times - shift.astype("timedelta64[s]")
+
+    def set_sampling(self, day_step, year_step):
+        """
+        The method to reset sampling step of paths
+        """
+        self.day_step = day_step
+        self.year_step = year_step
+
+    def set_tolerance(self, value):
+        """
+        The method to reset the chord tolerance of paths on the unit sphere, None or 0 for fixed steps
+
+        The value is rounded down to a power of two, so small scale changes keep cached paths.
+        """
+        self.tolerance = self.round_tolerance(value)
+
+    @staticmethod
+    def round_tolerance(value):
+        """
+        Chord tolerance rounded down to a power of two, None for 0 or None
+        """
+        return 2.0 ** math.floor(math.log2(value)) if value else None
+
+    def sampling(self):
+        """
+        Get sampling parameters of paths
+        """
+        return (self.day_step, self.year_step, self.tolerance)
 
     @staticmethod
     def calc_xyz(alt, azm):
@@ -66,59 +193,165 @@ class SunpathData:
         length = (x_val**2 + y_val**2 + z_val**2) ** 0.5
         return [-x_val / length, z_val / length, y_val / length]
 
+    def slider_times(self, datevalues, hours=0, mins=0):
+        """
+        Convert arrays of slider values (date, hour, minite) to local datetime64 array
+        """
+        datevalues = np.asarray(datevalues)
+        month = np.searchsorted(_MONTH_START, datevalues, side="left")
+        days = np.datetime64(f"{self.year}-01", "M") + (month - 1)
+        days = days.astype("datetime64[D]") + (datevalues - _MONTH_START[month - 1] - 1)
+        minutes = np.asarray(hours) * 60 + np.asarray(mins)
+        return days.astype("datetime64[m]") + minutes
+
+    def sun_positions(self, times, lat=None, lon=None, tz=None):
+        """
+        Get sun altitude, azimuth and Cartesian position of arrays of local times
+
+        lat, lon and tz default to the model location and may also be arrays. Without tz the times
+        are wall clock times of the zone, daylight saving time included.
+        """
+        if tz is None:
+            times = self.standard_times(times)
+        lat = self.lat if lat is None else lat
+        lon = self.lon if lon is None else lon
+        tz = self.tz if tz is None else tz
+
+        # Interpolate from the table of the site when there is one
+        if np.ndim(lat) == 0 and np.ndim(lon) == 0 and np.ndim(tz) == 0:
+            table = find_table(self.table_dir, float(lat), float(lon), float(tz), self.year)
+            if table is not None and table.covers(times):
+                return table.sun_positions(times)
+
+        alt, azm = sun_position(times, lat, lon, tz)
+        return alt, azm, calc_xyz(alt, azm)
+
+    @staticmethod
+    def sun_vectors(start, end, step, lat, lon, tz, dtype=np.float64):
+        """
+        Get sun vectors of a date range without touching the slider state
+
+        step is a timedelta or a number of minutes, see `solar_position.sun_vectors`, tz may be a
+        function of the times like `utc_offsets`.
+        """
+        return sun_vectors(start, end, step, lat, lon, tz, dtype)
+
     def dome_rotate_angle(self):
         """
         Compute dome rotate angle
         """
-        month, day = self.slider_to_datetime(self.datevalue)
-        thetime = datetime(self.year, month, day, self.hour, self.min)
-        alt, azm = sunpos(thetime, self.lat, self.lon, self.tz, dst=False)
-        return -alt, 180 - azm
+        alt, azm, _ = self.sun_positions(self.slider_times(self.datevalue, self.hour, self.min))
+        return -float(alt[0]), 180 - float(azm[0])
 
     def get_sun_position(self, thetime, lat, lon, tz):
         """
         Get sun position of exact time
         """
-        alt, azm = sunpos(thetime, lat, lon, tz, dst=False)
-        position = self.calc_xyz(alt, azm)
-        return position
+        _, _, position = self.sun_positions(thetime, lat, lon, tz)
+        return position[0].tolist()
 
     def cur_sun_position(self):
         """
         Get sun position of  current time(input)
         """
-        month, day = self.slider_to_datetime(self.datevalue)
-        thetime = datetime(self.year, month, day, self.hour, self.min)
-        return self.get_sun_position(thetime, self.lat, self.lon, self.tz)
+        _, _, position = self.sun_positions(self.slider_times(self.datevalue, self.hour, self.min))
+        return position[0].tolist()
+
+    def _sample_paths(self, starts, unit, span, step, coarse_step):
+        """
+        Sample one curve per start time, params go from 0 to span in units of unit seconds
+
+        Fixed steps without a tolerance, otherwise refined from coarse_step. Returns the function
+        evaluating the curves, params, points and curve indices (see `adaptive_sampling.refine`).
+        Paths are in standard time, the '8' shape curves do not jump at daylight saving changes.
+        """
+
+        def curve_points(params, curves):
+            return self.sun_positions(starts[curves] + np.round(params * unit).astype(np.int64), tz=self.tz)[2]
+
+        if self.tolerance is None:
+            grid = np.append(np.arange(0, span, step), span)
+        else:
+            grid = np.append(np.arange(0, span, coarse_step), span)
+        params = np.tile(grid.astype(np.float64), len(starts))
+        curves = np.repeat(np.arange(len(starts)), len(grid))
+        if self.tolerance is None:
+            return curve_points, params, curve_points(params, curves), curves
+        params, points, curves = refine(curve_points, params, curves, self.tolerance, step, _above_horizon)
+        return curve_points, params, points, curves
+
+    def day_path_runs(self, datevalues):
+        """
+        Get sun paths of several dates, one list of (N, 3) runs above the horizon per date
+
+        Runs end exactly on the horizon at sunrise and sunset. With a tolerance, samples are only
+        added where a path bends away from its chords.
+        """
+        starts = self.slider_times(np.asarray(datevalues)).astype("datetime64[s]")
+        fn, params, points, curves = self._sample_paths(starts, 60, 24 * 60, self.day_step, COARSE_DAY_STEP)
+        return horizon_runs(fn, params, points, curves, len(starts), tolerance=self.tolerance)
+
+    def sametime_runs(self, hours):
+        """
+        Get all year sametime paths ('8' shape curve) of several hours, one list of runs per hour
+        """
+        hours = np.asarray(hours)
+        starts = self.slider_times(np.ones_like(hours), hours).astype("datetime64[s]")
+        fn, params, points, curves = self._sample_paths(starts, 86400, 364, self.year_step, COARSE_YEAR_STEP)
+        return horizon_runs(fn, params, points, curves, len(starts), tolerance=self.tolerance)
 
     def all_day_position(self, datevalue):
         """
         Get sun posion of all day(exact date)
         """
-        points = []
-        month, day = self.slider_to_datetime(datevalue)
-        for t in range(24):
-            for m in range(0, 60, 5):
-                thetime = datetime(self.year, month, day, t, m)
-                pos = self.get_sun_position(thetime, self.lat, self.lon, self.tz)
-                if pos[1] >= 0:
-                    points.append(pos)
-        return points
+        return self.all_day_positions([datevalue])[0]
+
+    def all_day_positions(self, datevalues):
+        """
+        Get sun posions above the horizon of all day of several dates, a list of point lists
+        """
+        return [np.concatenate(runs).tolist() if runs else [] for runs in self.day_path_runs(datevalues)]
 
     def all_year_sametime_position(self, hour):
         """
         Get all year sametime position
         """
-        points = []
-        for d in range(1, 366, 2):
-            month, day = self.slider_to_datetime(d)
-            thetime = datetime(self.year, month, day, hour)
-            pos = self.get_sun_position(thetime, self.lat, self.lon, self.tz)
-            if pos[1] >= 0:
-                points.append(pos)
-        if len(points) > 0:
-            points.append(points[0])
-        return points
+        return self.all_year_sametime_positions([hour])[0]
+
+    def all_year_sametime_positions(self, hours):
+        """
+        Get all year sametime positions above the horizon of several hours, a list of point lists
+        """
+        return [np.concatenate(runs).tolist() if runs else [] for runs in self.sametime_runs(hours)]
+
+    def irradiance(self, year=None, step=60):
+        """
+        Get clear sky DNI, DHI and GHI of every step (minutes) of a year, local standard time
+
+        A structured array cached per site, see `irradiance.year_irradiance`.
+        """
+        year = self.year if year is None else year
+        return year_irradiance(self.lat, self.lon, self.tz, year, step, self.elevation, self.turbidity)
+
+    def sky_matrix(self, step=60, subdivision=1, year=None):
+        """
+        Get the clear sky cumulative sky matrix of a year sampled every step (minutes), cached per site
+
+        subdivision 1 gives the 145 Tregenza patches, 2 or more the Reinhart ones, see `sky_matrix`.
+        """
+        year = self.year if year is None else year
+        return cumulative_sky(self.lat, self.lon, self.tz, year, step, subdivision, self.elevation, self.turbidity)
+
+    def path_irradiance(self, points, datevalue):
+        """
+        Get clear sky DNI, DHI and GHI at the unit sphere points of the day path of datevalue
+        """
+        altitude = np.degrees(np.arcsin(np.clip(np.asarray(points, dtype=np.float64)[:, 1], -1.0, 1.0)))
+        day = self.slider_times(datevalue).astype("datetime64[D]")
+        turbidity = np.atleast_1d(self.turbidity)
+        turbidity = turbidity[int(day.astype("datetime64[M]").astype(np.int64)) % 12 if len(turbidity) == 12 else 0]
+        day_of_year = int((day - np.datetime64(f"{self.year}-01-01")).astype(np.int64)) + 1
+        return ineichen(altitude, day_of_year, self.elevation, turbidity)
 
     def get_cur_time(self):
         """
@@ -128,21 +361,37 @@ class SunpathData:
         thetime = datetime(self.year, month, day, self.hour, self.min)
         return thetime
 
+    def sun_times(self, year=None):
+        """
+        Get sunrise, sunset, solar noon and day length of all days of a year (structured array)
+
+        Times are wall clock times of the zone, daylight saving time included.
+        """
+        year = self.year if year is None else year
+        if not self.has_dst(year):
+            return year_sun_times(self.lat, self.lon, self.tz, year)
+        return _wall_clock_sun_times(round(self.lat, 2), round(self.lon, 2), self.tz, self.zone, year)
+
+    def get_day_sun_times(self):
+        """
+        Get sunrise, sunset, solar noon and day length of exact date
+        """
+        date = self.slider_times(self.datevalue).astype("datetime64[D]")
+        return self.sun_times()[int((date - np.datetime64(f"{self.year}-01-01")).astype(int))]
+
     def get_sunrise_time(self):
         """
-        Get sunrise time of exact date
+        Get sunrise time of exact date, None on polar day or polar night
         """
-        month, day = self.slider_to_datetime(self.datevalue)
-        thetime = datetime(self.year, month, day, self.hour, self.min)
-        return sunrise(thetime, self.lat, self.lon, self.tz, dst=False).time()
+        sunrise = self.get_day_sun_times()["sunrise"]
+        return None if np.isnat(sunrise) else sunrise.astype(datetime).time()
 
     def get_sunset_time(self):
         """
-        Get sunset time of exact date
+        Get sunset time of exact date, None on polar day or polar night
         """
-        month, day = self.slider_to_datetime(self.datevalue)
-        thetime = datetime(self.year, month, day, self.hour, self.min)
-        return sunset(thetime, self.lat, self.lon, self.tz, dst=False).time()
+        sunset = self.get_day_sun_times()["sunset"]
+        return None if np.isnat(sunset) else sunset.astype(datetime).time()
 
     @staticmethod
     def slider_to_datetime(datevalue):
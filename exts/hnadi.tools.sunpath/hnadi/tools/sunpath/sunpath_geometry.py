@@ -0,0 +1,283 @@
+"""Sunpath diagram geometry without Kit
+
+Builds the polylines and label anchors of the elements drawn by `DrawSunpath` as float32 arrays,
+relative to the diagram origin and multiplied by scale. The polylines of a group of elements are
+packed in one `Polylines`: all points in one (N, 3) array and offsets (K + 1,), polyline i is
+points[offsets[i]:offsets[i + 1]]. Keys follow the scene items: ("day", date, run), ("hour", h, run),
+("circle", offset), ("cross", i), ("arrow", i), ("tick", i). Sun paths are split in runs above the
+horizon, a run ends on the horizon.
+
+`DiagramGeometry` keeps the unit geometry of one location and date, the diagrams drawn at once share
+it and only differ by their transforms.
+"""
+
+__all__ = [
+    "PATH_DATES",
+    "Polylines",
+    "pack_polylines",
+    "polyline",
+    "iter_polylines",
+    "circle_points",
+    "day_paths",
+    "sametime_paths",
+    "compass_polylines",
+    "compass_labels",
+    "gesture_block",
+    "diagram_polylines",
+    "diagram_curves",
+    "diagram_labels",
+    "DiagramGeometry",
+]
+
+import numpy as np
+from collections import namedtuple
+from functools import lru_cache
+from .sunpath_data import SunpathData
+
+# Dates (slider values) of the day paths of the diagram, besides the current date
+PATH_DATES = (172, 355, 80, 110, 295)
+
+Polylines = namedtuple("Polylines", ["keys", "points", "offsets"])
+
+
+def pack_polylines(keys, arrays):
+    """
+    Pack (N_i, 3) arrays into one Polylines
+    """
+    arrays = [np.asarray(a, dtype=np.float32).reshape(-1, 3) for a in arrays]
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    np.cumsum([len(a) for a in arrays], out=offsets[1:])
+    points = np.concatenate(arrays) if arrays else np.zeros((0, 3), dtype=np.float32)
+    return Polylines(tuple(keys), points, offsets)
+
+
+def polyline(polylines: Polylines, i):
+    """
+    Points of polyline i, a view into the packed array
+    """
+    return polylines.points[polylines.offsets[i] : polylines.offsets[i + 1]]
+
+
+def iter_polylines(polylines: Polylines):
+    """
+    Iterate (key, points) of the packed polylines
+    """
+    for i, key in enumerate(polylines.keys):
+        yield key, polyline(polylines, i)
+
+
+def _read_only(polylines: Polylines):
+    polylines.points.setflags(write=False)
+    polylines.offsets.setflags(write=False)
+    return polylines
+
+
+def circle_points(offset, step, scale=1.0):
+    """
+    Points of a horizontal circle of radius offset * scale, every step degrees from 0 to 360 included
+    """
+    angles = np.radians(np.arange(0, 361, step, dtype=np.float64))
+    radius = scale * offset
+    return np.stack([radius * np.cos(angles), np.zeros_like(angles), radius * np.sin(angles)], axis=-1).astype(
+        np.float32
+    )
+
+
+def _pack_runs(keys, paths, scale):
+    """
+    Pack the runs of paths, the key of a run is the key of its path plus the run index
+    """
+    run_keys, arrays = [], []
+    for key, runs in zip(keys, paths):
+        for i, run in enumerate(runs):
+            run_keys.append(key + (i,))
+            arrays.append(run)
+    polylines = pack_polylines(run_keys, arrays)
+    if scale == 1.0:
+        return polylines
+    return polylines._replace(points=polylines.points * np.float32(scale))
+
+
+def day_paths(pathmodel: SunpathData, datevalues, scale=1.0, path_cache=None, keys=None):
+    """
+    Sun paths of dates above the horizon, path_cache (SunpathGeometryCache) reuses unit points
+
+    keys of the paths default to ("day", date).
+    """
+    if path_cache is None:
+        paths = pathmodel.day_path_runs(datevalues)
+    else:
+        paths = path_cache.day_paths(pathmodel, datevalues)
+    return _pack_runs(keys or [("day", d) for d in datevalues], paths, scale)
+
+
+def sametime_paths(pathmodel: SunpathData, hours, scale=1.0, path_cache=None):
+    """
+    Sun positions of the same hours all year above the horizon, the '8' shape curves
+    """
+    if path_cache is None:
+        paths = pathmodel.sametime_runs(hours)
+    else:
+        paths = path_cache.sametime_paths(pathmodel, hours)
+    return _pack_runs([("hour", h) for h in hours], paths, scale)
+
+
+@lru_cache(maxsize=8)
+def compass_polylines(scale=1.0, circle_step=1):
+    """
+    Circles, cross lines, direction arrows and tick-marks of the compass, read only Polylines by group name
+
+    circle_step is the angle (degrees) between the points of the circles, coarser for far away diagrams.
+    """
+    origin = np.zeros((1, 3), dtype=np.float32)
+    points_a = circle_points(1.15, 90, scale)
+    points_b = circle_points(1.25, 90, scale)
+    points_c = circle_points(1.15, 2, scale)
+    ticks_a = circle_points(1, 30, scale)
+    ticks_b = circle_points(1.06, 30, scale)
+
+    groups = {
+        "circle": pack_polylines(
+            [("circle", 1), ("circle", 1.04)], [circle_points(o, circle_step, scale) for o in (1, 1.04)]
+        ),
+        "cross": pack_polylines(
+            [("cross", i) for i in range(len(points_b))], [np.concatenate([p[None], origin]) for p in points_b]
+        ),
+        "arrow": pack_polylines(
+            [("arrow", i) for i in range(4)],
+            [np.stack([points_b[i], points_c[c], points_a[i], points_b[i]]) for i, c in enumerate(range(1, 181, 45))],
+        ),
+        "tick": pack_polylines(
+            [("tick", i) for i in range(len(ticks_a))], [np.stack(pair) for pair in zip(ticks_a, ticks_b)]
+        ),
+    }
+    return {name: _read_only(polylines) for name, polylines in groups.items()}
+
+
+def compass_labels(scale=1.0):
+    """
+    Direction and degree labels of the compass, a list of (key, text, position)
+    """
+    labels = []
+    for i, (text, position) in enumerate(zip("ESWN", circle_points(1.33, 90, scale))):
+        labels.append((("direction", i), text, position))
+    degrees = [f"{d}" for d in range(0, 361, 30)]
+    degrees = degrees[3:12] + degrees[:3]
+    for i, position in enumerate(circle_points(1.1, 30, scale)[:12]):
+        labels.append((("degree", i), degrees[i], position))
+    return labels
+
+
+def gesture_block(scale=1.0):
+    """
+    Center and length (tick-mark length) of the block that moves the diagram
+    """
+    length = float(circle_points(1.06, 30, scale)[3, 2] - circle_points(1, 30, scale)[3, 2])
+    return circle_points(1.03, 90, scale)[3], length
+
+
+def diagram_polylines(pathmodel: SunpathData, scale=1.0, path_cache=None):
+    """
+    All polylines of the diagram by group: "current" date path, "day" PATH_DATES paths,
+    "hour" 24 '8' shape curves and the compass groups
+    """
+    groups = {
+        "current": day_paths(pathmodel, [pathmodel.datevalue], scale, path_cache, keys=[("day", "current")]),
+        "day": day_paths(pathmodel, PATH_DATES, scale, path_cache),
+        "hour": sametime_paths(pathmodel, range(24), scale, path_cache),
+    }
+    groups.update(compass_polylines(scale))
+    return groups
+
+
+def diagram_curves(pathmodel: SunpathData, scale=1.0, path_cache=None):
+    """
+    All curves of the diagram as a dictionary of key to (N, 3) points
+    """
+    curves = {}
+    for polylines in diagram_polylines(pathmodel, scale, path_cache).values():
+        curves.update(iter_polylines(polylines))
+    return curves
+
+
+def diagram_labels(pathmodel: SunpathData, scale=1.0):
+    """
+    Compass labels and the sunrise, sunset and datetime information, a list of (key, text, position)
+    """
+    anchor = circle_points(1.5, 90, scale)
+    labels = compass_labels(scale)
+    labels.append(("sunrise", f"sunrise: {pathmodel.get_sunrise_time() or 'none'}".upper(), anchor[0]))
+    labels.append(("sunset", f"sunset: {pathmodel.get_sunset_time() or 'none'}".upper(), anchor[2]))
+    labels.append(("datetime", f"datetime: {pathmodel.get_cur_time()}".upper(), anchor[3]))
+    return labels
+
+
+class DiagramGeometry:
+    """Unit geometry (radius 1) of the location and date of pathmodel, shared by the diagrams drawn at once
+
+    Packed polylines and the position lists of their curves are built on first use and kept, so the
+    next diagram of the same location and date costs lookups only. key tells whether it still
+    matches pathmodel, build a new one once it does not.
+    """
+
+    def __init__(self, pathmodel: SunpathData, path_cache=None):
+        self.pathmodel = pathmodel
+        # SunpathGeometryCache of the unit paths, shared across locations
+        self.path_cache = path_cache
+        self.key = self.make_key(pathmodel, path_cache)
+        self._polylines = {}
+        # Polylines id to (polylines, [(key, points, positions)]), polylines is kept so the id stays valid
+        self._items = {}
+
+    @staticmethod
+    def make_key(pathmodel: SunpathData, path_cache=None):
+        """
+        Build the key of the geometry from the location, sampling and date of pathmodel
+        """
+        if path_cache is None:
+            site = (pathmodel.lat, pathmodel.lon, pathmodel.tz, pathmodel.year, pathmodel.sampling())
+        else:
+            site = path_cache.make_key(pathmodel)
+        return site + (pathmodel.datevalue,)
+
+    def _get(self, key, build_fn):
+        polylines = self._polylines.get(key)
+        if polylines is None:
+            polylines = self._polylines[key] = _read_only(build_fn())
+        return polylines
+
+    def day_paths(self, datevalues, keys=None):
+        """
+        Unit sun paths of dates, see `day_paths`
+        """
+        datevalues = tuple(datevalues)
+        keys = tuple(keys) if keys else None
+        return self._get(
+            ("day", datevalues, keys), lambda: day_paths(self.pathmodel, datevalues, 1.0, self.path_cache, keys)
+        )
+
+    def sametime_paths(self, hours):
+        """
+        Unit '8' shape curves of hours, see `sametime_paths`
+        """
+        hours = tuple(hours)
+        return self._get(("hour", hours), lambda: sametime_paths(self.pathmodel, hours, 1.0, self.path_cache))
+
+    @staticmethod
+    def compass(circle_step=1):
+        """
+        Unit compass polylines, see `compass_polylines`
+        """
+        return compass_polylines(1.0, circle_step)
+
+    def items(self, polylines: Polylines):
+        """
+        (key, points, positions) of every polyline, positions is the list handed to the scene items
+
+        The lists are built once per polylines and must not be changed.
+        """
+        entry = self._items.get(id(polylines))
+        if entry is None or entry[0] is not polylines:
+            entry = (polylines, [(key, points, points.tolist()) for key, points in iter_polylines(polylines)])
+            self._items[id(polylines)] = entry
+        return entry[1]
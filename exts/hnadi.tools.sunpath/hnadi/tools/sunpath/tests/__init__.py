@@ -0,0 +1,8 @@
+from .test_update_scheduler import *
+from .test_path_sampling import *
+from .test_horizon import *
+from .test_timezone import *
+from .test_sun_hours import *
+from .test_sky_matrix import *
+from .test_irradiance import *
+from .test_adaptive_sampling import *
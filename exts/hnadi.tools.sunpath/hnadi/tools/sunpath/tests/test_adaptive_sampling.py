@@ -0,0 +1,76 @@
+"""Checks of the chord error bound of adaptive sampling"""
+
+__all__ = ["TestRefine"]
+
+import unittest
+import numpy as np
+from ..adaptive_sampling import refine, split_curves
+from ..sunpath_data import SunpathData
+
+
+def circle_and_line(params, curves):
+    """Unit circle for curve 0, a straight line for curve 1"""
+    angles = np.asarray(params)
+    line = np.asarray(curves) == 1
+    x = np.where(line, angles, np.cos(angles))
+    y = np.where(line, 0.0, np.sin(angles))
+    return np.stack([x, y, np.zeros_like(x)], axis=-1)
+
+
+def chord_errors(fn, params, points, curves, count=16):
+    """Largest distance of the curve to the chords, count points between every pair of samples"""
+    same = curves[1:] == curves[:-1]
+    a, b, c = params[:-1][same], params[1:][same], curves[:-1][same]
+    fractions = np.linspace(0, 1, count)[1:-1]
+    inner = (a[:, None] + (b - a)[:, None] * fractions).ravel()
+    chord = points[:-1][same][:, None] + (points[1:][same] - points[:-1][same])[:, None] * fractions[:, None]
+    curve = fn(inner, np.repeat(c, len(fractions))).reshape(chord.shape)
+    return np.linalg.norm(curve - chord, axis=-1).max()
+
+
+class TestRefine(unittest.TestCase):
+    def setUp(self):
+        grid = np.linspace(0, 2 * np.pi, 5)
+        self.params = np.tile(grid, 2)
+        self.curves = np.repeat([0, 1], len(grid))
+
+    def test_chord_error_within_tolerance(self):
+        for tolerance in (1e-2, 1e-3, 1e-4):
+            params, points, curves = refine(circle_and_line, self.params, self.curves, tolerance, 1e-6)
+            self.assertLessEqual(chord_errors(circle_and_line, params, points, curves), tolerance)
+            # A straight line needs no more samples
+            self.assertEqual((curves == 1).sum(), 5)
+            # Sorted within every curve, the points are those of the params
+            for curve_params in split_curves(params, curves, 2):
+                self.assertTrue((np.diff(curve_params) > 0).all())
+            np.testing.assert_allclose(points, circle_and_line(params, curves))
+
+    def test_min_step(self):
+        params, _, curves = refine(circle_and_line, self.params, self.curves, 1e-9, 0.1)
+        steps = np.diff(params)[curves[1:] == curves[:-1]]
+        self.assertGreaterEqual(steps.min(), 0.05)
+
+    def test_keep_and_force(self):
+        params, _, curves = refine(
+            circle_and_line, self.params, self.curves, 1e-3, 1e-6, keep=lambda a, b: a[:, 1] + b[:, 1] > 0
+        )
+        lower = split_curves(params, curves, 2)[0]
+        self.assertEqual(((lower > np.pi) & (lower < 2 * np.pi)).sum(), 1)
+        params, _, curves = refine(circle_and_line, self.params, self.curves, 1.0, 0.5, force=lambda a, b: a[:, 0] > -2)
+        self.assertTrue((np.diff(split_curves(params, curves, 2)[1]) <= 0.5 + 1e-9).all())
+
+    def test_day_paths_within_tolerance(self):
+        pathmodel = SunpathData(172, 12, 0, 116.0, 40.0)
+        pathmodel.set_tolerance(2**-8)
+        fixed = SunpathData(172, 12, 0, 116.0, 40.0)
+        fixed.set_sampling(1, 1)
+        runs = pathmodel.day_path_runs([172])[0]
+        dense = fixed.day_path_runs([172])[0]
+        self.assertEqual(len(runs), len(dense))
+        self.assertLess(len(runs[0]), len(dense[0]) / 4)
+        # Every dense sample is within tolerance of the adaptive polyline
+        a, b = runs[0][:-1].astype(np.float64), runs[0][1:].astype(np.float64)
+        p = dense[0][:, None].astype(np.float64)
+        t = np.clip(np.einsum("ijk,jk->ij", p - a, b - a) / np.einsum("jk,jk->j", b - a, b - a), 0, 1)
+        distance = np.linalg.norm(p - (a + t[..., None] * (b - a)), axis=-1).min(axis=1)
+        self.assertLess(distance.max(), 2**-8 * 1.5)
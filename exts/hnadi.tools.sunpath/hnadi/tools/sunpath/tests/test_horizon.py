@@ -0,0 +1,67 @@
+"""Checks of the runs above the horizon the sun paths are split into"""
+
+__all__ = ["TestHorizonRuns"]
+
+import unittest
+import numpy as np
+from ..horizon import horizon_runs
+from ..sunpath_data import SunpathData
+
+# Heights of the circles: below the horizon, crossing it twice starting below or above, above it
+LIFTS = np.array([-1.5, -0.3, 0.3, 1.5])
+
+
+def circles(params, curves):
+    """Circles lifted by LIFTS[curves], params go around them once from 0 to 1"""
+    angles = np.asarray(params) * 2 * np.pi
+    points = np.stack([np.cos(angles), np.sin(angles) + LIFTS[curves], np.full(len(angles), 0.5)], axis=-1)
+    return points / np.linalg.norm(points, axis=-1, keepdims=True)
+
+
+def crossing(angle):
+    point = np.array([np.cos(angle), 0.0, 0.5])
+    return point / np.linalg.norm(point)
+
+
+class TestHorizonRuns(unittest.TestCase):
+    def test_endpoints_on_horizon(self):
+        pathmodel = SunpathData(100, 12, 0, 120, 40)
+        pathmodel.set_tolerance(2**-7)
+        for runs in pathmodel.day_path_runs(np.arange(1, 366, 30)):
+            self.assertEqual(len(runs), 1)
+            run = runs[0]
+            self.assertEqual(run[0, 1], 0)
+            self.assertEqual(run[-1, 1], 0)
+            self.assertTrue((run[:, 1] >= 0).all())
+            np.testing.assert_allclose(np.linalg.norm(run, axis=-1), 1, atol=1e-6)
+
+    def sample(self, periodic=True):
+        grid = np.linspace(0, 1, 41)
+        params = np.tile(grid, len(LIFTS))
+        curves = np.repeat(np.arange(len(LIFTS)), len(grid))
+        return horizon_runs(circles, params, circles(params, curves), curves, len(LIFTS), periodic=periodic)
+
+    def test_crossings_are_roots(self):
+        below, rising, falling, above = self.sample()
+        self.assertEqual(below, [])
+        rise, fall = np.arcsin(0.3), np.pi - np.arcsin(0.3)
+        self.assertEqual(len(rising), 1)
+        np.testing.assert_allclose(rising[0][0], crossing(rise), atol=1e-4)
+        np.testing.assert_allclose(rising[0][-1], crossing(fall), atol=1e-4)
+        # Starts above the horizon, the last and first pieces are joined at the end of the period
+        self.assertEqual(len(falling), 1)
+        np.testing.assert_allclose(falling[0][0], crossing(-rise), atol=1e-4)
+        np.testing.assert_allclose(falling[0][-1], crossing(np.pi + rise), atol=1e-4)
+        # Always above the horizon, closed
+        self.assertEqual(len(above), 1)
+        np.testing.assert_array_equal(above[0][0], above[0][-1])
+        for run in rising + falling:
+            self.assertEqual((run[0, 1], run[-1, 1]), (0, 0))
+            self.assertTrue((run[1:-1, 1] > 0).all())
+
+    def test_open_curve(self):
+        below, rising, falling, above = self.sample(periodic=False)
+        self.assertEqual([len(below), len(rising), len(falling), len(above)], [0, 1, 2, 1])
+        self.assertEqual(falling[0][-1, 1], 0)
+        self.assertEqual(falling[1][0, 1], 0)
+        self.assertEqual(len(above[0]), 41)
@@ -0,0 +1,51 @@
+"""Checks of the clear sky irradiance models"""
+
+__all__ = ["TestIrradiance"]
+
+import unittest
+import numpy as np
+from ..irradiance import SOLAR_CONSTANT, extraterrestrial, haurwitz, ineichen, relative_airmass, year_irradiance
+
+
+class TestIrradiance(unittest.TestCase):
+    def test_extraterrestrial(self):
+        days = np.arange(1, 366)
+        values = extraterrestrial(days)
+        self.assertTrue((np.abs(values / SOLAR_CONSTANT - 1) < 0.036).all())
+        # Perihelion early in January, aphelion early in July
+        self.assertLess(days[values.argmax()], 10)
+        self.assertTrue(175 < days[values.argmin()] < 195)
+
+    def test_airmass(self):
+        self.assertAlmostEqual(float(relative_airmass(90.0)), 1.0, places=3)
+        self.assertTrue(np.isnan(relative_airmass(-1.0)))
+        self.assertAlmostEqual(float(haurwitz(90.0)), 1098.0 * np.exp(-0.059))
+
+    def test_components(self):
+        altitude = np.array([-10.0, 0.0, 5.0, 30.0, 60.0, 90.0])
+        dni, dhi, ghi = ineichen(altitude, 172)
+        np.testing.assert_allclose(ghi, dhi + dni * np.maximum(np.sin(np.radians(altitude)), 0.0))
+        np.testing.assert_array_equal(ghi[:2], 0)
+        np.testing.assert_array_equal(dni[:2], 0)
+        self.assertTrue((np.diff(ghi[1:]) > 0).all())
+        self.assertTrue(900 < ghi[-1] < 1100)
+        self.assertTrue((dhi >= 0).all())
+
+    def test_turbidity_and_elevation(self):
+        clear, _, _ = ineichen(45.0, 172, turbidity=2.0)
+        hazy, _, _ = ineichen(45.0, 172, turbidity=6.0)
+        high, _, _ = ineichen(45.0, 172, elevation=3000.0, turbidity=2.0)
+        self.assertGreater(clear, hazy)
+        self.assertGreater(high, clear)
+
+    def test_year_irradiance(self):
+        table = year_irradiance(40.0, 116.0, 8, 2024)
+        self.assertEqual(len(table), 366 * 24)
+        self.assertFalse(table.flags.writeable)
+        self.assertEqual(table["time"][13], np.datetime64("2024-01-01T13:00"))
+        self.assertTrue((table["ghi"][table["altitude"] <= 0] == 0).all())
+        self.assertIs(year_irradiance(40.001, 116.0, 8, 2024), table)
+        monthly = year_irradiance(40.0, 116.0, 8, 2024, turbidity=[3.0] * 12)
+        np.testing.assert_allclose(monthly["ghi"], table["ghi"])
+        with self.assertRaises(ValueError):
+            year_irradiance(40.0, 116.0, 8, 2024, turbidity=[3.0, 4.0])
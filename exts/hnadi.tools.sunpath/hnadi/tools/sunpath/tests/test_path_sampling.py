@@ -0,0 +1,60 @@
+"""Headless checks of when the shared sun paths are resampled for the diagrams
+
+Runs on plain CPython (and in the Kit test runner), the state does not need Kit.
+"""
+
+__all__ = ["TestPathSampling"]
+
+import unittest
+import numpy as np
+from ..state import SunpathState
+from ..path_sampling import PathSampling
+from ..sunpath_data import SunpathData
+
+
+class TestPathSampling(unittest.TestCase):
+    def setUp(self):
+        self.state = SunpathState()
+        self.state.scale = 1
+        self.sampling = PathSampling(self.state)
+        self.sampling.apply(final=True)
+
+    def day_points(self):
+        runs = self.state.pathmodel.day_path_runs([self.state.pathmodel.datevalue])[0]
+        return sum(len(run) for run in runs)
+
+    def test_scale_change_resamples(self):
+        tolerance = self.state.pathmodel.tolerance
+        points = self.day_points()
+        self.state.scale = 100
+        groups = self.sampling.groups({"transform"}, final=True)
+        self.assertIn("astronomy", groups)
+        self.assertLess(self.state.pathmodel.tolerance, tolerance)
+        self.assertGreater(self.day_points(), points)
+
+    def test_small_scale_change_keeps_paths(self):
+        self.state.scale = 1.2
+        tolerance = self.state.pathmodel.tolerance
+        self.assertEqual(self.sampling.groups({"transform"}, final=True), {"transform"})
+        self.assertEqual(self.state.pathmodel.tolerance, tolerance)
+
+    def test_larger_diagram_resamples(self):
+        self.state.add_diagram((0.0, 0.0, 0.0), scale=100)
+        self.assertIn("astronomy", self.sampling.groups({"diagrams"}, final=True))
+        self.state.remove_diagram()
+        self.assertIn("astronomy", self.sampling.groups({"diagrams"}, final=True))
+        self.assertEqual(self.state.pathmodel.tolerance, SunpathData.round_tolerance(self.sampling.tolerance(True)))
+
+    def test_draft_then_final(self):
+        self.assertEqual(self.sampling.groups({"astronomy"}, final=False), {"astronomy"})
+        self.assertEqual(self.state.pathmodel.day_step, PathSampling.DRAFT_SAMPLING[0])
+        self.assertEqual(self.sampling.groups({"style"}, final=False), {"style"})
+        self.assertEqual(self.sampling.groups(set(), final=True), {"astronomy"})
+        self.assertEqual(self.state.pathmodel.day_step, PathSampling.FINAL_SAMPLING[0])
+        self.assertEqual(self.sampling.groups({"time"}, final=True), {"time"})
+
+    def test_tolerance_is_power_of_two(self):
+        self.state.scale = 37
+        self.sampling.apply(final=True)
+        self.assertEqual(np.log2(self.state.pathmodel.tolerance) % 1, 0)
+        self.assertLessEqual(self.state.pathmodel.tolerance, self.sampling.tolerance(True))
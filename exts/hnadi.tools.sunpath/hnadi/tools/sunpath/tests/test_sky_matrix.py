@@ -0,0 +1,61 @@
+"""Checks of the sky subdivisions and of the cumulative sky matrix"""
+
+__all__ = ["TestSkyPatches", "TestCumulativeSky"]
+
+import unittest
+import numpy as np
+from ..sky_matrix import cumulative_sky, patch_index, sky_dome_mesh, sky_patches
+
+
+class TestSkyPatches(unittest.TestCase):
+    def test_tregenza(self):
+        patches = sky_patches(1)
+        self.assertEqual(len(patches.altitude), 145)
+        self.assertAlmostEqual(patches.band, 12.0)
+        self.assertAlmostEqual(patches.solid_angle.sum(), 2 * np.pi)
+
+    def test_reinhart(self):
+        patches = sky_patches(2)
+        self.assertEqual(len(patches.altitude), 577)
+        self.assertAlmostEqual(patches.solid_angle.sum(), 2 * np.pi)
+
+    def test_patch_centers_are_in_their_patch(self):
+        for subdivision in (1, 2, 4):
+            patches = sky_patches(subdivision)
+            index = patch_index(patches, patches.altitude, patches.azimuth)
+            np.testing.assert_array_equal(index, np.arange(len(patches.altitude)))
+
+    def test_patch_bounds(self):
+        patches = sky_patches(1)
+        # Horizon North, just east of North, the last band and the zenith cap
+        index = patch_index(patches, [0.0, 0.0, 84.0 - 1e-9, 84.0, 90.0], [0.0, 12.0, 359.0, 0.0, 123.0])
+        np.testing.assert_array_equal(index, [0, 1, 143, 144, 144])
+
+    def test_dome_mesh_covers_every_patch(self):
+        positions, counts, indices, patch = sky_dome_mesh(1, radius=2.0)
+        self.assertEqual(len(counts), 145)
+        self.assertEqual(counts.sum(), len(positions))
+        np.testing.assert_array_equal(np.unique(patch), np.arange(145))
+        np.testing.assert_allclose(np.linalg.norm(positions, axis=-1), 2.0, rtol=1e-6)
+        self.assertTrue((positions[:, 1] >= 0).all())
+
+
+class TestCumulativeSky(unittest.TestCase):
+    def setUp(self):
+        self.sky = cumulative_sky(40.0, 116.0, 8, 2024, step=60)
+
+    def test_diffuse_is_isotropic(self):
+        radiance = self.sky.diffuse / self.sky.patches.solid_angle
+        np.testing.assert_allclose(radiance, radiance[0])
+        np.testing.assert_allclose(self.sky.total, self.sky.direct + self.sky.diffuse)
+
+    def test_no_direct_radiation_from_the_north(self):
+        patches = self.sky.patches
+        north = (patches.azimuth < 30) | (patches.azimuth > 330)
+        self.assertEqual(self.sky.direct[north & (patches.altitude > 20)].sum(), 0)
+        self.assertGreater(self.sky.direct[~north].sum(), 1000)
+
+    def test_cached_per_rounded_site(self):
+        self.assertIs(cumulative_sky(40.001, 116.001, 8, 2024, step=60), self.sky)
+        with self.assertRaises(ValueError):
+            cumulative_sky(40.0, 116.0, 8, 2024, turbidity=[3, 3])
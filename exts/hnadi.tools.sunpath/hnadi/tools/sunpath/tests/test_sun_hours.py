@@ -0,0 +1,85 @@
+"""Checks of the CPU ray casts of the sun hours analysis"""
+
+__all__ = ["TestOccluded", "TestSunHours"]
+
+import unittest
+import numpy as np
+from ..bvh import build_bvh, occluded
+from ..sun_hours import sample_triangles, sun_hours, triangulate
+
+
+def brute_force_occluded(triangles, origins, directions, t_min=0.0):
+    """Moller-Trumbore of every ray against every triangle"""
+    v0, e1, e2 = triangles[:, 0], triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0]
+    hit = np.zeros(len(origins), dtype=bool)
+    for i, (origin, direction) in enumerate(zip(origins, directions)):
+        p = np.cross(direction, e2)
+        det = np.einsum("ij,ij->i", e1, p)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            s = origin - v0
+            u = np.einsum("ij,ij->i", s, p) / det
+            q = np.cross(s, e1)
+            v = q @ direction / det
+            t = np.einsum("ij,ij->i", e2, q) / det
+        hit[i] = np.any((np.abs(det) > 1e-12) & (u >= 0) & (v >= 0) & (u + v <= 1) & (t > t_min))
+    return hit
+
+
+class TestOccluded(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        centers = rng.uniform(-10, 10, (300, 1, 3))
+        self.triangles = centers + rng.uniform(-3, 3, (300, 3, 3))
+        self.bvh = build_bvh(self.triangles, leaf_size=4)
+        self.origins = rng.uniform(-12, 12, (2000, 3))
+        directions = rng.normal(size=(2000, 3))
+        self.directions = directions / np.linalg.norm(directions, axis=-1, keepdims=True)
+
+    def test_matches_brute_force(self):
+        hit = occluded(self.bvh, self.origins, self.directions)
+        np.testing.assert_array_equal(hit, brute_force_occluded(self.triangles, self.origins, self.directions))
+        # Neither none nor all of the rays are blocked, the comparison means something
+        self.assertTrue(0.1 < hit.mean() < 0.9)
+
+    def test_axis_aligned_rays(self):
+        # +x, -y, +z, -x, +y, -z ... the slab test divides by zero
+        axes = np.vstack([np.eye(3), -np.eye(3)])
+        directions = axes[[0, 4, 2, 3, 1, 5] * (len(self.origins) // 6) + [0, 4]]
+        hit = occluded(self.bvh, self.origins, directions)
+        np.testing.assert_array_equal(hit, brute_force_occluded(self.triangles, self.origins, directions))
+
+    def test_t_min(self):
+        hit = occluded(self.bvh, self.origins, self.directions, t_min=5.0)
+        np.testing.assert_array_equal(hit, brute_force_occluded(self.triangles, self.origins, self.directions, 5.0))
+
+    def test_no_triangles(self):
+        bvh = build_bvh(np.zeros((0, 3, 3)))
+        self.assertFalse(occluded(bvh, self.origins, self.directions).any())
+
+
+class TestSunHours(unittest.TestCase):
+    def test_triangulate_fans(self):
+        triangles, faces = triangulate([3, 4, 5], [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11])
+        np.testing.assert_array_equal(triangles, [[0, 1, 2], [3, 4, 5], [3, 5, 6], [7, 8, 9], [7, 9, 10], [7, 10, 11]])
+        np.testing.assert_array_equal(faces, [0, 1, 1, 2, 2, 2])
+
+    def test_samples_lie_on_triangles(self):
+        triangle = np.array([[[0, 0, 0], [4, 0, 0], [0, 0, -4]]], dtype=np.float64)
+        points, normals, owner = sample_triangles(triangle, density=10)
+        self.assertEqual(len(points), 80)
+        np.testing.assert_allclose(normals, [[0, 1, 0]] * 80)
+        self.assertTrue((points[:, 0] >= 0).all() and (points[:, 2] <= 0).all())
+        self.assertTrue((points[:, 0] - points[:, 2] <= 4 + 1e-9).all())
+
+    def test_roof_shades_the_ground(self):
+        ground = np.array(
+            [[[-1, 0, -1], [1, 0, -1], [1, 0, 1]], [[-1, 0, -1], [1, 0, 1], [-1, 0, 1]]], dtype=np.float64
+        )
+        roof = ground + [0, 2, 0]
+        bvh = build_bvh(np.concatenate([ground, roof]))
+        points = np.array([[0.0, 0.0, 0.0], [5.0, 0.0, 0.0]])
+        normals = np.array([[0.0, 1.0, 0.0], [0.0, 1.0, 0.0]])
+        # Overhead, low in the east (over the roof edge) and below the horizon
+        suns = np.array([[0.0, 1.0, 0.0], [0.9, 0.1, 0.0], [0.0, -1.0, 0.0]])
+        suns /= np.linalg.norm(suns, axis=-1, keepdims=True)
+        np.testing.assert_allclose(sun_hours(bvh, points, normals, suns, 0.5), [0.5, 1.0])
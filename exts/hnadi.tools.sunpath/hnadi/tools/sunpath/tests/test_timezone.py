@@ -0,0 +1,78 @@
+"""Checks of the UTC offsets solved from zoneinfo, daylight saving time changes included"""
+
+__all__ = ["TestZoneOffsets", "TestSunpathDataZone"]
+
+import unittest
+import numpy as np
+from ..sunpath_data import SunpathData
+from ..timezone import local_offsets, utc_offsets, zone_offsets, zone_time_offsets, nautical_zone, parse_timezone
+
+
+class TestZoneOffsets(unittest.TestCase):
+    def setUp(self):
+        self.offsets = zone_offsets("America/New_York", 2024)
+        if self.offsets is None:
+            self.skipTest("no zoneinfo database")
+
+    def test_new_york_2024_transitions(self):
+        self.assertEqual(self.offsets.standard, -5)
+        utc = np.array(["2024-03-10T07:00:00", "2024-11-03T06:00:00"], dtype="datetime64[s]")
+        local = np.array(["2024-03-10T02:00:00", "2024-11-03T02:00:00"], dtype="datetime64[s]")
+        np.testing.assert_array_equal(self.offsets.transitions, utc.astype(np.int64))
+        np.testing.assert_array_equal(self.offsets.local_transitions, local.astype(np.int64))
+        np.testing.assert_array_equal(self.offsets.offsets, [-18000, -14400, -18000])
+
+    def test_utc_offsets_around_transitions(self):
+        times = np.array(
+            ["2024-03-10T06:59:59", "2024-03-10T07:00:00", "2024-11-03T05:59:59", "2024-11-03T06:00:00"],
+            dtype="datetime64[s]",
+        )
+        np.testing.assert_array_equal(utc_offsets(self.offsets, times), [-5, -4, -4, -5])
+
+    def test_gap_hour_takes_the_offset_after(self):
+        times = np.array(["2024-03-10T01:59:59", "2024-03-10T02:30:00", "2024-03-10T03:00:00"], dtype="datetime64[s]")
+        np.testing.assert_array_equal(local_offsets(self.offsets, times), [-5, -4, -4])
+
+    def test_repeated_hour_takes_the_offset_before(self):
+        times = np.array(["2024-11-03T00:59:59", "2024-11-03T01:30:00", "2024-11-03T02:00:00"], dtype="datetime64[s]")
+        np.testing.assert_array_equal(local_offsets(self.offsets, times), [-4, -4, -5])
+
+    def test_times_over_several_years(self):
+        times = np.array(["2023-07-01T12:00", "2024-01-01T12:00", "NaT", "2025-07-01T12:00"], dtype="datetime64[m]")
+        np.testing.assert_array_equal(zone_time_offsets("America/New_York", times, default=99), [-4, -5, 99, -4])
+
+    def test_unknown_zone(self):
+        self.assertIsNone(zone_offsets("Nowhere/Atlantis", 2024))
+        np.testing.assert_array_equal(zone_time_offsets("Nowhere/Atlantis", ["2024-06-01"], default=8), [8])
+
+    def test_nautical_zone_and_parsing(self):
+        self.assertEqual(nautical_zone(120), "Etc/GMT-8")
+        self.assertEqual(nautical_zone(-74), "Etc/GMT+5")
+        self.assertEqual(nautical_zone(3), "Etc/GMT")
+        self.assertEqual(parse_timezone(" 8 "), 8.0)
+        self.assertEqual(parse_timezone("Asia/Shanghai"), "Asia/Shanghai")
+        self.assertIsNone(parse_timezone(""))
+
+
+class TestSunpathDataZone(unittest.TestCase):
+    def setUp(self):
+        if zone_offsets("America/New_York", 2024) is None:
+            self.skipTest("no zoneinfo database")
+        self.pathmodel = SunpathData(100, 12, 0, -74.0, 40.7)
+        self.pathmodel.year = 2024
+        self.pathmodel.set_timezone("America/New_York")
+
+    def test_standard_times(self):
+        self.assertTrue(self.pathmodel.has_dst())
+        times = np.array(["2024-01-15T12:00", "2024-07-01T12:00", "2024-03-10T02:30"], dtype="datetime64[s]")
+        expected = np.array(["2024-01-15T12:00", "2024-07-01T11:00", "2024-03-10T01:30"], dtype="datetime64[s]")
+        np.testing.assert_array_equal(self.pathmodel.standard_times(times), expected)
+
+    def test_fixed_offset_has_no_dst(self):
+        self.pathmodel.set_timezone(-5)
+        self.assertFalse(self.pathmodel.has_dst())
+        np.testing.assert_array_equal(self.pathmodel.utc_offsets(["2024-07-01T12:00"]), [-5])
+
+    def test_unknown_zone_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.pathmodel.set_timezone("Nowhere/Atlantis")
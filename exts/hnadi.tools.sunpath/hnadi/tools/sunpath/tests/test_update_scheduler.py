@@ -0,0 +1,139 @@
+"""Headless checks of the redraws the update scheduler runs while a slider is dragged
+
+The app updates are a fake frame source, so they run on plain CPython (and in the Kit test runner).
+"""
+
+__all__ = ["TestUpdateScheduler"]
+
+import asyncio
+import unittest
+from ..update_scheduler import UpdateScheduler
+
+
+class FakeFrames:
+    """Frame source whose app updates only happen when the test steps them"""
+
+    def __init__(self):
+        self._waiters = []
+
+    async def next_update(self):
+        future = asyncio.get_event_loop().create_future()
+        self._waiters.append(future)
+        await future
+
+    async def step(self, count=1):
+        """
+        Run count app updates, the tasks woken by every update run until they wait again
+        """
+        for _ in range(count):
+            await self._settle()
+            waiters, self._waiters = self._waiters, []
+            for future in waiters:
+                future.set_result(None)
+            await self._settle()
+
+    @staticmethod
+    async def _settle():
+        for _ in range(4):
+            await asyncio.sleep(0)
+
+
+class TestUpdateScheduler(unittest.TestCase):
+    SETTLE_FRAMES = 4
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.frames = FakeFrames()
+        self.applied = []
+        self.redraws = []
+        self.scheduler = UpdateScheduler(
+            lambda valtype, val: self.applied.append((valtype, val)),
+            self.redraws.append,
+            settle_frames=self.SETTLE_FRAMES,
+            next_update_fn=self.frames.next_update,
+            events=("add_diagram", "remove_diagram"),
+        )
+
+    def tearDown(self):
+        self.scheduler.cancel()
+        self.loop.close()
+
+    def run_frames(self, frames):
+        """
+        Run the frames, a frame is the list of (valtype, val) requested before its app update
+        """
+
+        async def drive():
+            for requests in frames:
+                for valtype, val in requests:
+                    self.scheduler.request(valtype, val)
+                await self.frames.step()
+
+        self.loop.run_until_complete(drive())
+
+    def idle(self, count):
+        return [[]] * count
+
+    def test_burst_collapses_into_one_draft_and_one_final(self):
+        burst = [("date", value) for value in range(100, 150)]
+        self.run_frames([burst] + self.idle(self.SETTLE_FRAMES))
+        self.assertEqual(self.redraws, [False, True])
+        self.assertEqual(self.applied, [("date", 149)])
+        self.assertEqual((self.scheduler.requests, self.scheduler.redraws, self.scheduler.final_redraws), (50, 1, 1))
+        self.assertFalse(self.scheduler.busy)
+
+    def test_one_draft_per_frame_while_dragging(self):
+        drag = [[("date", 100 + frame * 10 + i) for i in range(10)] for frame in range(6)]
+        self.run_frames(drag)
+        self.assertEqual(self.redraws, [False] * 6)
+        self.assertTrue(self.scheduler.busy)
+
+        # The final pass waits for settle_frames updates without changes
+        self.run_frames(self.idle(self.SETTLE_FRAMES - 1))
+        self.assertEqual(self.redraws.count(True), 0)
+        self.run_frames(self.idle(1))
+        self.assertEqual(self.redraws, [False] * 6 + [True])
+        self.assertEqual(len(self.applied), 6)
+
+    def test_parameters_of_one_frame_are_applied_together(self):
+        self.run_frames([[("longitude", 10.0), ("latitude", 20.0), ("longitude", 11.0)]] + self.idle(8))
+        self.assertEqual(self.applied, [("longitude", 11.0), ("latitude", 20.0)])
+        self.assertEqual(self.redraws, [False, True])
+
+    def test_events_are_applied_in_order_and_not_merged(self):
+        frame = [
+            ("scale", 20),
+            ("add_diagram", (0, 0, 0)),
+            ("scale", 30),
+            ("scale", 40),
+            ("add_diagram", (10, 0, 0)),
+            ("remove_diagram", None),
+            ("add_diagram", (20, 0, 0)),
+        ]
+        self.run_frames([frame] + self.idle(self.SETTLE_FRAMES))
+        self.assertEqual(
+            self.applied,
+            [
+                ("scale", 20),
+                ("add_diagram", (0, 0, 0)),
+                ("scale", 40),
+                ("add_diagram", (10, 0, 0)),
+                ("remove_diagram", None),
+                ("add_diagram", (20, 0, 0)),
+            ],
+        )
+        self.assertEqual(self.redraws, [False, True])
+
+    def test_a_new_drag_after_settling_redraws_again(self):
+        self.run_frames([[("hour", 8)]] + self.idle(self.SETTLE_FRAMES) + [[("hour", 9)]] + self.idle(8))
+        self.assertEqual(self.redraws, [False, True, False, True])
+
+    def test_flush_runs_the_final_pass_at_once(self):
+        async def drive():
+            self.scheduler.request("date", 120)
+            self.scheduler.flush()
+
+        self.loop.run_until_complete(drive())
+        self.assertEqual(self.applied, [("date", 120)])
+        self.assertEqual(self.redraws, [True])
+        self.assertFalse(self.scheduler.busy)
@@ -0,0 +1,362 @@
+"""IANA time zone of a location and its UTC offsets, daylight saving time included
+
+The zone is looked up in a grid bundled with the extension (data/timezones.npz): one zone index
+per cell of `resolution` degrees, so a lookup is a constant time array index, cells near a border
+may take the zone of their neighbour. The bundled grid is built from the zone boundaries of
+timezone-boundary-builder (ODbL) through the timezonefinder package, open sea takes the nautical
+zone Etc/GMT+-N. It can be rebuilt from the boundary GeoJSON or, roughly, from the zone locations
+of zone.tab (nearest location, no package needed):
+
+    python -m hnadi.tools.sunpath.timezone --finder --out data/timezones.npz
+    python -m hnadi.tools.sunpath.timezone --geojson combined.json --out data/timezones.npz
+    python -m hnadi.tools.sunpath.timezone --zone-tab /usr/share/zoneinfo/zone.tab --out data/timezones.npz
+
+Offsets come from zoneinfo (backports.zoneinfo or pytz on older Pythons). They are solved once per
+zone and year into transition arrays, local times are then converted with one searchsorted.
+"""
+
+__all__ = [
+    "TIMEZONE_GRID",
+    "ZoneOffsets",
+    "TimezoneGrid",
+    "load_grid",
+    "lookup_zone",
+    "zone_offsets",
+    "local_offsets",
+    "utc_offsets",
+    "zone_time_offsets",
+    "parse_timezone",
+    "read_zone_tab",
+    "build_grid",
+    "build_grid_from_geojson",
+    "build_grid_from_finder",
+]
+
+import os
+import json
+import argparse
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+import numpy as np
+
+try:
+    from zoneinfo import ZoneInfo as _zone_info
+except ImportError:
+    try:
+        from backports.zoneinfo import ZoneInfo as _zone_info
+    except ImportError:
+        try:
+            from pytz import timezone as _zone_info
+        except ImportError:
+            _zone_info = None
+
+# Bundled zone grid of the extension
+TIMEZONE_GRID = os.path.join(os.path.dirname(__file__), "..", "..", "..", "data", "timezones.npz")
+
+# Cells farther (km) from every zone location are open sea, with a nautical zone
+SEA_DISTANCE = 2000.0
+_EARTH_RADIUS = 6371.0
+
+# Transitions (UTC seconds) and offsets (seconds) of a zone, offsets[i] applies before transitions[i],
+# offsets[-1] after the last one. local_transitions are the wall clock times at which they happen.
+ZoneOffsets = namedtuple("ZoneOffsets", ["zone", "year", "standard", "transitions", "local_transitions", "offsets"])
+
+
+class TimezoneGrid:
+    """Zone index of every cell of a lat/lon grid, row 0 is the south"""
+
+    def __init__(self, grid, zones, resolution):
+        self.grid = grid
+        self.zones = list(zones)
+        self.resolution = float(resolution)
+
+    def lookup(self, lat, lon):
+        """
+        Zone names of locations, a str for scalars, otherwise an object array
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        rows, cols = self.grid.shape
+        row = np.clip(((lat + 90.0) / self.resolution).astype(np.int64), 0, rows - 1)
+        col = np.mod(((lon + 180.0) / self.resolution).astype(np.int64), cols)
+        index = self.grid[row, col]
+        if index.ndim == 0:
+            return self.zones[int(index)]
+        return np.array(self.zones, dtype=object)[index]
+
+    def save(self, path):
+        np.savez_compressed(path, grid=self.grid, zones=np.array(self.zones), resolution=self.resolution)
+        return path
+
+
+@lru_cache(maxsize=4)
+def load_grid(path=TIMEZONE_GRID):
+    """
+    Load a zone grid written by `TimezoneGrid.save`, None when the file does not exist
+    """
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return TimezoneGrid(data["grid"], data["zones"].tolist(), float(data["resolution"]))
+
+
+def nautical_zone(lon):
+    """
+    Etc zone of the 15 degrees band of lon, the sign of Etc/GMT names is inverted (Etc/GMT-8 is UTC+8)
+    """
+    hours = int(round(lon / 15.0))
+    return "Etc/GMT" if hours == 0 else f"Etc/GMT{-hours:+d}"
+
+
+def lookup_zone(lat, lon, path=TIMEZONE_GRID):
+    """
+    IANA zone name of a location, the nautical zone when there is no grid
+    """
+    grid = load_grid(path)
+    if grid is None:
+        return nautical_zone(lon)
+    return grid.lookup(lat, lon)
+
+
+def _offset_seconds(tzinfo, seconds):
+    return int(datetime.fromtimestamp(seconds, tzinfo).utcoffset().total_seconds())
+
+
+@lru_cache(maxsize=64)
+def zone_offsets(zone, year):
+    """
+    Solve the UTC offsets of zone in year (and a day around it), None when zone is unknown
+
+    The offset is sampled every day, the transitions are then found to the second by bisection.
+    """
+    if _zone_info is None:
+        return None
+    try:
+        tzinfo = _zone_info(zone)
+    except Exception:
+        return None
+
+    start = int(datetime(year, 1, 1, tzinfo=timezone.utc).timestamp()) - 2 * 86400
+    days = np.arange(start, start + 370 * 86400, 86400)
+    daily = np.array([_offset_seconds(tzinfo, int(t)) for t in days])
+    transitions = []
+    for i in np.flatnonzero(daily[1:] != daily[:-1]).tolist():
+        low, high = int(days[i]), int(days[i + 1])
+        while high - low > 1:
+            middle = (low + high) // 2
+            if _offset_seconds(tzinfo, middle) == daily[i]:
+                low = middle
+            else:
+                high = middle
+        transitions.append(high)
+
+    offsets = np.append(daily[0], daily[1:][daily[1:] != daily[:-1]]).astype(np.int64)
+    transitions = np.array(transitions, dtype=np.int64)
+    moment = datetime(year, 1, 1, 12, tzinfo=timezone.utc).astimezone(tzinfo)
+    standard = (moment.utcoffset() - (moment.dst() or timedelta(0))).total_seconds()
+    return ZoneOffsets(zone, year, standard / 3600.0, transitions, transitions + offsets[:-1], offsets)
+
+
+def _seconds(times):
+    return np.asarray(times).astype("datetime64[s]").astype(np.int64)
+
+
+def local_offsets(offsets: ZoneOffsets, times):
+    """
+    UTC offsets (hours) of an array of local (wall clock) times
+
+    A repeated hour takes the offset before the change, a skipped hour the offset after it.
+    """
+    index = np.searchsorted(offsets.local_transitions, _seconds(times), side="right")
+    return offsets.offsets[index] / 3600.0
+
+
+def utc_offsets(offsets: ZoneOffsets, times):
+    """
+    UTC offsets (hours) of an array of UTC times
+    """
+    index = np.searchsorted(offsets.transitions, _seconds(times), side="right")
+    return offsets.offsets[index] / 3600.0
+
+
+def zone_time_offsets(zone, times, utc=False, default=0.0):
+    """
+    UTC offsets (hours) of an array of local (or utc) times of zone, which may span several years
+
+    default is used for NaT and the years of which the zone offsets are unknown.
+    """
+    times = np.asarray(times).astype("datetime64[s]")
+    valid = ~np.isnat(times)
+    years = times.astype("datetime64[Y]").astype(np.int64) + 1970
+    result = np.full(times.shape, float(default))
+    for year in np.unique(years[valid]).tolist():
+        offsets = zone_offsets(zone, year)
+        if offsets is None:
+            continue
+        mask = valid & (years == year)
+        result[mask] = (utc_offsets if utc else local_offsets)(offsets, times[mask])
+    return result
+
+
+def parse_timezone(text):
+    """
+    Timezone of a command line or CSV value: None when empty, an offset (hours) or an IANA name
+    """
+    text = (text or "").strip()
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def read_zone_tab(path):
+    """
+    Read zone.tab (or zone1970.tab) of the tz database, a list of (zone, lat, lon)
+    """
+
+    def degrees(text, width):
+        sign = -1.0 if text[0] == "-" else 1.0
+        digits = text[1:]
+        value = int(digits[:width]) + int(digits[width : width + 2]) / 60.0
+        if len(digits) > width + 2:
+            value += int(digits[width + 2 : width + 4]) / 3600.0
+        return sign * value
+
+    zones = []
+    with open(path) as f:
+        for line in f:
+            if line.startswith("#") or not line.strip():
+                continue
+            fields = line.rstrip("\n").split("\t")
+            coordinates = fields[1]
+            split = max(coordinates.rfind("+"), coordinates.rfind("-"))
+            zones.append((fields[2], degrees(coordinates[:split], 2), degrees(coordinates[split:], 3)))
+    return zones
+
+
+def _cell_centers(resolution):
+    lats = -90.0 + resolution * (np.arange(int(round(180 / resolution))) + 0.5)
+    lons = -180.0 + resolution * (np.arange(int(round(360 / resolution))) + 0.5)
+    return lats, lons
+
+
+def build_grid(zones, resolution=0.5, sea_distance=SEA_DISTANCE):
+    """
+    Grid of the nearest (great circle) zone location of every cell, zones is a list of (zone, lat, lon)
+    """
+    lats, lons = _cell_centers(resolution)
+    names = sorted({zone for zone, _, _ in zones})
+    index = np.array([names.index(zone) for zone, _, _ in zones])
+    points = np.radians(np.array([(lat, lon) for _, lat, lon in zones]))
+    unit = np.stack(
+        [np.cos(points[:, 0]) * np.cos(points[:, 1]), np.cos(points[:, 0]) * np.sin(points[:, 1]), np.sin(points[:, 0])]
+    )
+
+    nautical = sorted({nautical_zone(lon) for lon in lons})
+    names += nautical
+    lon_rad = np.radians(lons)
+    sea = np.array([len(names) - len(nautical) + nautical.index(nautical_zone(lon)) for lon in lons])
+    grid = np.empty((len(lats), len(lons)), dtype=np.uint16)
+    for row, lat in enumerate(np.radians(lats)):
+        cells = np.stack(
+            [np.cos(lat) * np.cos(lon_rad), np.cos(lat) * np.sin(lon_rad), np.full_like(lon_rad, np.sin(lat))]
+        )
+        cosine = cells.T @ unit
+        nearest = np.argmax(cosine, axis=1)
+        distance = np.arccos(np.clip(cosine[np.arange(len(lons)), nearest], -1.0, 1.0)) * _EARTH_RADIUS
+        grid[row] = np.where(distance > sea_distance, sea, index[nearest])
+    return TimezoneGrid(grid, names, resolution)
+
+
+def _ring_mask(ring, lats, lons):
+    """
+    Cells (bounding box rows, cols and even-odd inside mask) of a polygon ring
+    """
+    ring = np.asarray(ring, dtype=np.float64)[:, :2]
+    rows = np.flatnonzero((lats >= ring[:, 1].min()) & (lats <= ring[:, 1].max()))
+    cols = np.flatnonzero((lons >= ring[:, 0].min()) & (lons <= ring[:, 0].max()))
+    inside = np.zeros((len(rows), len(cols)), dtype=bool)
+    if len(rows) == 0 or len(cols) == 0:
+        return rows, cols, inside
+    y = lats[rows][:, None]
+    x = lons[cols][None, :]
+    for (x0, y0), (x1, y1) in zip(ring[:-1], ring[1:]):
+        if y0 == y1:
+            continue
+        crosses = (y0 > y) != (y1 > y)
+        x_cross = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+        inside ^= crosses & (x < x_cross)
+    return rows, cols, inside
+
+
+def build_grid_from_geojson(path, resolution=0.5):
+    """
+    Rasterize zone polygons (features with a "tzid" property) at cell centers, open sea is nautical
+    """
+    with open(path) as f:
+        features = json.load(f)["features"]
+    lats, lons = _cell_centers(resolution)
+    names = sorted({feature["properties"]["tzid"] for feature in features})
+    nautical = sorted({nautical_zone(lon) for lon in lons})
+    names += [name for name in nautical if name not in names]
+    grid = np.tile(np.array([names.index(nautical_zone(lon)) for lon in lons], dtype=np.uint16), (len(lats), 1))
+
+    for feature in features:
+        geometry = feature["geometry"]
+        polygons = geometry["coordinates"] if geometry["type"] == "MultiPolygon" else [geometry["coordinates"]]
+        zone = names.index(feature["properties"]["tzid"])
+        for polygon in polygons:
+            rows, cols, inside = _ring_mask(polygon[0], lats, lons)
+            for hole in polygon[1:]:
+                hole_rows, hole_cols, hole_inside = _ring_mask(hole, lats, lons)
+                mask = np.zeros_like(inside)
+                mask[np.ix_(np.isin(rows, hole_rows), np.isin(cols, hole_cols))] = hole_inside
+                inside &= ~mask
+            block = grid[np.ix_(rows, cols)]
+            block[inside] = zone
+            grid[np.ix_(rows, cols)] = block
+    return TimezoneGrid(grid, names, resolution)
+
+
+def build_grid_from_finder(resolution=0.5):
+    """
+    Look up every cell center with the timezonefinder package (zone boundary data), open sea is nautical
+    """
+    from timezonefinder import TimezoneFinder
+
+    finder = TimezoneFinder()
+    lats, lons = _cell_centers(resolution)
+    names = {}
+    grid = np.empty((len(lats), len(lons)), dtype=np.uint16)
+    for row, lat in enumerate(lats.tolist()):
+        for col, lon in enumerate(lons.tolist()):
+            zone = finder.timezone_at(lng=lon, lat=lat) or nautical_zone(lon)
+            grid[row, col] = names.setdefault(zone, len(names))
+    zones = sorted(names, key=names.get)
+    return TimezoneGrid(grid, zones, resolution)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the time zone grid")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--zone-tab", help="zone.tab of the tz database, nearest zone location")
+    source.add_argument("--geojson", help="zone boundary polygons with a tzid property")
+    source.add_argument("--finder", action="store_true", help="zone boundaries of the timezonefinder package")
+    parser.add_argument("--resolution", type=float, default=0.5, help="cell size in degrees")
+    parser.add_argument("--out", default=TIMEZONE_GRID)
+    args = parser.parse_args(argv)
+
+    if args.zone_tab:
+        grid = build_grid(read_zone_tab(args.zone_tab), args.resolution)
+    elif args.geojson:
+        grid = build_grid_from_geojson(args.geojson, args.resolution)
+    else:
+        grid = build_grid_from_finder(args.resolution)
+    print(grid.save(args.out))
+
+
+if __name__ == "__main__":
+    main()
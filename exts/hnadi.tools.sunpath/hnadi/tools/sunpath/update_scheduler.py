@@ -0,0 +1,103 @@
+__all__ = ["UpdateScheduler"]
+
+import asyncio
+
+
+class UpdateScheduler:
+    """
+    Merge pending parameter changes and apply them at most once per app update
+
+    apply_fn(valtype, val) stores a parameter, redraw_fn(final) recomputes and redraws the scene.
+    While changes keep coming redraw_fn is called with final=False, once no change arrived for
+    settle_frames updates it is called one more time with final=True (the high quality pass).
+    The valtypes in events are actions rather than values, they are never merged.
+    """
+
+    def __init__(self, apply_fn, redraw_fn, settle_frames=8, next_update_fn=None, events=()):
+        self._apply_fn = apply_fn
+        self._redraw_fn = redraw_fn
+        self.settle_frames = settle_frames
+        self.events = frozenset(events)
+
+        # Kit is only needed for the default frame source, so the scheduler can run headless
+        if next_update_fn is None:
+            import omni.kit.app
+
+            next_update_fn = omni.kit.app.get_app().next_update_async
+        self._next_update = next_update_fn
+
+        # (valtype, epoch) -> val in request order, every event starts a new epoch
+        self._pending = {}
+        self._epoch = 0
+        self._task = None
+
+        # Counters for profiling
+        self.requests = 0
+        self.redraws = 0
+        self.final_redraws = 0
+
+    @property
+    def busy(self):
+        """Whether changes are pending or the trailing pass has not run yet"""
+        return self._task is not None
+
+    def request(self, valtype, val):
+        """
+        Queue a parameter change, the last value of every valtype wins
+
+        Events are applied once each, in order with the changes requested before and after them.
+        """
+        self.requests += 1
+        if valtype in self.events:
+            self._epoch += 1
+            self._pending[(valtype, self._epoch)] = val
+            self._epoch += 1
+        else:
+            self._pending[(valtype, self._epoch)] = val
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    def _apply_pending(self):
+        """
+        Apply queued parameter changes, return whether there were any
+        """
+        if not self._pending:
+            return False
+        pending, self._pending = self._pending, {}
+        for (valtype, _), val in pending.items():
+            self._apply_fn(valtype, val)
+        return True
+
+    async def _run(self):
+        idle_frames = 0
+        try:
+            while idle_frames < self.settle_frames:
+                await self._next_update()
+                if self._apply_pending():
+                    self._redraw_fn(False)
+                    self.redraws += 1
+                    idle_frames = 0
+                else:
+                    idle_frames += 1
+            self._redraw_fn(True)
+            self.final_redraws += 1
+        finally:
+            if self._task is asyncio.current_task():
+                self._task = None
+
+    def flush(self):
+        """
+        Apply queued changes and run the final pass immediately
+        """
+        self.cancel()
+        self._apply_pending()
+        self._redraw_fn(True)
+        self.final_redraws += 1
+
+    def cancel(self):
+        """
+        Stop waiting for the next app update, queued changes are kept
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -1,38 +1,224 @@
-__all__ = ["ViewportScene"]
+__all__ = ["ViewportScene", "DiagramView"]
 
 from omni.ui import scene as sc
 import omni.ui as ui
 from .sunpath_data import SunpathData
+from .sunpath_geometry import DiagramGeometry
 from .draw_sunpath import DrawSunpath
-from .draw_sphere import draw_movable_sphere
+from .draw_sphere import MovableSphere
+from .draw_sky import SkyDome
 from .gesture import MoveGesture
+from .lod import LOD_TIERS, projected_radius, select_tier
 
 from . import gol
 
 
+class DiagramView:
+    """
+    Scene items of one diagram, placed and scaled by its own transforms
+
+    The items are drawn with radius 1 from the geometry shared by all diagrams.
+    """
+
+    # Radius of the diagram to its outer compass circle, in units of the diagram radius
+    OUTER_RADIUS = 1.25
+
+    def __init__(self, pathmodel: SunpathData, settings, geometry: DiagramGeometry):
+        self.settings = settings
+        self._tier = LOD_TIERS[0]
+        # The transform places the diagram at origin, the gesture moves it
+        self._transform = sc.Transform(transform=self._origin_matrix())
+        move_ges = MoveGesture(self._transform, settings)
+        with self._transform:
+            # The diagram is drawn with radius 1, scale changes are only applied here
+            self._scale_transform = sc.Transform(transform=self._scale_matrix())
+            with self._scale_transform:
+                self._sunpath = DrawSunpath(pathmodel, move_ges, settings, geometry)
+                self._sphere = MovableSphere()
+                self._sky = SkyDome(pathmodel)
+
+    def _origin_matrix(self):
+        """
+        Build the translation matrix of the diagram origin
+        """
+        return sc.Matrix44.get_translation_matrix(*self.settings.origin)
+
+    def _scale_matrix(self):
+        """
+        Build the scale matrix of the diagram radius
+        """
+        radius = self.settings.scale * 200
+        return sc.Matrix44.get_scale_matrix(radius, radius, radius)
+
+    @property
+    def tier(self):
+        """
+        Current level of detail tier, see `lod.LOD_TIERS`
+        """
+        return self._tier
+
+    def update_tier(self, viewport_api, geometry: DiagramGeometry = None):
+        """
+        Choose the level of detail tier from the projected radius of the diagram, update the items
+        only when the tier changes
+        """
+        with gol.state.profiler.stage("lod"):
+            tier = LOD_TIERS[0]
+            if gol.state.level_of_detail:
+                radius = self.settings.scale * 200 * self.OUTER_RADIUS
+                pixels = projected_radius(
+                    viewport_api.world_to_ndc, self.settings.origin, radius, viewport_api.resolution
+                )
+                tier = select_tier(pixels, self._tier)
+            if tier is self._tier:
+                return
+            self._tier = tier
+        self._sunpath.set_tier(tier, geometry)
+        self._sphere.set_tier(tier)
+
+    def update(self, groups, viewport_api, geometry: DiagramGeometry):
+        """
+        Update the items depending on groups (a set), everything when groups is None
+        """
+        everything = groups is None
+        groups = groups or set()
+        if everything or "transform" in groups:
+            self._transform.transform = self._origin_matrix()
+            self._scale_transform.transform = self._scale_matrix()
+            self.update_tier(viewport_api, geometry)
+        if everything or "astronomy" in groups:
+            self._sunpath.update(geometry)
+        elif "style" in groups:
+            self._sunpath.restyle()
+        elif "time" in groups:
+            self._sunpath.update_info()
+        if everything or groups & {"astronomy", "time", "style", "sun"}:
+            self._sphere.update()
+        if everything or groups & {"astronomy", "sky"}:
+            self._sky.update()
+
+    def destroy(self):
+        self._transform.visible = False
+        self._transform.clear()
+
+
 class ViewportScene:
+    """
+    The diagrams of the state in the viewport, one `DiagramView` per `state.DiagramSettings`
+
+    All diagrams show the same location and date, they share one `DiagramGeometry`, so one more
+    diagram only costs its scene items.
+    """
+
+    # Radius of the diagram to its outer compass circle, in units of the diagram radius
+    OUTER_RADIUS = DiagramView.OUTER_RADIUS
+
     def __init__(self, viewport_window: ui.Window, ext_id: str, pathmodel: SunpathData) -> None:
         self._scene_view = None
         self._viewport_window = viewport_window
+        self._view_subscription = None
+        self._pathmodel = pathmodel
+        self._geometry = None
+        # DiagramView by DiagramSettings, in the order of the state
+        self._views = {}
 
         with self._viewport_window.get_frame(ext_id):
             self._scene_view = sc.SceneView()
-            with self._scene_view.scene:
-                transform = sc.Transform()
-                move_ges = MoveGesture(transform)
-                with transform:
-                    DrawSunpath(pathmodel, move_ges)
-                    if gol.get_value("sun_state"):
-                        draw_movable_sphere()
-            self._viewport_window.viewport_api.add_scene_view(self._scene_view)
+            self.sync_diagrams()
+            viewport_api = self._viewport_window.viewport_api
+            viewport_api.add_scene_view(self._scene_view)
+            # The camera moves the diagrams on screen, their level of detail follows
+            self._view_subscription = viewport_api.subscribe_to_view_change(self._on_view_change)
+            self.update_tier()
 
     def __del__(self):
         self.destroy()
 
+    def _shared_geometry(self):
+        """
+        Geometry of the current location and date, kept while they do not change
+        """
+        state = gol.state
+        key = DiagramGeometry.make_key(self._pathmodel, state.path_cache)
+        if self._geometry is None or self._geometry.key != key:
+            self._geometry = DiagramGeometry(self._pathmodel, state.path_cache)
+        return self._geometry
+
+    def sync_diagrams(self):
+        """
+        Create the views of added diagrams and destroy the views of removed ones
+        """
+        diagrams = gol.state.diagrams
+        for settings in [s for s in self._views if s not in diagrams]:
+            self._views.pop(settings).destroy()
+        missing = [s for s in diagrams if s not in self._views]
+        if missing:
+            geometry = self._shared_geometry()
+            with self._scene_view.scene:
+                for settings in missing:
+                    self._views[settings] = DiagramView(self._pathmodel, settings, geometry)
+        self._views = {settings: self._views[settings] for settings in diagrams}
+        return missing
+
+    def _on_view_change(self, viewport_api):
+        self.update_tier(viewport_api)
+
+    def update_tier(self, viewport_api=None):
+        """
+        Choose the level of detail tier of every diagram from its projected radius
+        """
+        if self._scene_view is None:
+            return
+        viewport_api = viewport_api or self._viewport_window.viewport_api
+        geometry = self._shared_geometry()
+        for view in self._views.values():
+            view.update_tier(viewport_api, geometry)
+
+    @property
+    def tier(self):
+        """
+        Level of detail tier of the first diagram, see `lod.LOD_TIERS`
+        """
+        return next(iter(self._views.values())).tier
+
+    @property
+    def views(self):
+        """
+        DiagramView of every diagram, in the order of the state
+        """
+        return tuple(self._views.values())
+
+    def update(self, groups=None):
+        """
+        Update the existing scene items in place instead of rebuilding the scene
+
+        groups are the changed field groups of the state (see `state`), only the items depending on
+        them are updated, all by default. New diagrams are drawn completely.
+        """
+        if self._scene_view is None:
+            return
+        if groups is None:
+            self.sync_diagrams()
+        elif "diagrams" in groups:
+            # New views are drawn completely when they are created
+            self.sync_diagrams()
+            self.update_tier()
+            groups = set(groups) - {"diagrams"}
+            if not groups:
+                return
+        else:
+            groups = set(groups)
+        viewport_api = self._viewport_window.viewport_api
+        geometry = self._shared_geometry()
+        for view in self._views.values():
+            view.update(groups, viewport_api, geometry)
+
     def destroy(self):
+        self._view_subscription = None
         if self._scene_view:
             self._scene_view.scene.clear()
             if self._viewport_window:
                 self._viewport_window.viewport_api.remove_scene_view(self._scene_view)
         self._viewport_window = None
         self._scene_view = None
+        self._views = {}
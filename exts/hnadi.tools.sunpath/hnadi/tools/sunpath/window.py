@@ -1,5 +1,8 @@
 __all__ = ["SunpathWindow"]
 
+import os
+import tempfile
+import carb
 import omni.ui as ui
 from functools import partial
 from .style import sunpath_window_style
@@ -13,7 +16,17 @@ SPACING = 4
 class SunpathWindow(ui.Window):
     """The class that represents the window"""
 
-    def __init__(self, title: str, delegate_1=None, delegate_2=None, delegate_3=None, delegate_4=None, **kwargs):
+    def __init__(
+        self,
+        title: str,
+        delegate_1=None,
+        delegate_2=None,
+        delegate_3=None,
+        delegate_4=None,
+        delegate_5=None,
+        delegate_6=None,
+        **kwargs,
+    ):
         self.__label_width = LABEL_WIDTH
 
         super().__init__(title, **kwargs)
@@ -29,6 +42,13 @@ class SunpathWindow(ui.Window):
         self.show_path = delegate_2
         self.show_sun = delegate_3
         self.update_scene = delegate_4
+        self.bake_sun = delegate_5
+        self.sun_hours = delegate_6
+
+        # Timing of the update stages, shown in the "stats" group
+        self.profiler = gol.state.profiler
+        self._stats_label = None
+        self._trace_path = None
 
     def destroy(self):
         # It will destroy all the children
@@ -82,6 +102,22 @@ class SunpathWindow(ui.Window):
                             ui.Label("Show Info", name="attribute_name", width=self.label_width)
                             si = ui.CheckBox(name="attribute_bool").model
                             si.add_value_changed_fn(lambda m: self.update("show_info", m.get_value_as_bool()))
+                        ui.Spacer(height=8)
+                        with ui.HStack():
+                            ui.Label("Irradiance", name="attribute_name", width=self.label_width)
+                            ir = ui.CheckBox(name="attribute_bool", tooltip="color day paths by clear sky DNI").model
+                            ir.add_value_changed_fn(lambda m: self.update("irradiance_colors", m.get_value_as_bool()))
+                        ui.Spacer(height=8)
+                        with ui.HStack():
+                            ui.Label("Show Sky", name="attribute_name", width=self.label_width)
+                            sk = ui.CheckBox(name="attribute_bool", tooltip="cumulative sky radiation dome").model
+                            sk.add_value_changed_fn(lambda m: self.update("show_sky", m.get_value_as_bool()))
+                        ui.Spacer(height=8)
+                        with ui.HStack():
+                            ui.Label("Far Detail", name="attribute_name", width=self.label_width)
+                            lod = ui.CheckBox(name="attribute_bool", tooltip="less detail for small diagrams").model
+                            lod.set_value(gol.state.level_of_detail)
+                            lod.add_value_changed_fn(lambda m: self.update("level_of_detail", m.get_value_as_bool()))
                     with ui.ZStack():
                         ui.Image(
                             name="extension_tittle",
@@ -91,20 +127,18 @@ class SunpathWindow(ui.Window):
                 ui.Spacer(height=8)
                 with ui.HStack():
                     ui.Label("Path Color", name="attribute_name", width=self.label_width)
-                    color_model = ui.ColorWidget(1, 1, 1, width=0, height=0).model
-                    r_model = color_model.get_item_children()[0]
-                    r_component = color_model.get_item_value_model(r_model)
-                    r_component.add_value_changed_fn(lambda m: gol.set_item("color", 0, m.get_value_as_float()))
-                    g_model = color_model.get_item_children()[1]
-                    g_component = color_model.get_item_value_model(g_model)
-                    g_component.add_value_changed_fn(lambda m: gol.set_item("color", 1, m.get_value_as_float()))
-                    b_model = color_model.get_item_children()[2]
-                    b_component = color_model.get_item_value_model(b_model)
-                    b_component.add_value_changed_fn(lambda m: gol.set_item("color", 2, m.get_value_as_float()))
+                    color_model = ui.ColorWidget(*gol.state.color, width=0, height=0).model
+                    components = [
+                        color_model.get_item_value_model(item) for item in color_model.get_item_children()[:3]
+                    ]
+                    for component in components:
+                        component.add_value_changed_fn(
+                            lambda m: self.update("color", tuple(c.get_value_as_float() for c in components))
+                        )
                     ui.Spacer()
                     ui.Button(
                         name="attribute_set",
-                        tooltip="update color or update scene",
+                        tooltip="update scene",
                         width=60,
                         clicked_fn=partial(self.update, None, None),
                     )
@@ -114,9 +148,32 @@ class SunpathWindow(ui.Window):
                     with ui.ZStack():
                         ui.Image(name="slider_bg_texture", fill_policy=ui.FillPolicy.STRETCH, width=ui.Percent(100))
                         ps_slider = ui.FloatSlider(name="attribute_slider", min=1, max=100, setp=1).model
-                        ps_slider.set_value(50)
+                        ps_slider.set_value(gol.state.scale)
                         ps_slider.add_value_changed_fn(lambda m: self.update("scale", m.get_value_as_float()))
                     ui.FloatField(model=ps_slider, width=60)
+                ui.Spacer(height=4)
+                with ui.HStack():
+                    ui.Label("Path Tolerance", name="attribute_name", width=self.label_width)
+                    with ui.ZStack():
+                        ui.Image(name="slider_bg_texture", fill_policy=ui.FillPolicy.STRETCH, width=ui.Percent(100))
+                        pt_slider = ui.FloatSlider(name="attribute_slider", min=0, max=100, step=0.5).model
+                        pt_slider.set_value(gol.state.path_tolerance)
+                        pt_slider.add_value_changed_fn(lambda m: self.update("tolerance", m.get_value_as_float()))
+                    ui.FloatField(model=pt_slider, width=60)
+                ui.Spacer(height=4)
+                with ui.HStack():
+                    ui.Label("Diagrams", name="attribute_name", width=self.label_width)
+                    ui.Button(
+                        "Add",
+                        tooltip="add a diagram next to the edited one, same location and date",
+                        clicked_fn=self._add_diagram,
+                    )
+                    ui.Spacer(width=SPACING)
+                    ui.Button(
+                        "Remove",
+                        tooltip="remove the edited diagram, the last one is kept",
+                        clicked_fn=partial(self.update, "remove_diagram", None),
+                    )
 
     def _build_location(self):
         """Build the widgets of the "location" group"""
@@ -192,6 +249,112 @@ class SunpathWindow(ui.Window):
                         mt_slider.set_value(30)
                         mt_slider.add_value_changed_fn(lambda m: self.update("minite", m.get_value_as_int()))
                     ui.IntField(model=mt_slider, width=60)
+                ui.Spacer(height=2)
+                with ui.HStack():
+                    ui.Label("Bake Sun", name="attribute_name", width=self.label_width)
+                    ui.Button(
+                        "Day",
+                        tooltip="bake the sunlight of the date into time samples, the timeline range is set to them",
+                        clicked_fn=partial(self.bake_sun, "day"),
+                    )
+                    ui.Spacer(width=SPACING)
+                    ui.Button(
+                        "Year",
+                        tooltip="bake the sunlight of the year into time samples, the timeline range is set to them",
+                        clicked_fn=partial(self.bake_sun, "year"),
+                    )
+                    ui.Spacer(width=SPACING)
+                    ui.Button(
+                        "Clear",
+                        tooltip="remove the baked time samples and restore the timeline range",
+                        clicked_fn=partial(self.bake_sun, "clear"),
+                    )
+                ui.Spacer(height=2)
+                with ui.HStack():
+                    ui.Label("Sun Hours", name="attribute_name", width=self.label_width)
+                    ui.Button(
+                        "Day",
+                        tooltip="direct sun hours of the selected meshes on the date",
+                        clicked_fn=partial(self.sun_hours, "day"),
+                    )
+                    ui.Spacer(width=SPACING)
+                    ui.Button(
+                        "Year",
+                        tooltip="direct sun hours of the selected meshes over the year",
+                        clicked_fn=partial(self.sun_hours, "year"),
+                    )
+
+    def _build_stats(self):
+        """Build the widgets of the "stats" group, timing of the update stages"""
+        with ui.CollapsableFrame(
+            "stats".upper(), name="group", collapsed=True, build_header_fn=self._build_collapsable_header
+        ):
+            with ui.VStack(height=0, spacing=SPACING):
+                ui.Spacer(height=8)
+                with ui.HStack():
+                    ui.Label("Timing", name="attribute_name", width=self.label_width)
+                    tm = ui.CheckBox(name="attribute_bool").model
+                    tm.set_value(self.profiler.enabled)
+                    tm.add_value_changed_fn(lambda m: self._enable_stats(m.get_value_as_bool()))
+                    ui.Button("Reset", tooltip="forget the measured stages", width=60, clicked_fn=self._reset_stats)
+                ui.Spacer(height=2)
+                self._stats_label = ui.Label("", name="attribute_name", word_wrap=True)
+                ui.Spacer(height=2)
+                with ui.HStack():
+                    ui.Label("Export Trace", name="attribute_name", width=self.label_width)
+                    self._trace_path = ui.StringField().model
+                    self._trace_path.set_value(os.path.join(tempfile.gettempdir(), "sunpath_trace.json"))
+                    ui.Spacer(width=SPACING)
+                    ui.Button("JSON", width=40, clicked_fn=partial(self._export_stats, ".json"))
+                    ui.Spacer(width=SPACING)
+                    ui.Button("CSV", width=40, clicked_fn=partial(self._export_stats, ".csv"))
+        self.show_stats()
+
+    def show_stats(self):
+        """
+        Show the rolling percentiles (milliseconds) of the update stages
+        """
+        if self._stats_label is None:
+            return
+        stats = self.profiler.stats()
+        if not self.profiler.enabled and not stats:
+            text = "Enable timing to measure the update stages"
+        elif not stats:
+            text = "No stage measured yet"
+        else:
+            lines = [f"{'stage':<12} {'calls':>7} {'p50':>6} {'p90':>6} {'p99':>6} ms"]
+            for name, stage in stats.items():
+                lines.append(
+                    f"{name:<12} {stage['count']:>7} {stage['p50']:>6.2f} {stage['p90']:>6.2f} {stage['p99']:>6.2f}"
+                )
+            text = "\n".join(lines)
+        self._stats_label.text = text
+
+    def _add_diagram(self):
+        """
+        Add a diagram beside the edited one, the sliders then edit the new diagram
+        """
+        x, y, z = gol.state.origin
+        self.update("add_diagram", (x + gol.state.scale * 200 * 3, y, z))
+
+    def _enable_stats(self, value):
+        self.profiler.enabled = value
+        self.show_stats()
+
+    def _reset_stats(self):
+        self.profiler.reset()
+        self.show_stats()
+
+    def _export_stats(self, extension):
+        """
+        Write the trace to the path of the field, with the extension of the format
+        """
+        path = os.path.splitext(self._trace_path.get_value_as_string())[0] + extension
+        self._trace_path.set_value(path)
+        try:
+            carb.log_info(f"Stage timing trace written to {self.profiler.export(path)}")
+        except OSError as e:
+            carb.log_error(f"Failed to write the stage timing trace: {e}")
 
     def _build_fn(self):
         """
@@ -203,3 +366,4 @@ class SunpathWindow(ui.Window):
                     self._build_display()
                     self._build_location()
                     self._build_datetime()
+                    self._build_stats()